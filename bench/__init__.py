@@ -0,0 +1,12 @@
+"""Local load-testing and benchmarking tools.
+
+Nothing here is imported by the bot. Each module is runnable with
+``python -m bench.<module> --help``:
+
+  fake_telegram  — stand-in Bot API server (latency / 429 injection)
+  load_driver    — replays synthetic user traffic against ``python -m bot``
+  fake_services  — stand-in Bunny Storage and ShrinkMe servers
+  ingest_bench   — times crawling, the Auto Get & Run scan and shortening
+  datagen        — fills a scratch database with a synthetic dataset
+  repo_bench     — times every repo function at 10k / 100k / 1M users
+"""
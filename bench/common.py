@@ -0,0 +1,59 @@
+"""Helpers shared by the bench tools: latency summaries and reporting."""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Iterable
+
+
+def configure_bot_env(**overrides: str) -> None:
+    """Environment for importing ``bot`` modules in-process.
+
+    Must run before the first ``bot`` import (``bot.config`` reads the
+    environment once). *overrides* are set unconditionally; the variables
+    ``bot.config`` requires get placeholders unless already set.
+    """
+    os.environ.update(overrides)
+    os.environ.setdefault("BOT_TOKEN", "1:bench")
+    os.environ.setdefault("SUPERGROUP_ID", "-1")
+    os.environ.setdefault("DATABASE_URL", "postgres://bench.invalid/bench")
+    os.environ.setdefault("BUNNY_CDN_HOSTNAME", "https://cdn.bench.invalid")
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of already *sorted* values (0 if empty)."""
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, round(p / 100 * len(values) + 0.5) - 1))
+    return values[k]
+
+
+def summarize(latencies: Iterable[float], elapsed: float | None = None) -> dict[str, Any]:
+    """Count, throughput and p50/p90/p99/max in milliseconds."""
+    ordered = sorted(latencies)
+    summary: dict[str, Any] = {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 2),
+    }
+    if elapsed:
+        summary["per_sec"] = round(len(ordered) / elapsed, 2)
+    return summary
+
+
+def print_table(rows: list[dict[str, Any]], columns: list[str]) -> None:
+    """Print dict rows as a plain aligned table."""
+    widths = {c: max([len(c)] + [len(str(r.get(c, ""))) for r in rows]) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for r in rows:
+        print("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+def write_json(path: str, data: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+        f.write("\n")
@@ -0,0 +1,401 @@
+"""Fill a scratch PostgreSQL database with a realistic synthetic dataset.
+
+Generates, for ``--users`` N:
+
+  topics             ``--topics`` categories plus the "All Videos" topic
+  videos             ``--videos-per-topic`` per category
+  users / referrals  a preferential-attachment referral graph (a few
+                     users refer many, most refer none); flags follow the
+                     funnel — verified once REQUIRED_REFERRALS is met,
+                     most verified users joined, some left again
+  download_sessions  ``--sessions-per-user`` × N, popular videos favoured
+  downloads          one log row per delivered session
+  scheduled_videos   ``--scheduled`` queue rows across all statuses
+
+Rows are bulk-loaded with COPY, then download rollups and the stats
+snapshot are built with the bot's own ``video_repo`` / ``stats_repo`` and
+the tables are ANALYZEd. Timestamps spread over the last ``--days`` days.
+
+The target must be a scratch database: ``--dsn`` (or ``BENCH_DATABASE_URL``)
+is required, and a database that already has users is only touched with
+``--reset``, which TRUNCATEs every bot table except ``config``.
+
+    python -m bench.datagen --dsn postgres://localhost/rated_bench \\
+        --users 100000 --init-schema --reset
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import asyncpg
+
+from bench.common import configure_bot_env
+from bench.fake_services import CATEGORY_NAMES
+
+SCHEMA = Path(__file__).resolve().parent.parent / "database" / "schema.sql"
+FIRST_USER_ID = 5_000_000_000  # synthetic user ids start here
+ADMIN_ID = FIRST_USER_ID  # created_by of scheduled videos
+COPY_CHUNK = 50_000
+
+TABLES = (
+    "downloads", "download_sessions", "referrals", "invite_links",
+    "scheduled_videos", "videos", "topics", "users", "fsm_states",
+    "download_rollups", "download_firsts", "stats_snapshot", "video_code_counters",
+)
+
+
+@dataclass
+class Spec:
+    users: int = 10_000
+    topics: int = 12
+    videos_per_topic: int = 250
+    sessions_per_user: float = 2.0
+    referred_ratio: float = 0.7
+    scheduled: int = 2_000
+    days: int = 180
+    seed: int = 1
+
+
+def _chunks(rows: Iterator[tuple], size: int = COPY_CHUNK) -> Iterator[list[tuple]]:
+    chunk: list[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _copy(
+    conn: asyncpg.Connection, table: str, columns: list[str], rows: Iterator[tuple],
+) -> int:
+    n = 0
+    for chunk in _chunks(rows):
+        await conn.copy_records_to_table(table, records=chunk, columns=columns)
+        n += len(chunk)
+    return n
+
+
+async def _reset(conn: asyncpg.Connection) -> None:
+    await conn.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+
+
+def _topic_rows(spec: Spec, now: datetime) -> list[tuple]:
+    rows = [(1, "All Videos", "ALL", 1, True, now - timedelta(days=spec.days))]
+    for i in range(spec.topics):
+        name = CATEGORY_NAMES[i] if i < len(CATEGORY_NAMES) else f"Category {i + 1}"
+        prefix = f"{name[:2].upper()}{i + 1}"
+        rows.append((i + 2, name, prefix, 100 + i, False, now - timedelta(days=spec.days)))
+    return rows
+
+
+def _video_rows(spec: Spec, topics: list[tuple], now: datetime, rng: random.Random):
+    video_id = 0
+    span = spec.days * 86400
+    for topic_id, name, prefix, *_ in topics[1:]:
+        for n in range(spec.videos_per_topic):
+            video_id += 1
+            posted = now - timedelta(seconds=span * (1 - (n + 1) / spec.videos_per_topic))
+            yield (
+                video_id,
+                f"{prefix}-{n + 1:05d}",  # 5 digits: never collides with allocated codes
+                f"{name} clip {n + 1}",
+                name,
+                None,
+                f"https://cdn.bench.invalid/{name}/clip_{n + 1:05d}.mp4",
+                f"https://shrinkme.io/{prefix.lower()}{n + 1:x}" if rng.random() < 0.9 else None,
+                None,
+                None,
+                topic_id,
+                10_000 + video_id,
+                rng.randint(0, 5_000),
+                posted,
+            )
+
+
+def _referral_graph(spec: Spec, rng: random.Random) -> tuple[list[int | None], list[int]]:
+    """Referrer index per user (or None) and referral counts.
+
+    Referrers are drawn from a list holding every user once plus once more
+    per referral already made, so counts follow a power law.
+    """
+    referred_by: list[int | None] = [None] * spec.users
+    counts = [0] * spec.users
+    attach: list[int] = []
+    for i in range(spec.users):
+        if attach and rng.random() < spec.referred_ratio:
+            ref = rng.choice(attach)
+            referred_by[i] = ref
+            counts[ref] += 1
+            attach.append(ref)
+        attach.append(i)
+    return referred_by, counts
+
+
+def _user_rows(
+    spec: Spec, referred_by: list, counts: list, required: int,
+    now: datetime, rng: random.Random,
+):
+    span = spec.days * 86400
+    for i in range(spec.users):
+        user_id = FIRST_USER_ID + i
+        joined = now - timedelta(seconds=span * (1 - i / spec.users))
+        # ~1% qualify but are still waiting for the scheduler to verify them
+        verified = counts[i] >= required and rng.random() >= 0.01
+        in_group = verified and rng.random() < 0.8
+        left = in_group and rng.random() < 0.05
+        ref = referred_by[i]
+        yield (
+            user_id,
+            f"user{user_id}" if rng.random() < 0.6 else None,
+            f"User {i}",
+            f"https://t.me/bench_bot?start=ref_{user_id}",
+            counts[i],
+            FIRST_USER_ID + ref if ref is not None else None,
+            rng.choice(("id", "en", "en", None)),
+            True,
+            verified,
+            verified,
+            False,
+            in_group and not left,
+            joined + timedelta(days=rng.randint(1, 30)) if left else None,
+            joined,
+            joined,
+        )
+
+
+def _referral_rows(referred_by: list, spec: Spec, now: datetime):
+    span = spec.days * 86400
+    for i, ref in enumerate(referred_by):
+        if ref is not None:
+            yield (
+                FIRST_USER_ID + ref,
+                FIRST_USER_ID + i,
+                now - timedelta(seconds=span * (1 - i / spec.users)),
+            )
+
+
+def _session_rows(spec: Spec, videos: int, now: datetime, rng: random.Random):
+    span = spec.days * 86400
+    total = int(spec.users * spec.sessions_per_user)
+    for n in range(total):
+        created = now - timedelta(seconds=span * rng.random() ** 2)  # skewed recent
+        visited = rng.random() < 0.7
+        sent = visited and rng.random() < 0.9
+        yield (
+            f"{rng.getrandbits(48):012x}{n:x}",
+            FIRST_USER_ID + rng.randrange(spec.users),
+            1 + int(videos * rng.random() ** 3),  # popular (low id) videos favoured
+            visited,
+            sent,
+            created,
+            created + timedelta(minutes=10),
+            created + timedelta(seconds=rng.randint(5, 300)) if visited else None,
+        )
+
+
+def _scheduled_rows(spec: Spec, topics: list[tuple], now: datetime, rng: random.Random):
+    for n in range(spec.scheduled):
+        status = rng.choices(
+            ("posted", "pending", "failed", "cancelled"), weights=(60, 30, 5, 5),
+        )[0]
+        topic = rng.choice(topics[1:])
+        if status == "pending":
+            at = now + timedelta(minutes=rng.randint(-60, 7 * 24 * 60))
+        else:
+            at = now - timedelta(minutes=rng.randint(1, spec.days * 24 * 60))
+        yield (
+            f"{topic[1]} queued {n + 1}",
+            topic[1],
+            None,
+            f"https://cdn.bench.invalid/{topic[1]}/queued_{n + 1:06d}.mp4",
+            None,
+            None,
+            None,
+            f"{topic[0]},1",
+            at,
+            status,
+            ADMIN_ID,
+            at - timedelta(days=1),
+            at if status == "posted" else None,
+            "Bench: synthetic failure" if status == "failed" else None,
+        )
+
+
+async def generate(pool: asyncpg.Pool, spec: Spec, *, reset: bool = False) -> dict[str, Any]:
+    """Load a dataset for *spec* into *pool*'s database; returns row counts."""
+    from bot.db import config_repo, stats_repo, video_repo
+
+    rng = random.Random(spec.seed)
+    now = datetime.now(timezone.utc)
+    begin = time.perf_counter()
+    counts: dict[str, Any] = {}
+
+    async with pool.acquire() as conn:
+        if reset:
+            await _reset(conn)
+        elif await conn.fetchval("SELECT EXISTS (SELECT 1 FROM users)"):
+            raise SystemExit("Database already has users; pass --reset to replace them.")
+
+        required = max(1, await config_repo.get_required_referrals(pool))
+        topics = _topic_rows(spec, now)
+        video_count = spec.topics * spec.videos_per_topic
+        referred_by, referral_counts = _referral_graph(spec, rng)
+
+        async with conn.transaction():
+            counts["topics"] = await _copy(
+                conn, "topics",
+                ["topic_id", "name", "prefix", "thread_id", "is_all", "created_at"],
+                iter(topics),
+            )
+            counts["videos"] = await _copy(
+                conn, "videos",
+                ["video_id", "code", "title", "category", "description", "file_url",
+                 "shortened_url", "thumbnail_file_id", "affiliate_link", "topic_id",
+                 "message_id", "views", "post_date"],
+                _video_rows(spec, topics, now, rng),
+            )
+            counts["users"] = await _copy(
+                conn, "users",
+                ["user_id", "username", "first_name", "referral_link", "referral_count",
+                 "referred_by", "language", "bot_joined", "verification_complete",
+                 "approved", "ready_to_join", "joined_supergroup", "left_at",
+                 "join_date", "last_updated"],
+                _user_rows(spec, referred_by, referral_counts, required, now, rng),
+            )
+            counts["referrals"] = await _copy(
+                conn, "referrals",
+                ["referrer_user_id", "referred_user_id", "referral_date"],
+                _referral_rows(referred_by, spec, now),
+            )
+            counts["download_sessions"] = await _copy(
+                conn, "download_sessions",
+                ["session_id", "user_id", "video_id", "affiliate_visited", "video_sent",
+                 "created_at", "expires_at", "visited_at"],
+                _session_rows(spec, video_count, now, rng),
+            )
+            counts["downloads"] = await conn.fetchval(
+                """
+                WITH ins AS (
+                    INSERT INTO downloads
+                        (user_id, video_id, session_id, affiliate_link_clicked,
+                         download_completed, download_date, created_at)
+                    SELECT user_id, video_id, session_id, TRUE, TRUE, visited_at, visited_at
+                    FROM download_sessions
+                    WHERE video_sent
+                    RETURNING 1
+                )
+                SELECT COUNT(*) FROM ins
+                """
+            )
+            counts["scheduled_videos"] = await _copy(
+                conn, "scheduled_videos",
+                ["title", "category", "description", "file_url", "thumbnail_b64",
+                 "thumbnail_file_id", "affiliate_link", "topic_ids", "scheduled_at",
+                 "status", "created_by", "created_at", "posted_at", "error_message"],
+                _scheduled_rows(spec, topics, now, rng),
+            )
+            await conn.execute(
+                """
+                UPDATE videos v SET downloads = d.n
+                FROM (SELECT video_id, COUNT(*) AS n FROM downloads GROUP BY video_id) d
+                WHERE v.video_id = d.video_id
+                """
+            )
+            for table, column in (("topics", "topic_id"), ("videos", "video_id")):
+                await conn.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                    f"(SELECT MAX({column}) FROM {table}))"
+                )
+
+    start = await video_repo.get_rollup_start(pool)
+    if start is not None:
+        start = start.replace(minute=0, second=0, microsecond=0)
+        await video_repo.roll_up_downloads(pool, start, now + timedelta(hours=1))
+    await stats_repo.refresh_snapshot(pool)
+    async with pool.acquire() as conn:
+        await conn.execute("ANALYZE")
+
+    counts["seconds"] = round(time.perf_counter() - begin, 1)
+    return counts
+
+
+def dsn_from_args(args: argparse.Namespace) -> str:
+    dsn = args.dsn or os.getenv("BENCH_DATABASE_URL")
+    if not dsn:
+        raise SystemExit("Pass --dsn or set BENCH_DATABASE_URL to a scratch database.")
+    return dsn
+
+
+async def init_schema(pool: asyncpg.Pool) -> None:
+    """Apply database/schema.sql (idempotent)."""
+    async with pool.acquire() as conn:
+        await conn.execute(SCHEMA.read_text(encoding="utf-8"))
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    """Dataset options shared with bench.repo_bench (all but --users)."""
+    defaults = Spec()
+    parser.add_argument("--dsn", help="scratch database (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--init-schema", action="store_true",
+                        help="apply database/schema.sql first")
+    parser.add_argument("--topics", type=int, default=defaults.topics)
+    parser.add_argument("--videos-per-topic", type=int, default=defaults.videos_per_topic)
+    parser.add_argument("--sessions-per-user", type=float, default=defaults.sessions_per_user)
+    parser.add_argument("--referred-ratio", type=float, default=defaults.referred_ratio,
+                        help="share of users who arrive through a referral link")
+    parser.add_argument("--scheduled", type=int, default=defaults.scheduled)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args: argparse.Namespace, users: int) -> Spec:
+    return Spec(
+        users=users,
+        topics=args.topics,
+        videos_per_topic=args.videos_per_topic,
+        sessions_per_user=args.sessions_per_user,
+        referred_ratio=args.referred_ratio,
+        scheduled=args.scheduled,
+        days=args.days,
+        seed=args.seed,
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    spec = spec_from_args(args, args.users)
+    pool = await asyncpg.create_pool(dsn_from_args(args), min_size=1, max_size=2)
+    try:
+        if args.init_schema:
+            await init_schema(pool)
+        print(f"Generating {asdict(spec)} …")
+        counts = await generate(pool, spec, reset=args.reset)
+    finally:
+        await pool.close()
+    for table, n in counts.items():
+        print(f"  {table}: {n}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=Spec.users)
+    parser.add_argument("--reset", action="store_true",
+                        help="TRUNCATE all bot tables (except config) first")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    configure_bot_env(DATABASE_URL=dsn_from_args(args))
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Stand-in Bunny Edge Storage and ShrinkMe servers.
+
+One aiohttp app serves both:
+
+  GET /bunny/{zone}/{path}/   Bunny Storage directory listing, generated
+                              from a manifest (``AccessKey`` checked)
+  GET /shrinkme/api?api=…&url=…&format=text
+                              ShrinkMe-style shortener
+
+Point the bot at it with::
+
+    BUNNY_STORAGE_API_URL=http://127.0.0.1:8082/bunny
+    SHRINKME_API_URL=http://127.0.0.1:8082/shrinkme/api
+
+The manifest is a synthetic directory tree: ``categories`` top-level
+folders, each with ``fanout`` sub-folders per level down to ``depth``,
+and ``files`` files per folder (a share of them non-video). Listing and
+shortening latency are configurable, and ``shrink_fail_rate`` of
+shortener calls fail (HTTP 500 or an error body).
+
+Standalone: ``python -m bench.fake_services --port 8082 --write-manifest m.json``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+from datetime import datetime, timezone
+from typing import Any
+
+from aiohttp import web
+
+CATEGORY_NAMES = [
+    "Asia", "Western", "Solo", "Amateur", "Couple", "Classic",
+    "Cosplay", "Outdoor", "Vintage", "Studio",
+]
+VIDEO_EXTENSIONS = [".mp4", ".mp4", ".mp4", ".mkv", ".mov", ".webm"]
+OTHER_EXTENSIONS = [".jpg", ".png", ".txt"]
+
+
+def generate_manifest(
+    *,
+    categories: int = 8,
+    fanout: int = 3,
+    depth: int = 2,
+    files: int = 20,
+    non_video_ratio: float = 0.1,
+    zone: str = "bench",
+    api_key: str = "bench-key",
+    seed: int = 1,
+) -> dict[str, Any]:
+    """Build a synthetic storage tree: {"zone", "api_key", "tree"}.
+
+    Each node is ``{"dirs": {name: node}, "files": [name, …]}``.
+    """
+    rng = random.Random(seed)
+
+    def node(level: int, prefix: str) -> dict[str, Any]:
+        names = []
+        for i in range(files):
+            ext = (
+                rng.choice(OTHER_EXTENSIONS)
+                if rng.random() < non_video_ratio
+                else rng.choice(VIDEO_EXTENSIONS)
+            )
+            names.append(f"{prefix}_clip_{i + 1:03d}{ext}")
+        dirs = {}
+        if level < depth:
+            for j in range(fanout):
+                name = f"Model {prefix} {j + 1}"
+                dirs[name] = node(level + 1, f"{prefix}{j + 1}")
+        return {"dirs": dirs, "files": names}
+
+    tree = {}
+    for c in range(categories):
+        name = CATEGORY_NAMES[c] if c < len(CATEGORY_NAMES) else f"Category {c + 1}"
+        tree[name] = node(1, name.replace(" ", "").lower()[:6])
+    return {"zone": zone, "api_key": api_key, "tree": tree}
+
+
+def count_files(manifest: dict[str, Any]) -> tuple[int, int]:
+    """(directories, files) in the manifest, excluding the root."""
+    dirs = files = 0
+    stack = list(manifest["tree"].values())
+    while stack:
+        n = stack.pop()
+        dirs += 1
+        files += len(n["files"])
+        stack.extend(n["dirs"].values())
+    return dirs, files
+
+
+class FakeServices:
+    def __init__(
+        self,
+        manifest: dict[str, Any],
+        *,
+        bunny_latency_ms: float = 20.0,
+        shrink_latency_ms: float = 100.0,
+        jitter_ms: float = 5.0,
+        shrink_fail_rate: float = 0.0,
+    ) -> None:
+        self.manifest = manifest
+        self.bunny_latency_ms = bunny_latency_ms
+        self.shrink_latency_ms = shrink_latency_ms
+        self.jitter_ms = jitter_ms
+        self.shrink_fail_rate = shrink_fail_rate
+
+        self.listings = 0
+        self.shortened = 0
+        self.shrink_failures = 0
+        self._short_id = 0
+        self._stamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000")
+
+    async def _delay(self, mean_ms: float) -> None:
+        ms = max(0.0, random.gauss(mean_ms, self.jitter_ms)) if mean_ms else 0.0
+        if ms:
+            await asyncio.sleep(ms / 1000)
+
+    def _object(self, path: str, name: str, is_dir: bool) -> dict[str, Any]:
+        zone = self.manifest["zone"]
+        return {
+            "Guid": f"{hash((path, name)) & 0xFFFFFFFF:08x}",
+            "StorageZoneName": zone,
+            "Path": f"/{zone}/{path}",
+            "ObjectName": name,
+            "Length": 0 if is_dir else 50_000_000 + len(name) * 1000,
+            "LastChanged": self._stamp,
+            "DateCreated": self._stamp,
+            "IsDirectory": is_dir,
+        }
+
+    async def bunny_list(self, request: web.Request) -> web.Response:
+        await self._delay(self.bunny_latency_ms)
+        if request.match_info["zone"] != self.manifest["zone"]:
+            return web.json_response({"HttpCode": 404, "Message": "Zone not found"}, status=404)
+        if request.headers.get("AccessKey") != self.manifest["api_key"]:
+            return web.json_response({"HttpCode": 401, "Message": "Unauthorized"}, status=401)
+
+        path = request.match_info["path"].strip("/")
+        node: dict[str, Any] = {"dirs": self.manifest["tree"], "files": []}
+        for part in filter(None, path.split("/")):
+            node = node["dirs"].get(part)
+            if node is None:
+                return web.json_response({"HttpCode": 404, "Message": "Not found"}, status=404)
+
+        self.listings += 1
+        prefix = f"{path}/" if path else ""
+        objects = [self._object(prefix, name, True) for name in node["dirs"]]
+        objects += [self._object(prefix, name, False) for name in node["files"]]
+        return web.json_response(objects)
+
+    async def shrink(self, request: web.Request) -> web.Response:
+        await self._delay(self.shrink_latency_ms)
+        if not request.query.get("api") or not request.query.get("url"):
+            return web.Response(text="Invalid API request", status=400)
+        if random.random() < self.shrink_fail_rate:
+            self.shrink_failures += 1
+            if random.random() < 0.5:
+                return web.Response(text="Internal Server Error", status=500)
+            return web.Response(text='{"status":"error","message":"Service busy"}')
+        self._short_id += 1
+        self.shortened += 1
+        return web.Response(text=f"https://shrinkme.io/b{self._short_id:06x}")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/shrinkme/api", self.shrink)
+        app.router.add_get("/bunny/{zone}/{path:.*}", self.bunny_list)
+        return app
+
+
+async def serve(services: FakeServices, host: str, port: int) -> web.AppRunner:
+    """Start ``services`` on host:port and return the runner (call .cleanup())."""
+    runner = web.AppRunner(services.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def add_service_arguments(parser: argparse.ArgumentParser) -> None:
+    """CLI options shared with bench.ingest_bench."""
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--manifest", help="load the storage tree from this JSON file")
+    parser.add_argument("--write-manifest", help="save the generated tree to this JSON file")
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--fanout", type=int, default=3, help="sub-folders per folder")
+    parser.add_argument("--depth", type=int, default=2, help="folder levels incl. the category")
+    parser.add_argument("--files", type=int, default=20, help="files per folder")
+    parser.add_argument("--non-video-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--bunny-latency-ms", type=float, default=20.0)
+    parser.add_argument("--shrink-latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--shrink-fail-rate", type=float, default=0.0)
+
+
+def services_from_args(args: argparse.Namespace) -> FakeServices:
+    if args.manifest:
+        with open(args.manifest, encoding="utf-8") as f:
+            manifest = json.load(f)
+    else:
+        manifest = generate_manifest(
+            categories=args.categories,
+            fanout=args.fanout,
+            depth=args.depth,
+            files=args.files,
+            non_video_ratio=args.non_video_ratio,
+            seed=args.seed,
+        )
+    if args.write_manifest:
+        with open(args.write_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+    return FakeServices(
+        manifest,
+        bunny_latency_ms=args.bunny_latency_ms,
+        shrink_latency_ms=args.shrink_latency_ms,
+        jitter_ms=args.jitter_ms,
+        shrink_fail_rate=args.shrink_fail_rate,
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    services = services_from_args(args)
+    dirs, files = count_files(services.manifest)
+    runner = await serve(services, args.host, args.port)
+    base = f"http://{args.host}:{args.port}"
+    print(f"Zone '{services.manifest['zone']}' (AccessKey '{services.manifest['api_key']}'): "
+          f"{dirs} folders, {files} files")
+    print(f"BUNNY_STORAGE_API_URL={base}/bunny")
+    print(f"SHRINKME_API_URL={base}/shrinkme/api")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    add_service_arguments(parser)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
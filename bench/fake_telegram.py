@@ -0,0 +1,301 @@
+"""Stand-in Telegram Bot API server for load tests.
+
+Point the bot at it with ``TELEGRAM_API_URL=http://127.0.0.1:8081``. It
+implements what the bot's hot paths call — ``getUpdates``,
+``sendMessage``, ``sendPhoto``, ``sendVideo``, ``editMessageText``,
+``createChatInviteLink``, ``revokeChatInviteLink``, ``getChatMember``,
+``approveChatJoinRequest``, ``answerCallbackQuery`` plus the startup calls
+``getMe`` / ``deleteWebhook``. Any other method answers ``true``.
+
+Every call except ``getUpdates`` is delayed by ``latency_ms`` ± jitter,
+and a ``rate_429`` fraction of outgoing sends/edits/answers fails with
+``429 Too Many Requests`` (``retry_after`` seconds) like the real API.
+
+In-process use (see bench.load_driver)::
+
+    api = FakeTelegram(latency_ms=30, rate_429=0.01)
+    reply = api.expect_chat(user_id)      # Future of (method, params)
+    api.push_message(user_id, "/start")
+    method, params = await reply
+
+Standalone: ``python -m bench.fake_telegram --port 8081``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any
+
+from aiohttp import web
+
+BOT_ID = 1000
+
+# Outgoing calls that may be answered with an injected 429
+_THROTTLED = frozenset({
+    "sendMessage", "sendPhoto", "sendVideo", "editMessageText",
+    "answerCallbackQuery", "createChatInviteLink", "approveChatJoinRequest",
+})
+# Calls that count as "the bot replied to this chat"
+_CHAT_REPLIES = frozenset({"sendMessage", "sendPhoto", "sendVideo", "editMessageText"})
+
+
+class FakeTelegram:
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_429: float = 0.0,
+        retry_after: int = 1,
+        member_status: str = "member",
+        bot_username: str = "loadtest_bot",
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.member_status = member_status
+        self.bot_user = {
+            "id": BOT_ID, "is_bot": True, "first_name": "Load Test Bot",
+            "username": bot_username,
+        }
+
+        self.calls: Counter[str] = Counter()
+        self.throttled: Counter[str] = Counter()
+        self.polling = asyncio.Event()  # set on the first getUpdates
+
+        self._updates: list[dict[str, Any]] = []
+        self._has_updates = asyncio.Event()
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._next_link_id = 1
+        self._waiters: dict[tuple[str, Any], deque[asyncio.Future]] = defaultdict(deque)
+
+    # ── Update injection ────────────────────────────────────────────
+
+    def _user(self, user_id: int) -> dict[str, Any]:
+        return {
+            "id": user_id, "is_bot": False, "first_name": f"Load {user_id}",
+            "username": f"load{user_id}", "language_code": "id",
+        }
+
+    def _push(self, payload: dict[str, Any]) -> None:
+        payload["update_id"] = self._next_update_id
+        self._next_update_id += 1
+        self._updates.append(payload)
+        self._has_updates.set()
+
+    def _message(self, chat_id: int, text: str, sender: dict[str, Any]) -> dict[str, Any]:
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": sender["first_name"]},
+            "from": sender,
+            "text": text,
+        }
+
+    def push_message(self, user_id: int, text: str) -> None:
+        """Queue a private text message from ``user_id``."""
+        message = self._message(user_id, text, self._user(user_id))
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        self._push({"message": message})
+
+    def push_callback(self, user_id: int, data: str) -> str:
+        """Queue a callback query from ``user_id``; returns its id."""
+        callback_id = f"cq{self._next_update_id}"
+        self._push({"callback_query": {
+            "id": callback_id,
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": self._message(user_id, "…", self.bot_user),
+        }})
+        return callback_id
+
+    # ── Reply tracking ──────────────────────────────────────────────
+
+    def expect_chat(self, chat_id: int) -> asyncio.Future:
+        """Future resolved with (method, params) of the next reply to chat_id."""
+        return self._expect("chat", chat_id)
+
+    def expect_callback(self, callback_id: str) -> asyncio.Future:
+        """Future resolved with (method, params) of answerCallbackQuery."""
+        return self._expect("callback", callback_id)
+
+    def _expect(self, kind: str, key: Any) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[(kind, key)].append(future)
+        return future
+
+    def _resolve(self, kind: str, key: Any, method: str, params: dict[str, Any]) -> None:
+        waiters = self._waiters.get((kind, key))
+        while waiters:
+            future = waiters.popleft()
+            if not future.done():
+                future.set_result((method, params))
+                break
+        if not waiters:
+            self._waiters.pop((kind, key), None)
+
+    # ── HTTP handling ───────────────────────────────────────────────
+
+    async def _delay(self) -> None:
+        if self.latency_ms or self.jitter_ms:
+            ms = max(0.0, random.gauss(self.latency_ms, self.jitter_ms))
+            await asyncio.sleep(ms / 1000)
+
+    async def _get_updates(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        self.polling.set()
+        offset = int(params.get("offset") or 0)
+        if offset:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        timeout = float(params.get("timeout") or 0)
+        if not self._updates and timeout > 0:
+            self._has_updates.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._has_updates.wait(), timeout)
+        return self._updates[: int(params.get("limit") or 100)]
+
+    def _result(self, method: str, params: dict[str, Any]) -> Any:
+        if method == "getMe":
+            return self.bot_user
+        if method in _CHAT_REPLIES:
+            chat_id = int(params.get("chat_id") or 0)
+            message = self._message(chat_id, params.get("text") or "", self.bot_user)
+            if method == "sendPhoto":
+                message["photo"] = [{
+                    "file_id": f"photo{message['message_id']}",
+                    "file_unique_id": f"p{message['message_id']}",
+                    "width": 320, "height": 180,
+                }]
+            elif method == "sendVideo":
+                message["video"] = {
+                    "file_id": f"video{message['message_id']}",
+                    "file_unique_id": f"v{message['message_id']}",
+                    "width": 1280, "height": 720, "duration": 60,
+                }
+            return message
+        if method in ("createChatInviteLink", "revokeChatInviteLink"):
+            link = params.get("invite_link")
+            if not link:
+                link = f"https://t.me/+fake{self._next_link_id}"
+                self._next_link_id += 1
+            result = {
+                "invite_link": link,
+                "creator": self.bot_user,
+                "creates_join_request": params.get("creates_join_request") == "true",
+                "is_primary": False,
+                "is_revoked": method == "revokeChatInviteLink",
+            }
+            if params.get("expire_date"):
+                result["expire_date"] = int(params["expire_date"])
+            if params.get("member_limit"):
+                result["member_limit"] = int(params["member_limit"])
+            return result
+        if method == "getChatMember":
+            user_id = int(params.get("user_id") or 0)
+            return {"status": self.member_status, "user": self._user(user_id)}
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = {
+                k: v if isinstance(v, str) else "<file>"
+                for k, v in (await request.post()).items()
+            }
+        self.calls[method] += 1
+
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+
+        await self._delay()
+        if method in _THROTTLED and random.random() < self.rate_429:
+            self.throttled[method] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+
+        result = self._result(method, params)
+        if method in _CHAT_REPLIES and params.get("chat_id"):
+            self._resolve("chat", int(params["chat_id"]), method, params)
+        elif method == "answerCallbackQuery":
+            self._resolve("callback", params.get("callback_query_id"), method, params)
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+
+async def serve(api: FakeTelegram, host: str, port: int) -> web.AppRunner:
+    """Start ``api`` on host:port and return the runner (call .cleanup())."""
+    runner = web.AppRunner(api.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def add_api_arguments(parser: argparse.ArgumentParser) -> None:
+    """CLI options shared with bench.load_driver."""
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--api-latency-ms", type=float, default=30.0,
+                        help="mean Bot API latency (default 30)")
+    parser.add_argument("--api-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--rate-429", type=float, default=0.0,
+                        help="fraction of sends answered with 429 (e.g. 0.01)")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--member-status", default="member",
+                        help="status returned by getChatMember")
+
+
+def api_from_args(args: argparse.Namespace) -> FakeTelegram:
+    return FakeTelegram(
+        latency_ms=args.api_latency_ms,
+        jitter_ms=args.api_jitter_ms,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        member_status=args.member_status,
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    api = api_from_args(args)
+    runner = await serve(api, args.host, args.api_port)
+    print(f"Fake Bot API on http://{args.host}:{args.api_port} (Ctrl-C to stop)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        print(json.dumps({"calls": api.calls, "throttled": api.throttled}, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    add_api_arguments(parser)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Benchmark Bunny Storage crawling and ShrinkMe shortening.
+
+Runs ``bench.fake_services`` in-process, points the bot's clients at it
+(``BUNNY_STORAGE_API_URL`` / ``SHRINKME_API_URL``) and measures the real
+``bot.utils`` code paths — no database or Telegram connection is made:
+
+  crawl    ``list_category_videos`` for every top-level category
+  scan     the admin Auto Get & Run scan (``scan_categories``), with
+           ``--posted-ratio`` of the files already posted
+  shorten  ``shorten_url`` for ``--shorten`` URLs, ``--concurrency`` at a
+           time (throughput, p50/p99, failures)
+
+    python -m bench.ingest_bench --categories 10 --fanout 4 --depth 3 \\
+        --bunny-latency-ms 40 --shorten 500 --concurrency 20 \\
+        --shrink-latency-ms 150 --shrink-fail-rate 0.02 --json ingest.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any
+
+from bench.common import configure_bot_env, print_table, summarize, write_json
+from bench.fake_services import (
+    FakeServices, add_service_arguments, count_files, serve, services_from_args,
+)
+
+
+async def _crawl(services: FakeServices, credentials: tuple[str, str, str], repeat: int):
+    from bot.utils.bunny_storage import list_category_videos
+
+    runs: list[float] = []
+    per_category: dict[str, list[float]] = {}
+    urls: list[str] = []
+    listings = services.listings
+    for i in range(repeat):
+        begin = time.perf_counter()
+        for name in services.manifest["tree"]:
+            start = time.perf_counter()
+            videos = await list_category_videos(name, credentials)
+            per_category.setdefault(name, []).append(time.perf_counter() - start)
+            if i == 0:
+                urls.extend(v["url"] for v in videos)
+        runs.append(time.perf_counter() - begin)
+    report = {
+        "videos": len(urls),
+        "listings_per_run": (services.listings - listings) // repeat,
+        **summarize(runs),
+        "categories": {name: summarize(t) for name, t in per_category.items()},
+    }
+    return report, urls
+
+
+async def _scan(
+    services: FakeServices, credentials: tuple[str, str, str],
+    urls: list[str], posted_ratio: float, repeat: int,
+) -> dict[str, Any]:
+    from bot.utils.bunny_storage import scan_categories
+
+    topics = [
+        {"topic_id": 1000 + i, "name": name}
+        for i, name in enumerate(services.manifest["tree"])
+    ]
+    exclude = set(random.sample(urls, int(len(urls) * posted_ratio)))
+    runs: list[float] = []
+    new_videos: list[dict] = []
+    listings = services.listings
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        new_videos, _summary = await scan_categories(topics, exclude, credentials)
+        runs.append(time.perf_counter() - begin)
+    return {
+        "topics": len(topics),
+        "excluded": len(exclude),
+        "new": len(new_videos),
+        "listings_per_run": (services.listings - listings) // repeat,
+        **summarize(runs),
+    }
+
+
+async def _shorten(
+    services: FakeServices, urls: list[str], total: int, concurrency: int,
+) -> dict[str, Any]:
+    from bot.utils.shortener import shorten_url
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failed = 0
+
+    async def one(url: str) -> None:
+        nonlocal failed
+        async with sem:
+            start = time.perf_counter()
+            short = await shorten_url(url, api_key="bench")
+            if short is None:
+                failed += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    targets = [urls[i % len(urls)] for i in range(total)] if urls else []
+    begin = time.perf_counter()
+    await asyncio.gather(*(one(u) for u in targets))
+    elapsed = time.perf_counter() - begin
+    return {
+        "requested": len(targets),
+        "failed": failed,
+        "server_failures": services.shrink_failures,
+        "concurrency": concurrency,
+        **summarize(latencies, elapsed),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    base = f"http://127.0.0.1:{args.port}"
+    configure_bot_env(
+        BUNNY_STORAGE_API_URL=f"{base}/bunny",
+        SHRINKME_API_URL=f"{base}/shrinkme/api",
+    )
+    services = services_from_args(args)
+    credentials = (services.manifest["api_key"], services.manifest["zone"], "")
+    dirs, files = count_files(services.manifest)
+    runner = await serve(services, "127.0.0.1", args.port)
+    try:
+        print(f"Crawling {len(services.manifest['tree'])} categories "
+              f"({dirs} folders, {files} files) …")
+        crawl, urls = await _crawl(services, credentials, args.repeat)
+        print("Running the Auto Get & Run scan …")
+        scan = await _scan(services, credentials, urls, args.posted_ratio, args.repeat)
+        print(f"Shortening {args.shorten} URLs, {args.concurrency} at a time …")
+        shorten = await _shorten(services, urls, args.shorten, args.concurrency)
+    finally:
+        await runner.cleanup()
+
+    return {
+        "tree": {"folders": dirs, "files": files},
+        "settings": {
+            "bunny_latency_ms": args.bunny_latency_ms,
+            "shrink_latency_ms": args.shrink_latency_ms,
+            "shrink_fail_rate": args.shrink_fail_rate,
+        },
+        "crawl": crawl,
+        "scan": scan,
+        "shorten": shorten,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark Bunny Storage crawling and ShrinkMe shortening against fake services.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="crawl/scan runs (default 3)")
+    parser.add_argument("--posted-ratio", type=float, default=0.5,
+                        help="share of files treated as already posted in the scan")
+    parser.add_argument("--shorten", type=int, default=200, help="URLs to shorten (default 200)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    add_service_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print()
+    print_table(
+        [
+            {"phase": "crawl", "items": report["crawl"]["videos"],
+             "requests": report["crawl"]["listings_per_run"], **report["crawl"]},
+            {"phase": "scan", "items": report["scan"]["new"],
+             "requests": report["scan"]["listings_per_run"], **report["scan"]},
+        ],
+        ["phase", "items", "requests", "count", "p50_ms", "max_ms"],
+    )
+    print()
+    print_table(
+        [{"phase": "shorten", **report["shorten"]}],
+        ["phase", "requested", "count", "failed", "per_sec", "p50_ms", "p99_ms", "max_ms"],
+    )
+    if args.json:
+        write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Replay synthetic user traffic against a real bot process.
+
+Starts the fake Bot API (``bench.fake_telegram``) in-process and, unless
+``--no-spawn`` is given, launches ``python -m bot`` with
+``TELEGRAM_API_URL`` pointing at it. Scenarios fire open-loop at fixed
+rates (``--rate name=per_second``):
+
+  start     ``/start ref_<id>`` from a new user (referrer = earlier user)
+  check     "check_req" callback from a user who has started
+  download  ``/start dl_<video_id>`` from a user whose check passed
+  redirect  GET of a redirect link returned by a download reply
+
+Latency runs from injecting the update (or sending the HTTP request) to
+the bot's first reply to that chat / its callback answer / the HTTP
+response. Throughput and p50/p99 per scenario are printed at the end.
+
+The bot still needs a real PostgreSQL database (use a scratch one). For
+the download and redirect scenarios set ``REQUIRED_REFERRALS`` to ``0``,
+``AFFILIATE_LINK`` and ``REDIRECT_BASE_URL=http://127.0.0.1:8080``, and
+pass existing video ids with ``--video-id``.
+
+    python -m bench.load_driver --duration 60 \\
+        --rate start=20 --rate check=10 --rate download=10 --rate redirect=5 \\
+        --video-id 1 --video-id 2 --rate-429 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+
+from bench.common import print_table, summarize, write_json
+from bench.fake_telegram import FakeTelegram, add_api_arguments, api_from_args, serve
+
+SCENARIOS = ("start", "check", "download", "redirect")
+FIRST_USER_ID = 7_000_000_000  # synthetic user ids start here
+
+
+@dataclass
+class Scenario:
+    name: str
+    sent: int = 0
+    timeouts: int = 0
+    skipped: int = 0  # no eligible user / link yet
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)  # redirect only
+
+
+@dataclass
+class Context:
+    api: FakeTelegram
+    http: aiohttp.ClientSession
+    reply_timeout: float
+    video_ids: list[int]
+    next_user_id: int = FIRST_USER_ID
+    started: list[int] = field(default_factory=list)
+    verified: list[int] = field(default_factory=list)
+    redirect_urls: list[str] = field(default_factory=list)
+
+    def new_user(self) -> int:
+        self.next_user_id += 1
+        return self.next_user_id
+
+
+async def _await_reply(
+    ctx: Context, scenario: Scenario, future: asyncio.Future, started: float,
+) -> tuple[str, dict[str, Any]] | None:
+    try:
+        reply = await asyncio.wait_for(future, ctx.reply_timeout)
+    except asyncio.TimeoutError:
+        scenario.timeouts += 1
+        return None
+    scenario.latencies.append(time.perf_counter() - started)
+    return reply
+
+
+async def _start(ctx: Context, scenario: Scenario) -> None:
+    user_id = ctx.new_user()
+    text = f"/start ref_{random.choice(ctx.started)}" if ctx.started else "/start"
+    reply = ctx.api.expect_chat(user_id)
+    started = time.perf_counter()
+    ctx.api.push_message(user_id, text)
+    if await _await_reply(ctx, scenario, reply, started):
+        ctx.started.append(user_id)
+
+
+async def _check(ctx: Context, scenario: Scenario) -> None:
+    if not ctx.started:
+        scenario.skipped += 1
+        return
+    user_id = random.choice(ctx.started)
+    started = time.perf_counter()
+    callback_id = ctx.api.push_callback(user_id, "check_req")
+    reply = ctx.api.expect_callback(callback_id)
+    result = await _await_reply(ctx, scenario, reply, started)
+    # Alerts mean "not registered" / "invite failed"; a plain answer means verified
+    if result and result[1].get("show_alert") not in ("true", True):
+        ctx.verified.append(user_id)
+
+
+async def _download(ctx: Context, scenario: Scenario) -> None:
+    if not ctx.verified or not ctx.video_ids:
+        scenario.skipped += 1
+        return
+    user_id = random.choice(ctx.verified)
+    reply = ctx.api.expect_chat(user_id)
+    started = time.perf_counter()
+    ctx.api.push_message(user_id, f"/start dl_{random.choice(ctx.video_ids)}")
+    result = await _await_reply(ctx, scenario, reply, started)
+    if result is None:
+        return
+    markup = result[1].get("reply_markup")
+    if isinstance(markup, str):
+        markup = json.loads(markup)
+    for row in (markup or {}).get("inline_keyboard", []):
+        for button in row:
+            url = button.get("url") or ""
+            if url.startswith("http") and "t.me/" not in url:
+                ctx.redirect_urls.append(url)
+
+
+async def _redirect(ctx: Context, scenario: Scenario) -> None:
+    if not ctx.redirect_urls:
+        scenario.skipped += 1
+        return
+    url = ctx.redirect_urls.pop(random.randrange(len(ctx.redirect_urls)))
+    started = time.perf_counter()
+    try:
+        async with ctx.http.get(
+            url, allow_redirects=False, timeout=aiohttp.ClientTimeout(total=ctx.reply_timeout),
+        ) as resp:
+            await resp.read()
+            scenario.statuses[resp.status] += 1
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        scenario.errors += 1
+        return
+    scenario.latencies.append(time.perf_counter() - started)
+
+
+_RUNNERS: dict[str, Callable[[Context, Scenario], Awaitable[None]]] = {
+    "start": _start,
+    "check": _check,
+    "download": _download,
+    "redirect": _redirect,
+}
+
+
+async def _fire(
+    ctx: Context, scenario: Scenario, rate: float, duration: float,
+) -> None:
+    """Launch one scenario instance every 1/rate seconds for ``duration``."""
+    loop = asyncio.get_running_loop()
+    runner = _RUNNERS[scenario.name]
+    tasks: set[asyncio.Task] = set()
+    begin = loop.time()
+    n = 0
+    while loop.time() - begin < duration:
+        task = asyncio.create_task(runner(ctx, scenario))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        scenario.sent += 1
+        n += 1
+        await asyncio.sleep(max(0.0, begin + n / rate - loop.time()))
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def _parse_rates(values: list[str]) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for value in values:
+        name, _, per_sec = value.partition("=")
+        if name not in SCENARIOS or not per_sec:
+            raise SystemExit(f"--rate expects one of {', '.join(SCENARIOS)} as name=per_second")
+        rates[name] = float(per_sec)
+    return rates
+
+
+async def _spawn_bot(api_port: int, log_path: str | None) -> asyncio.subprocess.Process:
+    env = {**os.environ, "TELEGRAM_API_URL": f"http://127.0.0.1:{api_port}"}
+    out = open(log_path, "ab") if log_path else asyncio.subprocess.DEVNULL
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "bot", env=env, stdout=out, stderr=asyncio.subprocess.STDOUT,
+    )
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    rates = _parse_rates(args.rate or ["start=10", "check=5"])
+    api = api_from_args(args)
+    runner = await serve(api, "127.0.0.1", args.api_port)
+    bot_proc = None
+    try:
+        if not args.no_spawn:
+            bot_proc = await _spawn_bot(args.api_port, args.bot_log)
+        print(f"Waiting for the bot to poll http://127.0.0.1:{args.api_port} …")
+        await asyncio.wait_for(api.polling.wait(), args.startup_timeout)
+
+        async with aiohttp.ClientSession() as http:
+            ctx = Context(
+                api=api, http=http, reply_timeout=args.reply_timeout, video_ids=args.video_id,
+            )
+            scenarios = {name: Scenario(name) for name in rates}
+            print(f"Running {', '.join(f'{n}={r}/s' for n, r in rates.items())} "
+                  f"for {args.duration:.0f}s …")
+            begin = time.perf_counter()
+            await asyncio.gather(*(
+                _fire(ctx, scenarios[name], rate, args.duration) for name, rate in rates.items()
+            ))
+            elapsed = time.perf_counter() - begin
+    finally:
+        if bot_proc is not None and bot_proc.returncode is None:
+            bot_proc.terminate()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(bot_proc.wait(), 15)
+        await runner.cleanup()
+
+    report = {
+        "duration_s": round(elapsed, 2),
+        "scenarios": {
+            s.name: {
+                "sent": s.sent,
+                "timeouts": s.timeouts,
+                "skipped": s.skipped,
+                "errors": s.errors,
+                **summarize(s.latencies, elapsed),
+                **({"statuses": dict(s.statuses)} if s.statuses else {}),
+            }
+            for s in scenarios.values()
+        },
+        "api_calls": dict(api.calls),
+        "api_429": dict(api.throttled),
+    }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay synthetic traffic against python -m bot via a fake Bot API.",
+    )
+    parser.add_argument("--rate", action="append", metavar="NAME=PER_SEC",
+                        help=f"scenario rate; names: {', '.join(SCENARIOS)} (repeatable)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds (default 30)")
+    parser.add_argument("--video-id", type=int, action="append", default=[],
+                        help="existing video id for the download scenario (repeatable)")
+    parser.add_argument("--reply-timeout", type=float, default=10.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--no-spawn", action="store_true",
+                        help="don't start python -m bot; one is already pointed at --api-port")
+    parser.add_argument("--bot-log", help="append the spawned bot's output to this file")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    add_api_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print()
+    print_table(
+        [{"scenario": name, **data} for name, data in report["scenarios"].items()],
+        ["scenario", "sent", "count", "timeouts", "skipped", "errors",
+         "per_sec", "p50_ms", "p99_ms", "max_ms"],
+    )
+    print(f"\nBot API calls: {report['api_calls']}")
+    if report["api_429"]:
+        print(f"Injected 429s: {report['api_429']}")
+    if args.json:
+        write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
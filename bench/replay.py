@@ -0,0 +1,295 @@
+"""Replay recorded updates through the real dispatcher, with profiling.
+
+Feeds a recording made with ``RECORD_UPDATES_PATH`` (see
+``bot/update_recorder.py``) into the Dispatcher from
+``bot.dispatcher.create_dispatcher`` — every router and middleware the
+bot runs with — in-process. Bot API calls go to the fake server from
+``bench.fake_telegram`` (no latency by default); the database must be a
+scratch copy since handlers write to it. The notifier, invite pool and
+topic registry run as in production; the scheduler does not.
+
+Profiling (``--profile``):
+  cprofile     cProfile over the whole replay; top functions by
+               cumulative time are printed, ``--profile-out`` saves the
+               stats for snakeviz / pstats
+  tracemalloc  allocation profile: top allocation sites, plus peak and
+               retained bytes per handler
+
+Per-handler wall time (count, p50/p99, total) is always reported and
+saved with ``--json``, so a run before and after a change can be
+compared. Allocation figures are exact only with ``--concurrency 1``.
+
+    python -m bench.replay updates.jsonl --dsn postgres://localhost/rated_bench \\
+        --keep-admins --profile cprofile --profile-out replay.prof --json replay.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+
+from bench.common import configure_bot_env, print_table, summarize, write_json
+from bench.datagen import dsn_from_args
+from bench.fake_telegram import add_api_arguments, api_from_args, serve
+
+logger = logging.getLogger("bench.replay")
+
+
+def load_recording(path: str) -> list[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class HandlerProfile(BaseMiddleware):
+    """Inner middleware collecting wall time and allocations per handler."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.alloc_peak: dict[str, list[int]] = defaultdict(list)
+        self.alloc_net: dict[str, list[int]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: dict[str, Any],
+    ) -> Any:
+        from bot.middleware import handler_name
+
+        name = handler_name(data)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.errors[name] += 1
+            raise
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                self.alloc_peak[name].append(peak - before)
+                self.alloc_net[name].append(current - before)
+
+    def report(self) -> dict[str, Any]:
+        out = {}
+        for name, latencies in sorted(
+            self.latencies.items(), key=lambda kv: sum(kv[1]), reverse=True,
+        ):
+            entry = {**summarize(latencies), "total_ms": round(sum(latencies) * 1000, 1)}
+            if self.errors.get(name):
+                entry["errors"] = self.errors[name]
+            if self.alloc_peak.get(name):
+                peaks, nets = self.alloc_peak[name], self.alloc_net[name]
+                entry["alloc_peak_kb"] = round(sum(peaks) / len(peaks) / 1024, 1)
+                entry["alloc_net_kb"] = round(sum(nets) / len(nets) / 1024, 1)
+            out[name] = entry
+        return out
+
+
+async def _set_admins(pool, records: list[dict[str, Any]]) -> list[int]:
+    """Make the recording's admins (pseudonymized) admins of the scratch DB."""
+    from bot.db import config_repo
+
+    admins = sorted({
+        r["update"][kind]["from"]["id"]
+        for r in records if r.get("admin")
+        for kind in ("message", "callback_query")
+        if kind in r["update"]
+    })
+    if admins:
+        await config_repo.set_config(pool, "ADMIN_IDS", ",".join(map(str, admins)))
+    return admins
+
+
+async def _feed(
+    dp, bot, records: list[dict[str, Any]], concurrency: int, speed: float,
+) -> dict[str, int]:
+    from aiogram.dispatcher.event.bases import UNHANDLED
+    from aiogram.types import Update
+
+    counts = {"handled": 0, "unhandled": 0, "failed": 0}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(record: dict[str, Any]) -> None:
+        try:
+            update = Update.model_validate(record["update"], context={"bot": bot})
+            result = await dp.feed_update(bot, update)
+        except Exception as e:
+            counts["failed"] += 1
+            logger.debug("Update %s failed: %r", record["update"].get("update_id"), e)
+        else:
+            counts["unhandled" if result is UNHANDLED else "handled"] += 1
+        finally:
+            sem.release()
+
+    loop = asyncio.get_running_loop()
+    begin = loop.time()
+    tasks = []
+    for record in records:
+        if speed > 0:
+            await asyncio.sleep(max(0.0, begin + record["at"] / speed - loop.time()))
+        await sem.acquire()
+        tasks.append(asyncio.create_task(one(record)))
+    await asyncio.gather(*tasks)
+    return counts
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    import asyncpg
+
+    import bot.config as bot_config
+    from bot.dispatcher import create_bot, create_dispatcher
+    from bot.invite_pool import start_invite_pool
+    from bot.notifier import start_notifier
+    from bot.topic_registry import start_topic_registry
+
+    records = load_recording(args.recording)
+    if args.limit:
+        records = records[: args.limit]
+    records = records * args.repeat
+
+    api = api_from_args(args)
+    api_runner = await serve(api, "127.0.0.1", args.api_port)
+    pool = await asyncpg.create_pool(dsn_from_args(args), min_size=2, max_size=10)
+    bot = create_bot(f"http://127.0.0.1:{args.api_port}")
+    background: list[asyncio.Task] = []
+    profiler = cProfile.Profile() if args.profile == "cprofile" else None
+    try:
+        dp = create_dispatcher(pool)
+        handlers = HandlerProfile()
+        for observer in (dp.message, dp.callback_query, dp.chat_join_request, dp.chat_member):
+            observer.middleware(handlers)
+
+        admins = await _set_admins(pool, records) if args.keep_admins else []
+        bot_config.bot_username = (await bot.get_me()).username
+        background = [
+            asyncio.create_task(start_notifier(bot)),
+            asyncio.create_task(start_invite_pool(bot)),
+            asyncio.create_task(start_topic_registry(pool)),
+        ]
+        await asyncio.sleep(0.5)  # let the topic registry load
+
+        print(f"Replaying {len(records)} updates …")
+        if args.profile == "tracemalloc":
+            tracemalloc.start(args.traceback_depth)
+        elif profiler is not None:
+            profiler.enable()
+        begin = time.perf_counter()
+        counts = await _feed(dp, bot, records, args.concurrency, args.speed)
+        elapsed = time.perf_counter() - begin
+        if profiler is not None:
+            profiler.disable()
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        tracemalloc.stop()
+    finally:
+        for task in background:
+            task.cancel()
+        for task in background:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await bot.session.close()
+        await pool.close()
+        await api_runner.cleanup()
+
+    report: dict[str, Any] = {
+        "recording": args.recording,
+        "updates": len(records),
+        "concurrency": args.concurrency,
+        "profile": args.profile,
+        "duration_s": round(elapsed, 2),
+        "per_sec": round(len(records) / elapsed, 1) if elapsed else 0.0,
+        **counts,
+        "admins": len(admins),
+        "handlers": handlers.report(),
+        "api_calls": dict(api.calls),
+    }
+    if profiler is not None:
+        stats = pstats.Stats(profiler)
+        if args.profile_out:
+            stats.dump_stats(args.profile_out)
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(args.top)
+        report["cprofile"] = out.getvalue()
+    if snapshot is not None:
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        report["allocations"] = [
+            {
+                "site": str(stat.traceback[0]),
+                "kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[: args.top]
+        ]
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay recorded updates through the dispatcher, with profiling.",
+    )
+    parser.add_argument("recording", help="JSON-lines file written via RECORD_UPDATES_PATH")
+    parser.add_argument("--dsn", help="scratch database (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--profile", choices=("none", "cprofile", "tracemalloc"), default="none")
+    parser.add_argument("--profile-out", help="save cProfile stats here (for pstats/snakeviz)")
+    parser.add_argument("--top", type=int, default=25, help="profile rows to show (default 25)")
+    parser.add_argument("--traceback-depth", type=int, default=1,
+                        help="tracemalloc frames kept per allocation")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="updates in flight at once (default 1, sequential)")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="replay at recorded pace × SPEED (default 0: as fast as possible)")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the recording N times")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N updates")
+    parser.add_argument("--keep-admins", action="store_true",
+                        help="set ADMIN_IDS in the scratch DB to the recording's admins")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    add_api_arguments(parser)
+    parser.set_defaults(api_latency_ms=0.0, api_jitter_ms=0.0)
+    args = parser.parse_args()
+
+    configure_bot_env(DATABASE_URL=dsn_from_args(args))
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)-8s %(name)s — %(message)s")
+    report = asyncio.run(run(args))
+
+    print(f"\n{report['updates']} updates in {report['duration_s']}s "
+          f"({report['per_sec']}/s): {report['handled']} handled, "
+          f"{report['unhandled']} unhandled, {report['failed']} failed")
+    columns = ["handler", "count", "total_ms", "p50_ms", "p99_ms", "max_ms"]
+    if args.profile == "tracemalloc":
+        columns += ["alloc_peak_kb", "alloc_net_kb"]
+    print()
+    print_table([{"handler": n, **h} for n, h in report["handlers"].items()], columns)
+    if "cprofile" in report:
+        print()
+        print(report["cprofile"])
+    if "allocations" in report:
+        print()
+        print_table(report["allocations"], ["site", "kb", "count"])
+    if args.json:
+        write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""Time every repository function at several dataset sizes.
+
+For each ``--scales`` entry (default ``10k,100k,1m`` users) the scratch
+database is regenerated with ``bench.datagen`` and each ``user_repo``,
+``video_repo``, ``schedule_repo``, ``referral_repo``, ``topic_repo`` and
+``stats_repo`` function is called ``--iterations`` times in sequence
+(aggregate queries fewer times) with ids sampled from the data. Reads
+run first; writes (``--read-only`` skips them) and the maintenance
+deletes last, since they change the data. ``video_repo`` lookups drop
+the video cache entry first so they reach the database.
+
+The report (dataset sizes plus count/p50/p90/p99/max per function and
+scale) is printed and, with ``--json``, saved; ``--compare old.json``
+prints the p50 change against an earlier run.
+
+    python -m bench.repo_bench --dsn postgres://localhost/rated_bench \\
+        --init-schema --scales 10k,100k,1m --json repo.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+import asyncpg
+
+from bench.common import configure_bot_env, print_table, summarize, write_json
+from bench.datagen import (
+    ADMIN_ID, add_spec_arguments, dsn_from_args, generate, init_schema, spec_from_args,
+)
+
+WARMUP = 3  # untimed calls per case
+
+
+@dataclass
+class Sample:
+    """Ids drawn from the dataset; the bench picks from these at random."""
+
+    users: list[int]
+    referrers: list[int]
+    videos: list[asyncpg.Record]  # video_id, code, file_url, category
+    sessions: list[asyncpg.Record]  # session_id, user_id, video_id
+    topics: list[asyncpg.Record]  # topic_id, name, thread_id
+    all_topic: int | None
+    schedules: list[asyncpg.Record]  # schedule_id, file_url
+    pending: list[int]
+    oldest_download: datetime | None
+    next_user_id: int
+    counter: int = 0
+    created_topics: list[int] = field(default_factory=list)
+    rng: random.Random = field(default_factory=lambda: random.Random(7))
+
+    def user(self) -> int:
+        return self.rng.choice(self.users)
+
+    def video(self) -> asyncpg.Record:
+        return self.rng.choice(self.videos)
+
+    def session(self) -> asyncpg.Record:
+        return self.rng.choice(self.sessions)
+
+    def topic(self) -> asyncpg.Record:
+        return self.rng.choice(self.topics)
+
+    def schedule(self) -> asyncpg.Record:
+        return self.rng.choice(self.schedules)
+
+    def new_user_id(self) -> int:
+        self.next_user_id += 1
+        return self.next_user_id
+
+    def unique(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+async def _sample(pool: asyncpg.Pool) -> Sample:
+    async def ids(sql: str) -> list:
+        return [r[0] for r in await pool.fetch(sql)]
+
+    return Sample(
+        users=await ids("SELECT user_id FROM users ORDER BY random() LIMIT 2000"),
+        referrers=await ids(
+            "SELECT user_id FROM users WHERE referral_count > 0 ORDER BY random() LIMIT 500"
+        ),
+        videos=await pool.fetch(
+            "SELECT video_id, code, file_url, category FROM videos ORDER BY random() LIMIT 500"
+        ),
+        sessions=await pool.fetch(
+            "SELECT session_id, user_id, video_id FROM download_sessions "
+            "ORDER BY random() LIMIT 2000"
+        ),
+        topics=await pool.fetch("SELECT topic_id, name, thread_id FROM topics WHERE NOT is_all"),
+        all_topic=await pool.fetchval("SELECT topic_id FROM topics WHERE is_all LIMIT 1"),
+        schedules=await pool.fetch(
+            "SELECT schedule_id, file_url FROM scheduled_videos ORDER BY random() LIMIT 500"
+        ),
+        pending=await ids("SELECT schedule_id FROM scheduled_videos WHERE status = 'pending'"),
+        oldest_download=await pool.fetchval("SELECT MIN(download_date) FROM downloads"),
+        next_user_id=await pool.fetchval("SELECT COALESCE(MAX(user_id), 0) FROM users") + 1,
+    )
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[asyncpg.Pool, Sample], Awaitable[Any]]
+    heavy: bool = False  # aggregate query: iterations / 20
+    writes: bool = False
+
+
+def _cases() -> list[Case]:
+    from bot.db import (
+        referral_repo, schedule_repo, stats_repo, topic_repo, user_repo, video_repo,
+    )
+    from bot.utils import video_cache
+
+    async def get_video(pool, s):
+        v = s.video()
+        video_cache.invalidate(v["video_id"])
+        return await video_repo.get_video(pool, v["video_id"])
+
+    async def get_video_by_code(pool, s):
+        v = s.video()
+        video_cache.invalidate(v["video_id"])
+        return await video_repo.get_video_by_code(pool, v["code"])
+
+    async def cancel_schedule(pool, s):
+        schedule_id = s.pending.pop() if s.pending else s.schedule()["schedule_id"]
+        return await schedule_repo.cancel_schedule(pool, schedule_id)
+
+    async def create_topic(pool, s):
+        row = await topic_repo.create_topic(pool, f"Bench {s.unique()}")
+        s.created_topics.append(row["topic_id"])
+        return row
+
+    async def delete_topic(pool, s):
+        # Deletes the topics create_topic made; 0 (a no-op) once they run out
+        topic_id = s.created_topics.pop() if s.created_topics else 0
+        return await topic_repo.delete_topic(pool, topic_id)
+
+    async def set_all_topic(pool, s):
+        # Re-set the current All topic so the dataset is unchanged
+        return await topic_repo.set_all_topic(pool, s.all_topic or s.topic()["topic_id"])
+
+    snapshot: dict[str, Any] = {}
+
+    async def save_snapshot(pool, s):
+        if not snapshot:  # computed during the untimed warm-up call
+            snapshot.update(await stats_repo.compute_stats(pool))
+        return await stats_repo.save_snapshot(pool, snapshot)
+
+    def bulk_items(s: Sample, n: int) -> list[tuple]:
+        at = _now() + timedelta(days=1)
+        items = []
+        for _ in range(n):
+            t = s.topic()
+            u = s.unique()
+            items.append((f"bench {u}", t["name"], f"https://bench.invalid/bulk/{u}.mp4",
+                          str(t["topic_id"]), at))
+        return items
+
+    return [
+        # --- reads -------------------------------------------------------
+        Case("user_repo.get_user", lambda p, s: user_repo.get_user(p, s.user())),
+        Case("user_repo.get_referral_count",
+             lambda p, s: user_repo.get_referral_count(p, s.user())),
+        Case("user_repo.is_verified", lambda p, s: user_repo.is_verified(p, s.user())),
+        Case("user_repo.is_ready_to_join", lambda p, s: user_repo.is_ready_to_join(p, s.user())),
+        Case("user_repo.is_approved", lambda p, s: user_repo.is_approved(p, s.user())),
+        Case("user_repo.get_language", lambda p, s: user_repo.get_language(p, s.user())),
+        Case("user_repo.get_membership_batch",
+             lambda p, s: user_repo.get_membership_batch(p, s.user())),
+        Case("user_repo.get_user_stats", lambda p, s: user_repo.get_user_stats(p), heavy=True),
+        Case("referral_repo.referral_exists",
+             lambda p, s: referral_repo.referral_exists(p, s.rng.choice(s.referrers), s.user())),
+        Case("referral_repo.get_referral_count",
+             lambda p, s: referral_repo.get_referral_count(p, s.rng.choice(s.referrers))),
+        Case("video_repo.get_video", get_video),
+        Case("video_repo.get_video_by_code", get_video_by_code),
+        Case("video_repo.get_video_by_url",
+             lambda p, s: video_repo.get_video_by_url(p, s.video()["file_url"])),
+        Case("video_repo.get_video_count", lambda p, s: video_repo.get_video_count(p)),
+        Case("video_repo.get_recent_videos", lambda p, s: video_repo.get_recent_videos(p)),
+        Case("video_repo.get_all_file_urls",
+             lambda p, s: video_repo.get_all_file_urls(p), heavy=True),
+        Case("video_repo.get_download_session",
+             lambda p, s: video_repo.get_download_session(p, s.session()["session_id"])),
+        Case("video_repo.get_active_session",
+             lambda p, s: video_repo.get_active_session(
+                 p, s.session()["user_id"], s.video()["video_id"])),
+        Case("video_repo.get_rollup_start", lambda p, s: video_repo.get_rollup_start(p)),
+        Case("video_repo.get_download_stats",
+             lambda p, s: video_repo.get_download_stats(p), heavy=True),
+        Case("topic_repo.get_all_topics", lambda p, s: topic_repo.get_all_topics(p)),
+        Case("topic_repo.get_topic_by_name",
+             lambda p, s: topic_repo.get_topic_by_name(p, s.topic()["name"])),
+        Case("topic_repo.get_topic_by_id",
+             lambda p, s: topic_repo.get_topic_by_id(p, s.topic()["topic_id"])),
+        Case("topic_repo.get_all_topic", lambda p, s: topic_repo.get_all_topic(p)),
+        Case("topic_repo.get_topic_count", lambda p, s: topic_repo.get_topic_count(p)),
+        Case("topic_repo.generate_prefix",
+             lambda p, s: topic_repo.generate_prefix(p, f"{s.topic()['name']} {s.unique()}")),
+        Case("schedule_repo.get_pending_videos", lambda p, s: schedule_repo.get_pending_videos(p)),
+        Case("schedule_repo.get_due_backlog", lambda p, s: schedule_repo.get_due_backlog(p)),
+        Case("schedule_repo.get_upcoming_schedules",
+             lambda p, s: schedule_repo.get_upcoming_schedules(p)),
+        Case("schedule_repo.get_queue_page", lambda p, s: schedule_repo.get_queue_page(p)),
+        Case("schedule_repo.get_queue_page (after)",
+             lambda p, s: schedule_repo.get_queue_page(p, after_id=s.schedule()["schedule_id"])),
+        Case("schedule_repo.queue_has_before",
+             lambda p, s: schedule_repo.queue_has_before(p, s.schedule()["schedule_id"])),
+        Case("schedule_repo.get_status_counts",
+             lambda p, s: schedule_repo.get_status_counts(p), heavy=True),
+        Case("schedule_repo.get_scheduled_urls",
+             lambda p, s: schedule_repo.get_scheduled_urls(p), heavy=True),
+        Case("schedule_repo.get_scheduled_by_url",
+             lambda p, s: schedule_repo.get_scheduled_by_url(p, s.schedule()["file_url"])),
+        Case("schedule_repo.get_schedule_by_id",
+             lambda p, s: schedule_repo.get_schedule_by_id(p, s.schedule()["schedule_id"])),
+        Case("stats_repo.get_snapshot", lambda p, s: stats_repo.get_snapshot(p)),
+        Case("stats_repo.compute_stats", lambda p, s: stats_repo.compute_stats(p), heavy=True),
+        # --- writes ------------------------------------------------------
+        Case("user_repo.create_user",
+             lambda p, s: user_repo.create_user(
+                 p, (uid := s.new_user_id()), None, "Bench",
+                 f"https://t.me/bench_bot?start=ref_{uid}", s.user()),
+             writes=True),
+        Case("referral_repo.register_with_referral",
+             lambda p, s: referral_repo.register_with_referral(
+                 p, (uid := s.new_user_id()), None, "Bench",
+                 f"https://t.me/bench_bot?start=ref_{uid}", s.rng.choice(s.referrers)),
+             writes=True),
+        Case("referral_repo.add_referral",
+             lambda p, s: referral_repo.add_referral(p, s.user(), s.user()), writes=True),
+        Case("user_repo.increment_referral_count",
+             lambda p, s: user_repo.increment_referral_count(p, s.user()), writes=True),
+        Case("user_repo.set_language",
+             lambda p, s: user_repo.set_language(p, s.user(), "en"), writes=True),
+        Case("user_repo.set_ready_to_join",
+             lambda p, s: user_repo.set_ready_to_join(p, s.user(), False), writes=True),
+        Case("user_repo.approve_join_request",
+             lambda p, s: user_repo.approve_join_request(p, s.user()), writes=True),
+        Case("user_repo.revert_join_approval",
+             lambda p, s: user_repo.revert_join_approval(p, s.user()), writes=True),
+        Case("user_repo.set_joined_supergroup",
+             lambda p, s: user_repo.set_joined_supergroup(p, s.user()), writes=True),
+        Case("user_repo.set_left_supergroup",
+             lambda p, s: user_repo.set_left_supergroup(p, s.user()), writes=True),
+        Case("user_repo.set_verification_complete",
+             lambda p, s: user_repo.set_verification_complete(p, s.user()), writes=True),
+        Case("user_repo.claim_newly_qualified",
+             lambda p, s: user_repo.claim_newly_qualified(p, 1), heavy=True, writes=True),
+        Case("video_repo.generate_video_code",
+             lambda p, s: video_repo.generate_video_code(p, s.topic()["name"]), writes=True),
+        Case("video_repo.create_video",
+             lambda p, s: video_repo.create_video(
+                 p, f"bench {(u := s.unique())}", (t := s.topic())["name"], None,
+                 f"https://bench.invalid/video/{u}.mp4", t["topic_id"]),
+             writes=True),
+        Case("video_repo.increment_views",
+             lambda p, s: video_repo.increment_views(p, s.video()["video_id"]), writes=True),
+        Case("video_repo.increment_downloads",
+             lambda p, s: video_repo.increment_downloads(p, s.video()["video_id"]), writes=True),
+        Case("video_repo.set_shortened_url",
+             lambda p, s: video_repo.set_shortened_url(
+                 p, s.video()["video_id"], f"https://shrinkme.io/b{s.unique()}"),
+             writes=True),
+        Case("video_repo.get_or_create_download_session",
+             lambda p, s: video_repo.get_or_create_download_session(
+                 p, s.user(), s.video()["video_id"]),
+             writes=True),
+        Case("video_repo.create_download_session",
+             lambda p, s: video_repo.create_download_session(
+                 p, s.user(), s.video()["video_id"]),
+             writes=True),
+        Case("video_repo.create_completed_download_session",
+             lambda p, s: video_repo.create_completed_download_session(
+                 p, s.user(), s.video()["video_id"]),
+             writes=True),
+        Case("video_repo.mark_visited",
+             lambda p, s: video_repo.mark_visited(p, s.session()["session_id"]), writes=True),
+        Case("video_repo.mark_affiliate_visited",
+             lambda p, s: video_repo.mark_affiliate_visited(p, s.session()["session_id"]),
+             writes=True),
+        Case("video_repo.set_message_id",
+             lambda p, s: video_repo.set_message_id(
+                 p, s.video()["video_id"], s.unique(), s.topic()["topic_id"]),
+             writes=True),
+        Case("video_repo.set_thumbnail_file_id",
+             lambda p, s: video_repo.set_thumbnail_file_id(
+                 p, s.video()["video_id"], f"bench-thumb-{s.unique()}"),
+             writes=True),
+        Case("video_repo.mark_video_sent",
+             lambda p, s: video_repo.mark_video_sent(p, s.session()["session_id"]), writes=True),
+        Case("video_repo.log_download",
+             lambda p, s: video_repo.log_download(
+                 p, (d := s.session())["user_id"], d["video_id"], d["session_id"], True),
+             writes=True),
+        Case("video_repo.roll_up_downloads",
+             lambda p, s: video_repo.roll_up_downloads(
+                 p, _now().replace(minute=0, second=0, microsecond=0), _now()),
+             heavy=True, writes=True),
+        Case("topic_repo.set_thread_id",
+             lambda p, s: topic_repo.set_thread_id(
+                 p, (t := s.topic())["topic_id"], t["thread_id"]),
+             writes=True),
+        Case("topic_repo.create_topic", create_topic, writes=True),
+        Case("topic_repo.delete_topic", delete_topic, writes=True),
+        Case("topic_repo.set_all_topic", set_all_topic, writes=True),
+        Case("schedule_repo.create_scheduled_video",
+             lambda p, s: schedule_repo.create_scheduled_video(
+                 p, f"bench {(u := s.unique())}", (t := s.topic())["name"], None,
+                 f"https://bench.invalid/queued/{u}.mp4", None, None, None,
+                 str(t["topic_id"]), _now() + timedelta(days=1), ADMIN_ID),
+             writes=True),
+        Case("schedule_repo.create_scheduled_videos_bulk (500)",
+             lambda p, s: schedule_repo.create_scheduled_videos_bulk(
+                 p, bulk_items(s, 500), ADMIN_ID),
+             heavy=True, writes=True),
+        Case("schedule_repo.update_schedule_status",
+             lambda p, s: schedule_repo.update_schedule_status(
+                 p, s.schedule()["schedule_id"], "failed", "bench"),
+             writes=True),
+        Case("schedule_repo.cancel_schedule", cancel_schedule, writes=True),
+        Case("stats_repo.save_snapshot", save_snapshot, writes=True),
+        Case("stats_repo.refresh_snapshot",
+             lambda p, s: stats_repo.refresh_snapshot(p), heavy=True, writes=True),
+        # --- maintenance deletes (change the dataset; keep last) ---------
+        Case("video_repo.delete_downloads_before",
+             lambda p, s: video_repo.delete_downloads_before(
+                 p, (s.oldest_download or _now()) - timedelta(days=1)),
+             heavy=True, writes=True),
+        Case("video_repo.delete_expired_sessions",
+             lambda p, s: video_repo.delete_expired_sessions(p, 3600),
+             heavy=True, writes=True),
+    ]
+
+
+async def run_suite(
+    pool: asyncpg.Pool, iterations: int, read_only: bool, only: list[str],
+) -> dict[str, Any]:
+    """Run every case against the current data; returns name -> summary."""
+    sample = await _sample(pool)
+    if not sample.users or not sample.videos or not sample.sessions:
+        raise SystemExit("The database has no users/videos/sessions; run bench.datagen first.")
+
+    results: dict[str, Any] = {}
+    for case in _cases():
+        if read_only and case.writes:
+            continue
+        if only and not any(case.name.startswith(prefix) for prefix in only):
+            continue
+        n = max(3, iterations // 20) if case.heavy else iterations
+        for _ in range(WARMUP):
+            await case.run(pool, sample)
+        latencies = []
+        for _ in range(n):
+            start = time.perf_counter()
+            await case.run(pool, sample)
+            latencies.append(time.perf_counter() - start)
+        results[case.name] = summarize(latencies)
+        print(f"  {case.name}: p50 {results[case.name]['p50_ms']} ms", file=sys.stderr)
+    return results
+
+
+def _parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * factor)
+
+
+def _compare(old: dict[str, Any], new: dict[str, Any]) -> None:
+    rows = []
+    for scale, run in new["scales"].items():
+        before = old.get("scales", {}).get(scale, {}).get("cases", {})
+        for name, summary in run["cases"].items():
+            if name not in before or not before[name]["p50_ms"]:
+                continue
+            was, now = before[name]["p50_ms"], summary["p50_ms"]
+            rows.append({
+                "scale": scale, "case": name, "old_p50": was, "new_p50": now,
+                "change": f"{(now - was) / was * 100:+.0f}%",
+            })
+    print()
+    print_table(rows, ["scale", "case", "old_p50", "new_p50", "change"])
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    pool = await asyncpg.create_pool(dsn_from_args(args), min_size=2, max_size=10)
+    report: dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "server_version": await pool.fetchval("SHOW server_version"),
+        "iterations": args.iterations,
+        "read_only": args.read_only,
+        "scales": {},
+    }
+    try:
+        if args.init_schema:
+            await init_schema(pool)
+        if args.no_generate:
+            users = await pool.fetchval("SELECT COUNT(*) FROM users")
+            plan = [(users, None)]
+        else:
+            plan = [(n, spec_from_args(args, n)) for n in map(_parse_scale, args.scales.split(","))]
+
+        for users, spec in plan:
+            entry: dict[str, Any] = {}
+            if spec is not None:
+                print(f"Generating {users} users …", file=sys.stderr)
+                entry["dataset"] = await generate(pool, spec, reset=True)
+                entry["spec"] = asdict(spec)
+            print(f"Benchmarking at {users} users …", file=sys.stderr)
+            entry["cases"] = await run_suite(pool, args.iterations, args.read_only, args.only)
+            report["scales"][str(users)] = entry
+    finally:
+        await pool.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time every repository function at several dataset sizes.",
+    )
+    parser.add_argument("--scales", default="10k,100k,1m",
+                        help="comma-separated user counts (default 10k,100k,1m)")
+    parser.add_argument("--no-generate", action="store_true",
+                        help="benchmark the data already in the database")
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="timed calls per function (aggregates: 1/20th)")
+    parser.add_argument("--read-only", action="store_true", help="skip functions that write")
+    parser.add_argument("--only", action="append", default=[], metavar="PREFIX",
+                        help="only cases starting with PREFIX, e.g. user_repo (repeatable)")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    parser.add_argument("--compare", help="earlier --json report to compare p50s against")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    configure_bot_env(DATABASE_URL=dsn_from_args(args))
+    report = asyncio.run(run(args))
+    for scale, entry in report["scales"].items():
+        print(f"\n{scale} users")
+        print_table(
+            [{"case": name, **summary} for name, summary in entry["cases"].items()],
+            ["case", "count", "p50_ms", "p90_ms", "p99_ms", "max_ms"],
+        )
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            _compare(json.load(f), report)
+    if args.json:
+        write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,27 +4,25 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import sys
 
 from aiohttp import web
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
 
 import bot.config as bot_config
 from bot.config import settings
 from bot.db.pool import create_pool, close_pool
-from bot.handlers import register_routers
+from bot.dispatcher import create_bot, create_dispatcher
 from bot.scheduler import start_scheduler
+from bot.notifier import start_notifier
+from bot.invite_pool import start_invite_pool
+from bot.topic_registry import start_topic_registry
+from bot.loop_monitor import start_loop_monitor
 from bot.web import create_web_app, set_bot
-from bot.middleware import MaintenanceMiddleware
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)-8s | %(name)s — %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    stream=sys.stdout,
-)
+from bot.update_recorder import UpdateRecorderMiddleware
+from bot.metrics import instrument_repos
+from bot.log_config import setup_logging, stop_logging
+
+# Log records are written by a background thread (see bot/log_config.py)
+setup_logging(settings.log_level, settings.log_format, settings.log_sample)
 logger = logging.getLogger(__name__)
 
 WEB_PORT = 8080
@@ -34,29 +32,30 @@ async def main() -> None:
     """Initialise DB pool, register handlers, start polling + web server."""
     logger.info("Starting Zona Rated Bot …")
 
-    # Database
+    # Database (repo calls are timed for /metrics)
+    instrument_repos()
     pool = await create_pool()
     logger.info("Database pool ready")
 
     # Bot & Dispatcher
-    bot = Bot(
-        token=settings.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
-    )
-    dp = Dispatcher()
+    bot = create_bot()
+    if settings.telegram_api_url:
+        logger.info("Using Bot API server %s", settings.telegram_api_url)
+    dp = create_dispatcher(pool)
+
+    # Record anonymized updates for offline replay (bench/replay.py)
+    recorder = None
+    if settings.record_updates_path:
+        recorder = UpdateRecorderMiddleware(
+            settings.record_updates_path, settings.record_updates_salt,
+        )
+        dp.update.outer_middleware(recorder)
 
     # Resolve bot username once at startup
     me = await bot.get_me()
     bot_config.bot_username = me.username
     logger.info("Bot username: @%s", me.username)
 
-    # Register all routers
-    register_routers(dp)
-
-    # Register maintenance middleware (outer, runs before handlers)
-    dp.message.outer_middleware(MaintenanceMiddleware())
-    dp.callback_query.outer_middleware(MaintenanceMiddleware())
-
     # Share bot instance with web server
     set_bot(bot)
 
@@ -75,15 +74,34 @@ async def main() -> None:
         # Start background scheduler (cron jobs)
         scheduler_task = asyncio.create_task(start_scheduler(bot))
 
+        # Start background notification queue
+        notifier_task = asyncio.create_task(start_notifier(bot))
+
+        # Keep pre-generated invite links topped up
+        invite_pool_task = asyncio.create_task(start_invite_pool(bot))
+
+        # Keep the in-memory topic registry in sync (LISTEN topics_changed)
+        topic_registry_task = asyncio.create_task(start_topic_registry(pool))
+
+        # Measure event-loop lag; log the blocking stack on stalls
+        loop_monitor_task = asyncio.create_task(start_loop_monitor())
+
         logger.info("Polling started")
         await dp.start_polling(bot)
     finally:
         logger.info("Shutting down …")
         scheduler_task.cancel()
+        notifier_task.cancel()
+        invite_pool_task.cancel()
+        topic_registry_task.cancel()
+        loop_monitor_task.cancel()
+        if recorder is not None:
+            recorder.close()
         await runner.cleanup()
         await close_pool()
         await bot.session.close()
         logger.info("Bye!")
+        stop_logging()
 
 
 if __name__ == "__main__":
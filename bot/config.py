@@ -28,6 +28,14 @@ class Settings:
     database_url: str
     bunny_cdn_hostname: str
     bunny_token_key: str
+    telegram_api_url: str
+    bunny_storage_api_url: str
+    shrinkme_api_url: str
+    record_updates_path: str
+    record_updates_salt: str
+    log_level: str
+    log_format: str
+    log_sample: str
 
 
 settings = Settings(
@@ -36,6 +44,14 @@ settings = Settings(
     database_url=_require("DATABASE_URL"),
     bunny_cdn_hostname=os.getenv("BUNNY_CDN_HOSTNAME", ""),
     bunny_token_key=os.getenv("BUNNY_TOKEN_KEY", ""),
+    telegram_api_url=os.getenv("TELEGRAM_API_URL", ""),
+    bunny_storage_api_url=os.getenv("BUNNY_STORAGE_API_URL", ""),
+    shrinkme_api_url=os.getenv("SHRINKME_API_URL", ""),
+    record_updates_path=os.getenv("RECORD_UPDATES_PATH", ""),
+    record_updates_salt=os.getenv("RECORD_UPDATES_SALT", ""),
+    log_level=os.getenv("LOG_LEVEL", "INFO"),
+    log_format=os.getenv("LOG_FORMAT", "text"),
+    log_sample=os.getenv("LOG_SAMPLE", ""),
 )
 
 # Resolved at startup via bot.get_me(); used for deep-link URLs.
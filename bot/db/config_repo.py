@@ -14,6 +14,14 @@ async def get_config(pool: asyncpg.Pool, key: str) -> Optional[str]:
     )
 
 
+async def get_configs(pool: asyncpg.Pool, *keys: str) -> dict[str, str]:
+    """Get several config values in one query (missing keys are omitted)."""
+    rows = await pool.fetch(
+        "SELECT key, value FROM config WHERE key = ANY($1::varchar[])", list(keys)
+    )
+    return {r["key"]: r["value"] for r in rows if r["value"] is not None}
+
+
 async def get_config_int(pool: asyncpg.Pool, key: str, default: int = 0) -> int:
     """Get a config value as integer, with a fallback default."""
     val = await get_config(pool, key)
@@ -50,6 +58,11 @@ async def get_invite_expiry(pool: asyncpg.Pool) -> int:
     return await get_config_int(pool, "INVITE_EXPIRY_SECONDS", default=300)
 
 
+async def get_invite_pool_size(pool: asyncpg.Pool) -> int:
+    """Shortcut: get INVITE_POOL_SIZE (default 20, 0 = create links on demand)."""
+    return await get_config_int(pool, "INVITE_POOL_SIZE", default=20)
+
+
 async def get_admin_ids(pool: asyncpg.Pool) -> list[int]:
     """Shortcut: get ADMIN_IDS as a list of ints."""
     raw = await get_config(pool, "ADMIN_IDS")
@@ -94,6 +107,36 @@ async def get_redirect_base_url(pool: asyncpg.Pool) -> str:
     return await get_config(pool, "REDIRECT_BASE_URL") or ""
 
 
+async def get_fsm_state_ttl_hours(pool: asyncpg.Pool) -> int:
+    """Shortcut: get FSM_STATE_TTL_HOURS (default 24)."""
+    return await get_config_int(pool, "FSM_STATE_TTL_HOURS", default=24)
+
+
+async def get_membership_reconcile_hours(pool: asyncpg.Pool) -> int:
+    """Shortcut: get MEMBERSHIP_RECONCILE_HOURS (default 0 = disabled)."""
+    return await get_config_int(pool, "MEMBERSHIP_RECONCILE_HOURS", default=0)
+
+
+async def get_download_retention_months(pool: asyncpg.Pool) -> int:
+    """Shortcut: get DOWNLOAD_RETENTION_MONTHS (default 0 = keep everything)."""
+    return await get_config_int(pool, "DOWNLOAD_RETENTION_MONTHS", default=0)
+
+
+async def get_stats_api_token(pool: asyncpg.Pool) -> str:
+    """Shortcut: get STATS_API_TOKEN (empty string = stats endpoint disabled)."""
+    return await get_config(pool, "STATS_API_TOKEN") or ""
+
+
+async def get_slow_update_ms(pool: asyncpg.Pool) -> int:
+    """Shortcut: get SLOW_UPDATE_MS (default 1000, 0 = slow-update log off)."""
+    return await get_config_int(pool, "SLOW_UPDATE_MS", default=1000)
+
+
+async def get_slow_query_ms(pool: asyncpg.Pool) -> int:
+    """Shortcut: get SLOW_QUERY_MS (default 500, 0 = no EXPLAIN sampling)."""
+    return await get_config_int(pool, "SLOW_QUERY_MS", default=500)
+
+
 async def get_all_config(pool: asyncpg.Pool) -> list:
     """Get all config rows ordered by key."""
     return await pool.fetch("SELECT key, value, description FROM config ORDER BY key")
@@ -0,0 +1,78 @@
+"""Repository for the `fsm_states` table — persistent aiogram FSM storage."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+import asyncpg
+
+
+async def get_fsm_state(pool: asyncpg.Pool, storage_key: str) -> Optional[str]:
+    """Return the stored FSM state name for a key (None if unset)."""
+    return await pool.fetchval(
+        "SELECT state FROM fsm_states WHERE storage_key = $1", storage_key
+    )
+
+
+async def get_fsm_data(pool: asyncpg.Pool, storage_key: str) -> dict[str, Any]:
+    """Return the stored FSM data dict for a key (empty if unset)."""
+    raw = await pool.fetchval(
+        "SELECT data FROM fsm_states WHERE storage_key = $1", storage_key
+    )
+    return json.loads(raw) if raw else {}
+
+
+async def write_fsm_batch(
+    pool: asyncpg.Pool,
+    upserts: list[tuple[str, bool, Optional[str], Optional[str]]],
+    deletes: list[str],
+) -> None:
+    """Apply a batch of coalesced FSM writes in one transaction.
+
+    Each upsert is ``(storage_key, has_state, state, data_json)``.
+    ``has_state`` says whether *state* should overwrite the stored value;
+    ``data_json`` of None leaves the stored data untouched.
+    """
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if deletes:
+                await conn.execute(
+                    "DELETE FROM fsm_states WHERE storage_key = ANY($1::varchar[])",
+                    deletes,
+                )
+            if upserts:
+                await conn.executemany(
+                    """
+                    INSERT INTO fsm_states (storage_key, state, data, updated_at)
+                    VALUES ($1, $3, COALESCE($4::jsonb, '{}'::jsonb), NOW())
+                    ON CONFLICT (storage_key) DO UPDATE
+                        SET state = CASE WHEN $2 THEN EXCLUDED.state
+                                         ELSE fsm_states.state END,
+                            data = COALESCE($4::jsonb, fsm_states.data),
+                            updated_at = NOW()
+                    """,
+                    upserts,
+                )
+
+
+async def delete_stale_fsm_states(
+    pool: asyncpg.Pool, ttl_seconds: int, limit: int = 1000
+) -> int:
+    """Delete up to *limit* FSM rows untouched for longer than the TTL.
+
+    Returns the number of rows deleted.
+    """
+    result = await pool.execute(
+        """
+        DELETE FROM fsm_states
+        WHERE storage_key IN (
+            SELECT storage_key FROM fsm_states
+            WHERE updated_at < NOW() - make_interval(secs => $1)
+            LIMIT $2
+        )
+        """,
+        ttl_seconds,
+        limit,
+    )
+    return int(result.split()[-1])
@@ -0,0 +1,137 @@
+"""Repository for the `invite_links` table — pre-generated one-time invites.
+
+Rows with ``user_id IS NULL`` form the pool of spare links created in the
+background by ``bot.invite_pool``; claiming a link assigns it to a user.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import asyncpg
+
+
+async def claim_invite_link(
+    pool: asyncpg.Pool, user_id: int, min_seconds_left: int
+) -> Optional[asyncpg.Record]:
+    """Hand a user an invite link with at least *min_seconds_left* of validity.
+
+    A link already assigned to the user (unused, still valid) is returned
+    again; otherwise the pooled link closest to expiry is claimed.
+    Returns a record with ``invite_link`` and ``seconds_left``, or None if
+    the pool is empty.
+    """
+    return await pool.fetchrow(
+        """
+        WITH mine AS (
+            SELECT invite_link, expires_at
+            FROM invite_links
+            WHERE user_id = $1 AND NOT used
+              AND expires_at > NOW() + make_interval(secs => 60)
+            ORDER BY expires_at DESC
+            LIMIT 1
+        ),
+        claimed AS (
+            UPDATE invite_links SET user_id = $1
+            WHERE id = (
+                SELECT id FROM invite_links
+                WHERE user_id IS NULL
+                  AND expires_at > NOW() + make_interval(secs => $2)
+                  AND NOT EXISTS (SELECT 1 FROM mine)
+                ORDER BY expires_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING invite_link, expires_at
+        )
+        SELECT invite_link,
+               EXTRACT(EPOCH FROM expires_at - NOW())::int AS seconds_left
+        FROM (SELECT * FROM mine UNION ALL SELECT * FROM claimed) AS picked
+        LIMIT 1
+        """,
+        user_id,
+        min_seconds_left,
+    )
+
+
+async def add_invite_links(
+    pool: asyncpg.Pool,
+    links: list[tuple[str, int]],
+    user_id: Optional[int] = None,
+) -> None:
+    """Store freshly created links as ``(invite_link, expire_unix_ts)`` pairs.
+
+    With *user_id* None the links go into the spare pool.
+    """
+    await pool.executemany(
+        """
+        INSERT INTO invite_links (user_id, invite_link, expires_at)
+        VALUES ($1, $2, to_timestamp($3))
+        """,
+        [(user_id, link, expire) for link, expire in links],
+    )
+
+
+async def count_pooled_links(pool: asyncpg.Pool, min_seconds_left: int) -> int:
+    """Count spare links that can still be handed out."""
+    return await pool.fetchval(
+        """
+        SELECT COUNT(*) FROM invite_links
+        WHERE user_id IS NULL
+          AND expires_at > NOW() + make_interval(secs => $1)
+        """,
+        min_seconds_left,
+    )
+
+
+async def take_stale_pooled_links(
+    pool: asyncpg.Pool, min_seconds_left: int, limit: int = 50
+) -> list[str]:
+    """Remove spare links too close to expiry to hand out.
+
+    Returns the links that are still valid on Telegram's side so the
+    caller can revoke them.
+    """
+    rows = await pool.fetch(
+        """
+        DELETE FROM invite_links
+        WHERE id IN (
+            SELECT id FROM invite_links
+            WHERE user_id IS NULL
+              AND expires_at <= NOW() + make_interval(secs => $1)
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING invite_link, expires_at > NOW() AS live
+        """,
+        min_seconds_left,
+        limit,
+    )
+    return [r["invite_link"] for r in rows if r["live"]]
+
+
+async def delete_expired_links(pool: asyncpg.Pool, limit: int = 1000) -> int:
+    """Delete up to *limit* handed-out links whose expiry has passed.
+
+    Returns the number of rows deleted.
+    """
+    result = await pool.execute(
+        """
+        DELETE FROM invite_links
+        WHERE id IN (
+            SELECT id FROM invite_links
+            WHERE user_id IS NOT NULL AND expires_at < NOW()
+            LIMIT $1
+        )
+        """,
+        limit,
+    )
+    return int(result.split()[-1])
+
+
+async def mark_link_used(pool: asyncpg.Pool, invite_link: str) -> None:
+    """Flag an invite link as used (someone joined through it)."""
+    await pool.execute(
+        "UPDATE invite_links SET used = TRUE WHERE invite_link = $1",
+        invite_link,
+    )
@@ -0,0 +1,113 @@
+"""Maintenance helpers for range-partitioned tables.
+
+Partitions are named ``{table}_p{YYYYMMDD}`` (daily) or ``{table}_p{YYYYMM}``
+(monthly) and cover ``[start, next start)`` of the partition key.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+
+import asyncpg
+
+_FORMATS = {"day": "%Y%m%d", "month": "%Y%m"}
+
+
+def _period_start(day: date, period: str) -> date:
+    return day.replace(day=1) if period == "month" else day
+
+
+def _next_start(start: date, period: str) -> date:
+    if period == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return date.fromordinal(start.toordinal() + 1)
+
+
+def partition_name(table: str, start: date, period: str) -> str:
+    """Name of the partition of *table* that starts at *start*."""
+    return f"{table}_p{start.strftime(_FORMATS[period])}"
+
+
+async def is_partitioned(pool: asyncpg.Pool, table: str) -> bool:
+    """True if *table* exists and is a partitioned table."""
+    return await pool.fetchval(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table
+            WHERE partrelid = to_regclass($1)
+        )
+        """,
+        table,
+    )
+
+
+async def ensure_partitions(
+    pool: asyncpg.Pool, table: str, period: str, today: date, ahead: int
+) -> None:
+    """Create partitions from *today*'s period through *ahead* periods later."""
+    start = _period_start(today, period)
+    for _ in range(ahead + 1):
+        end = _next_start(start, period)
+        await pool.execute(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(table, start, period)} "
+            f"PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+
+
+async def list_partitions(
+    pool: asyncpg.Pool, table: str, period: str
+) -> list[tuple[str, date]]:
+    """Return ``(name, start)`` for each of our partitions, oldest first."""
+    rows = await pool.fetch(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+        ORDER BY c.relname
+        """,
+        table,
+    )
+    fmt = _FORMATS[period]
+    prefix = f"{table}_p"
+    result: list[tuple[str, date]] = []
+    for row in rows:
+        name = row["relname"]
+        if not name.startswith(prefix):
+            continue  # e.g. a DEFAULT partition
+        try:
+            start = datetime.strptime(name[len(prefix):], fmt).date()
+        except ValueError:
+            continue
+        result.append((name, start))
+    return result
+
+
+async def detach_partitions_before(
+    pool: asyncpg.Pool, table: str, period: str, cutoff: date, drop: bool = False
+) -> list[str]:
+    """Detach partitions whose whole range lies before *cutoff*.
+
+    Detached partitions stay behind as standalone tables (e.g. for
+    archiving with pg_dump) unless *drop* is set. Returns their names.
+    """
+    retired: list[str] = []
+    for name, start in await list_partitions(pool, table, period):
+        if _next_start(start, period) > cutoff:
+            break
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                if drop:
+                    await conn.execute(f"DROP TABLE {name}")
+        retired.append(name)
+    return retired
+
+
+async def drop_partitions_before(
+    pool: asyncpg.Pool, table: str, period: str, cutoff: date
+) -> list[str]:
+    """Detach and drop partitions whose whole range lies before *cutoff*."""
+    return await detach_partitions_before(pool, table, period, cutoff, drop=True)
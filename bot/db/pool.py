@@ -5,6 +5,7 @@ from __future__ import annotations
 import asyncpg
 
 from bot.config import settings
+from bot.db.query_stats import InstrumentedConnection
 
 _pool: asyncpg.Pool | None = None
 
@@ -17,6 +18,7 @@ async def create_pool() -> asyncpg.Pool:
             dsn=settings.database_url,
             min_size=2,
             max_size=10,
+            connection_class=InstrumentedConnection,
         )
     return _pool
 
@@ -28,6 +30,11 @@ async def get_pool() -> asyncpg.Pool:
     return _pool
 
 
+def current_pool() -> asyncpg.Pool | None:
+    """Return the pool if it has been created, without creating one."""
+    return _pool
+
+
 async def close_pool() -> None:
     """Gracefully close all connections."""
     global _pool
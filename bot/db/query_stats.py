@@ -0,0 +1,269 @@
+"""Per-query statistics for repository SQL.
+
+The pool is created with ``InstrumentedConnection`` as its connection
+class, so every ``fetch`` / ``fetchrow`` / ``fetchval`` / ``execute`` /
+``executemany`` a repo function issues — through the pool or through an
+acquired connection inside a transaction — is recorded under the name of
+that function (``video_repo.get_video``; ``#2``, ``#3`` … for its further
+statements). ``bot.metrics.instrument_repos()`` sets the name.
+
+For each query we keep call and error counts, total time, rows returned
+and a window of recent latencies for percentiles. When a call takes
+longer than SLOW_QUERY_MS, a background task captures its plan (at most
+once per query every ``EXPLAIN_COOLDOWN`` seconds) and keeps it for the
+admin "Top Queries" report. Read-only statements are re-run as
+``EXPLAIN (ANALYZE, BUFFERS)`` inside a transaction that is rolled back;
+statements that write or lock rows (INSERT/UPDATE/DELETE, ``FOR UPDATE``
+claims, sequence calls) only get a plain ``EXPLAIN``, since re-running
+them would take row locks, fire triggers and consume sequence values.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time as _time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import asyncpg
+
+from bot.db import config_repo
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 256  # recent latencies kept per query for percentiles
+EXPLAIN_COOLDOWN = 10 * 60  # seconds between EXPLAINs of the same query
+EXPLAIN_TIMEOUT = "10s"  # statement_timeout for the EXPLAIN re-run
+_SETTINGS_TTL = 60  # seconds between SLOW_QUERY_MS reads
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# Anything that makes a statement unsafe to execute a second time
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|SHARE|NEXTVAL|SETVAL)\b", re.IGNORECASE)
+
+# Name of the repo function currently running (set by bot.metrics)
+repo_function: ContextVar[Optional[str]] = ContextVar("repo_function", default=None)
+
+
+@dataclass(slots=True)
+class QueryStats:
+    id: int
+    name: str
+    sql: str
+    calls: int = 0
+    errors: int = 0
+    total: float = 0.0  # seconds
+    max: float = 0.0
+    rows: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    plan: Optional[str] = None
+    plan_ms: float = 0.0  # duration of the call that triggered the EXPLAIN
+    plan_at: Optional[datetime] = None
+    plan_analyzed: bool = False  # EXPLAIN ANALYZE (actual figures) vs plain EXPLAIN
+    explained_at: float = 0.0  # monotonic
+
+    def percentile(self, p: float) -> float:
+        """Latency percentile in seconds over the recent window."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+# (function, sql) -> stats
+_stats: dict[tuple[str, str], QueryStats] = {}
+# function -> number of distinct statements seen (for "#n" names)
+_per_function: dict[str, int] = {}
+_settings: dict[str, Any] = {"ts": 0.0, "slow_ms": 500, "refreshing": False}
+_next_id = 0
+_tasks: set[asyncio.Task] = set()  # strong refs to background EXPLAIN/refresh tasks
+
+
+def _spawn(coro) -> None:
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _stats_for(function: str, sql: str) -> QueryStats:
+    global _next_id
+    stats = _stats.get((function, sql))
+    if stats is None:
+        n = _per_function.get(function, 0) + 1
+        _per_function[function] = n
+        _next_id += 1
+        name = function if n == 1 else f"{function} #{n}"
+        stats = _stats[(function, sql)] = QueryStats(id=_next_id, name=name, sql=sql)
+    return stats
+
+
+def _rows_from_status(status: Any) -> int:
+    """Row count from a command status such as ``'UPDATE 5'``."""
+    if isinstance(status, str):
+        last = status.rsplit(" ", 1)[-1]
+        if last.isdigit():
+            return int(last)
+    return 0
+
+
+async def _refresh_settings() -> None:
+    from bot.db.pool import get_pool
+
+    try:
+        pool = await get_pool()
+        _settings["slow_ms"] = await config_repo.get_slow_query_ms(pool)
+        _settings["ts"] = _time.monotonic()
+    except Exception:
+        logger.debug("Could not read SLOW_QUERY_MS", exc_info=True)
+    finally:
+        _settings["refreshing"] = False
+
+
+def _slow_threshold_ms() -> int:
+    """Cached SLOW_QUERY_MS; refreshed in the background when stale."""
+    if (
+        _time.monotonic() - _settings["ts"] >= _SETTINGS_TTL
+        and not _settings["refreshing"]
+    ):
+        _settings["refreshing"] = True
+        _spawn(_refresh_settings())
+    return _settings["slow_ms"]
+
+
+def _read_only(sql: str) -> bool:
+    """True if *sql* can safely be executed again for EXPLAIN ANALYZE."""
+    head = sql.lstrip().upper()
+    return head.startswith(("SELECT", "WITH")) and not _WRITES.search(sql)
+
+
+async def _explain(stats: QueryStats, args: tuple, elapsed: float) -> None:
+    from bot.db.pool import get_pool
+
+    repo_function.set(None)  # don't record the EXPLAIN itself
+    analyze = _read_only(stats.sql)
+    explain = "EXPLAIN (ANALYZE, BUFFERS)" if analyze else "EXPLAIN"
+    try:
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            tr = conn.transaction()
+            await tr.start()
+            try:
+                await conn.execute(f"SET LOCAL statement_timeout = '{EXPLAIN_TIMEOUT}'")
+                rows = await conn.fetch(f"{explain} {stats.sql}", *args)
+            finally:
+                await tr.rollback()
+    except Exception as e:
+        logger.info("EXPLAIN failed for %s: %s", stats.name, e)
+        return
+
+    stats.plan = "\n".join(r[0] for r in rows)
+    stats.plan_ms = elapsed * 1000
+    stats.plan_at = datetime.now(timezone.utc)
+    stats.plan_analyzed = analyze
+    logger.warning("Slow query %s (%.0f ms):\n%s", stats.name, stats.plan_ms, stats.plan)
+
+
+def _record(
+    sql: str, args: Optional[tuple], elapsed: float, rows: int, failed: bool,
+) -> None:
+    """Account one statement; ``args=None`` means it can't be EXPLAINed."""
+    function = repo_function.get()
+    if function is None:
+        return  # not issued by a repo function (pool internals, LISTEN, …)
+
+    stats = _stats_for(function, sql)
+    stats.calls += 1
+    stats.total += elapsed
+    stats.max = max(stats.max, elapsed)
+    stats.latencies.append(elapsed)
+    if failed:
+        stats.errors += 1
+        return
+    stats.rows += rows
+
+    threshold = _slow_threshold_ms()
+    now = _time.monotonic()
+    if (
+        threshold > 0
+        and elapsed * 1000 >= threshold
+        and args is not None
+        and now - stats.explained_at >= EXPLAIN_COOLDOWN
+        and sql.lstrip().upper().startswith(_EXPLAINABLE)
+    ):
+        stats.explained_at = now
+        _spawn(_explain(stats, args, elapsed))
+
+
+class InstrumentedConnection(asyncpg.Connection):
+    """asyncpg connection that records every statement in ``_stats``."""
+
+    async def fetch(self, query, *args, **kwargs):
+        start = _time.perf_counter()
+        try:
+            result = await super().fetch(query, *args, **kwargs)
+        except Exception:
+            _record(query, args, _time.perf_counter() - start, 0, True)
+            raise
+        _record(query, args, _time.perf_counter() - start, len(result), False)
+        return result
+
+    async def fetchrow(self, query, *args, **kwargs):
+        start = _time.perf_counter()
+        try:
+            result = await super().fetchrow(query, *args, **kwargs)
+        except Exception:
+            _record(query, args, _time.perf_counter() - start, 0, True)
+            raise
+        _record(query, args, _time.perf_counter() - start, int(result is not None), False)
+        return result
+
+    async def fetchval(self, query, *args, **kwargs):
+        start = _time.perf_counter()
+        try:
+            result = await super().fetchval(query, *args, **kwargs)
+        except Exception:
+            _record(query, args, _time.perf_counter() - start, 0, True)
+            raise
+        _record(query, args, _time.perf_counter() - start, int(result is not None), False)
+        return result
+
+    async def execute(self, query, *args, **kwargs):
+        start = _time.perf_counter()
+        try:
+            result = await super().execute(query, *args, **kwargs)
+        except Exception:
+            _record(query, args, _time.perf_counter() - start, 0, True)
+            raise
+        _record(query, args, _time.perf_counter() - start, _rows_from_status(result), False)
+        return result
+
+    async def executemany(self, command, args, **kwargs):
+        args = list(args)
+        start = _time.perf_counter()
+        try:
+            result = await super().executemany(command, args, **kwargs)
+        except Exception:
+            _record(command, None, _time.perf_counter() - start, 0, True)
+            raise
+        _record(command, None, _time.perf_counter() - start, len(args), False)
+        return result
+
+
+def top_queries(limit: int = 10) -> list[QueryStats]:
+    """Queries ordered by total time spent, highest first."""
+    return sorted(_stats.values(), key=lambda s: s.total, reverse=True)[:limit]
+
+
+def get_query(query_id: int) -> Optional[QueryStats]:
+    """Look up a query by the numeric id shown in the report."""
+    return next((s for s in _stats.values() if s.id == query_id), None)
+
+
+def reset() -> None:
+    """Forget all collected statistics."""
+    _stats.clear()
+    _per_function.clear()
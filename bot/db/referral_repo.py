@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Optional
 
 import asyncpg
 
@@ -65,3 +65,74 @@ async def get_referral_count(pool: asyncpg.Pool, user_id: int) -> int:
         user_id,
     )
     return val or 0
+
+
+async def register_with_referral(
+    pool: asyncpg.Pool,
+    user_id: int,
+    username: Optional[str],
+    first_name: Optional[str],
+    referral_link: str,
+    referrer_id: Optional[int] = None,
+) -> dict[str, Any]:
+    """Upsert a /start user and credit their referrer in one round trip.
+
+    Combines create_user + add_referral + the follow-up lookups into a
+    single statement. The referral is only credited when the referrer
+    exists, is not the user themself, and the pair is new.
+
+    Returns a dict with keys:
+        language           – the user's language (None for new users)
+        credited           – True if a new referral was recorded
+        referral_count     – referrer's new count (None if not credited)
+        referrer_language  – referrer's language (None if not credited)
+        required           – current REQUIRED_REFERRALS value
+    """
+    row = await pool.fetchrow(
+        """
+        WITH me AS (
+            INSERT INTO users (user_id, username, first_name, referral_link, referred_by)
+            VALUES ($1, $2, $3, $4,
+                    (SELECT user_id FROM users WHERE user_id = $5 AND user_id <> $1))
+            ON CONFLICT (user_id) DO UPDATE
+                SET username   = COALESCE(EXCLUDED.username, users.username),
+                    first_name = COALESCE(EXCLUDED.first_name, users.first_name),
+                    last_updated = NOW()
+            RETURNING language
+        ),
+        ref AS (
+            INSERT INTO referrals (referrer_user_id, referred_user_id)
+            SELECT user_id, $1 FROM users WHERE user_id = $5 AND user_id <> $1
+            ON CONFLICT (referrer_user_id, referred_user_id) DO NOTHING
+            RETURNING referrer_user_id
+        ),
+        bump AS (
+            UPDATE users
+            SET referral_count = referral_count + 1,
+                last_updated = NOW()
+            WHERE user_id IN (SELECT referrer_user_id FROM ref)
+            RETURNING referral_count, language
+        )
+        SELECT
+            (SELECT language FROM me)                                   AS language,
+            (SELECT referral_count FROM bump)                           AS referral_count,
+            (SELECT language FROM bump)                                 AS referrer_language,
+            (SELECT value FROM config WHERE key = 'REQUIRED_REFERRALS') AS required
+        """,
+        user_id,
+        username,
+        first_name,
+        referral_link,
+        referrer_id,
+    )
+    try:
+        required = int(row["required"]) if row["required"] is not None else 0
+    except ValueError:
+        required = 0
+    return {
+        "language": row["language"],
+        "credited": row["referral_count"] is not None,
+        "referral_count": row["referral_count"],
+        "referrer_language": row["referrer_language"],
+        "required": required,
+    }
@@ -2,11 +2,25 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
 from datetime import datetime, timezone
 from typing import Optional
 
 import asyncpg
 
+# Queue display order: pending → posting → posted → failed → cancelled.
+# Must match the idx_sv_queue expression index in schema.sql.
+_QUEUE_RANK = (
+    "(CASE status WHEN 'pending' THEN 0 WHEN 'posting' THEN 1 "
+    "WHEN 'posted' THEN 2 WHEN 'failed' THEN 3 ELSE 4 END)"
+)
+_QUEUE_KEY = (_QUEUE_RANK, "scheduled_at", "schedule_id")
+
+# Everything except the (large) thumbnail_b64 blob
+_LIST_COLUMNS = (
+    "schedule_id, title, category, status, scheduled_at, posted_at, error_message"
+)
+
 
 async def create_scheduled_video(
     pool: asyncpg.Pool,
@@ -44,6 +58,48 @@ async def create_scheduled_video(
     )
 
 
+# description, thumbnails and affiliate_link are left out and stay NULL
+_BULK_COLUMNS = (
+    "title", "category", "file_url", "topic_ids", "scheduled_at", "created_by",
+)
+
+
+async def create_scheduled_videos_bulk(
+    pool: asyncpg.Pool,
+    items: list[tuple[str, str | None, str, str, datetime]],
+    created_by: int,
+    on_progress: Callable[[int, int], None] | None = None,
+    chunk_size: int = 500,
+) -> int:
+    """Insert many scheduled videos in one transaction using COPY.
+
+    Each item is ``(title, category, file_url, topic_ids, scheduled_at)``.
+    Rows are streamed in chunks of *chunk_size* and *on_progress(done,
+    total)* is called after each chunk; either every row is inserted or
+    none. Returns the number of rows inserted.
+
+    *on_progress* runs inside the transaction, so it is a plain function:
+    anything slow (such as editing a Telegram message) must be scheduled
+    as a task by the caller, not awaited here.
+    """
+    records = [
+        (title, category, file_url, topic_ids, scheduled_at, created_by)
+        for title, category, file_url, topic_ids, scheduled_at in items
+    ]
+    total = len(records)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            for start in range(0, total, chunk_size):
+                await conn.copy_records_to_table(
+                    "scheduled_videos",
+                    records=records[start:start + chunk_size],
+                    columns=_BULK_COLUMNS,
+                )
+                if on_progress is not None:
+                    on_progress(min(start + chunk_size, total), total)
+    return total
+
+
 async def get_pending_videos(pool: asyncpg.Pool, limit: int = 5) -> list[asyncpg.Record]:
     """Fetch scheduled videos that are due for posting."""
     return await pool.fetch(
@@ -58,6 +114,20 @@ async def get_pending_videos(pool: asyncpg.Pool, limit: int = 5) -> list[asyncpg
     )
 
 
+async def get_due_backlog(pool: asyncpg.Pool) -> tuple[int, float]:
+    """Return (number of due pending videos, seconds the oldest has waited)."""
+    row = await pool.fetchrow(
+        """
+        SELECT COUNT(*) AS due,
+               COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(scheduled_at)), 0) AS oldest_wait
+        FROM scheduled_videos
+        WHERE status = 'pending'
+          AND scheduled_at <= NOW()
+        """
+    )
+    return row["due"], float(row["oldest_wait"])
+
+
 async def update_schedule_status(
     pool: asyncpg.Pool,
     schedule_id: int,
@@ -96,24 +166,73 @@ async def update_schedule_status(
 
 async def get_upcoming_schedules(pool: asyncpg.Pool, limit: int = 20) -> list[asyncpg.Record]:
     """Get upcoming and recent scheduled videos for the admin queue view."""
-    return await pool.fetch(
-        """
-        SELECT * FROM scheduled_videos
-        ORDER BY
-            CASE status
-                WHEN 'pending' THEN 0
-                WHEN 'posting' THEN 1
-                WHEN 'posted' THEN 2
-                WHEN 'failed' THEN 3
-                WHEN 'cancelled' THEN 4
-            END,
-            scheduled_at ASC
-        LIMIT $1
+    rows, _ = await get_queue_page(pool, limit=limit)
+    return rows
+
+
+async def get_queue_page(
+    pool: asyncpg.Pool,
+    *,
+    after_id: int | None = None,
+    before_id: int | None = None,
+    from_id: int | None = None,
+    limit: int = 20,
+) -> tuple[list[asyncpg.Record], bool]:
+    """Fetch one page of the admin queue using keyset pagination.
+
+    The cursor is a schedule_id: the page starts right after *after_id*,
+    ends right before *before_id*, or starts at *from_id* (inclusive).
+    Returns ``(rows, has_more)`` where *has_more* says whether further rows
+    exist in the direction of travel. Rows never include thumbnail_b64.
+    """
+    cursor_id = after_id or before_id or from_id
+    key = ", ".join(_QUEUE_KEY)
+    where = ""
+    if cursor_id is not None:
+        op = "<" if before_id else (">=" if from_id else ">")
+        where = (
+            f"WHERE ({key}) {op} "
+            f"(SELECT {key} FROM scheduled_videos WHERE schedule_id = $2)"
+        )
+    direction = "DESC" if before_id else "ASC"
+    order_by = ", ".join(f"{part} {direction}" for part in _QUEUE_KEY)
+    query = (
+        f"SELECT {_LIST_COLUMNS} FROM scheduled_videos {where} "
+        f"ORDER BY {order_by} LIMIT $1"
+    )
+    args = [limit + 1] + ([cursor_id] if cursor_id is not None else [])
+    rows = await pool.fetch(query, *args)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before_id:
+        rows.reverse()
+    return rows, has_more
+
+
+async def queue_has_before(pool: asyncpg.Pool, schedule_id: int) -> bool:
+    """True if any queue row sorts before *schedule_id* (one index probe)."""
+    key = ", ".join(_QUEUE_KEY)
+    return await pool.fetchval(
+        f"""
+        SELECT EXISTS (
+            SELECT 1 FROM scheduled_videos
+            WHERE ({key}) <
+                  (SELECT {key} FROM scheduled_videos WHERE schedule_id = $1)
+        )
         """,
-        limit,
+        schedule_id,
     )
 
 
+async def get_status_counts(pool: asyncpg.Pool) -> dict[str, int]:
+    """Exact number of scheduled videos per status."""
+    rows = await pool.fetch(
+        "SELECT status, COUNT(*) AS n FROM scheduled_videos GROUP BY status"
+    )
+    return {r["status"]: r["n"] for r in rows}
+
+
 async def cancel_schedule(pool: asyncpg.Pool, schedule_id: int) -> bool:
     """Cancel a pending scheduled video. Returns True if successful."""
     result = await pool.execute(
@@ -145,20 +264,21 @@ async def get_scheduled_by_url(pool: asyncpg.Pool, file_url: str):
     """
     from urllib.parse import unquote
     row = await pool.fetchrow(
-        "SELECT * FROM scheduled_videos WHERE file_url = $1 AND status IN ('pending', 'posting') LIMIT 1",
+        f"SELECT {_LIST_COLUMNS} FROM scheduled_videos WHERE file_url = $1 AND status IN ('pending', 'posting') LIMIT 1",
         file_url,
     )
     if row:
         return row
     decoded = unquote(file_url).strip()
     return await pool.fetchrow(
-        "SELECT * FROM scheduled_videos WHERE replace(file_url, '%20', ' ') = $1 AND status IN ('pending', 'posting') LIMIT 1",
+        f"SELECT {_LIST_COLUMNS} FROM scheduled_videos WHERE replace(file_url, '%20', ' ') = $1 AND status IN ('pending', 'posting') LIMIT 1",
         decoded,
     )
 
 
 async def get_schedule_by_id(pool: asyncpg.Pool, schedule_id: int) -> Optional[asyncpg.Record]:
-    """Fetch a scheduled video by ID."""
+    """Fetch a scheduled video by ID (without the thumbnail blob)."""
     return await pool.fetchrow(
-        "SELECT * FROM scheduled_videos WHERE schedule_id = $1", schedule_id
+        f"SELECT {_LIST_COLUMNS} FROM scheduled_videos WHERE schedule_id = $1",
+        schedule_id,
     )
@@ -0,0 +1,115 @@
+"""Repository for the `stats_snapshot` table — precomputed admin statistics.
+
+The scheduler periodically computes the dashboard numbers once and stores
+them as a single JSONB row; the admin panel and the web stats endpoint
+only ever read that row.
+
+Only the download figures are maintained incrementally (they are sums
+over ``download_rollups``). User counts and the funnel are recounted on
+each refresh: the verified/joined flags flip both ways and nothing
+records those transitions, so there is no delta to apply. That one
+``users`` scan runs in the scheduler, off the request path.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+import asyncpg
+
+TOP_VIDEOS = 5
+
+
+async def compute_stats(pool: asyncpg.Pool) -> dict[str, Any]:
+    """Compute a fresh statistics snapshot (one users scan, rollup sums)."""
+    users = await pool.fetchrow(
+        """
+        SELECT
+            COUNT(*)                                       AS total,
+            COUNT(*) FILTER (WHERE referred_by IS NOT NULL) AS referred,
+            COUNT(*) FILTER (WHERE verification_complete)  AS verified,
+            COUNT(*) FILTER (WHERE joined_supergroup)      AS joined
+        FROM users
+        """
+    )
+    downloads = await pool.fetchrow(
+        """
+        SELECT
+            COALESCE(SUM(downloads) FILTER (WHERE granularity = 'day'), 0)::bigint
+                AS total_downloads,
+            COALESCE(SUM(affiliate_clicks) FILTER (WHERE granularity = 'day'), 0)::bigint
+                AS affiliate_clicks,
+            COALESCE(SUM(new_users) FILTER (WHERE granularity = 'day'), 0)::bigint
+                AS unique_users,
+            COALESCE(SUM(new_videos) FILTER (WHERE granularity = 'day'), 0)::bigint
+                AS unique_videos,
+            COALESCE(SUM(downloads) FILTER (
+                WHERE granularity = 'hour' AND bucket >= NOW() - INTERVAL '24 hours'
+            ), 0)::bigint AS last_24h
+        FROM download_rollups
+        """
+    )
+    top = await pool.fetch(
+        """
+        SELECT code, title, downloads FROM videos
+        WHERE downloads > 0
+        ORDER BY downloads DESC
+        LIMIT $1
+        """,
+        TOP_VIDEOS,
+    )
+
+    total = users["total"]
+
+    def rate(n: int) -> float:
+        return round(n / total * 100, 1) if total else 0.0
+
+    return {
+        "users": dict(users),
+        "downloads": dict(downloads),
+        "top_videos": [dict(r) for r in top],
+        "funnel": {
+            "started": total,
+            "referred": users["referred"],
+            "verified": users["verified"],
+            "joined": users["joined"],
+            "referred_rate": rate(users["referred"]),
+            "verified_rate": rate(users["verified"]),
+            "joined_rate": rate(users["joined"]),
+        },
+    }
+
+
+async def save_snapshot(pool: asyncpg.Pool, data: dict[str, Any]) -> None:
+    """Replace the stored snapshot."""
+    await pool.execute(
+        """
+        INSERT INTO stats_snapshot (id, data, updated_at)
+        VALUES (1, $1::jsonb, NOW())
+        ON CONFLICT (id) DO UPDATE
+            SET data = EXCLUDED.data,
+                updated_at = NOW()
+        """,
+        json.dumps(data),
+    )
+
+
+async def get_snapshot(
+    pool: asyncpg.Pool,
+) -> Optional[tuple[dict[str, Any], datetime]]:
+    """Return ``(data, updated_at)`` of the stored snapshot, or None."""
+    row = await pool.fetchrow("SELECT data, updated_at FROM stats_snapshot WHERE id = 1")
+    if row is None:
+        return None
+    return json.loads(row["data"]), row["updated_at"]
+
+
+async def refresh_snapshot(
+    pool: asyncpg.Pool,
+) -> tuple[dict[str, Any], datetime]:
+    """Compute, store and return a fresh snapshot."""
+    data = await compute_stats(pool)
+    await save_snapshot(pool, data)
+    return await get_snapshot(pool)
@@ -1,4 +1,8 @@
-"""Repository for the `topics` table — category forum topics."""
+"""Repository for the `topics` table — category forum topics.
+
+Reads are served from the in-memory ``bot.topic_registry`` when it is
+loaded; every write here invalidates it.
+"""
 
 from __future__ import annotations
 
@@ -6,39 +10,79 @@ from typing import Optional
 
 import asyncpg
 
+from bot import topic_registry
+
 
 # ──────────────────────────────────────────────
 # Prefix generation
 # ──────────────────────────────────────────────
 
-async def generate_prefix(pool: asyncpg.Pool, name: str) -> str:
-    """Generate a unique prefix for a category name.
+PREFIX_MAX_LEN = 10  # topics.prefix is VARCHAR(10)
 
-    Logic:
-        1. Try the first letter (uppercase): e.g. Asia → A
-        2. If taken, try first 2 letters: e.g. Action → AC
-        3. If taken, try first 3 letters: e.g. Adventure → AD (wait, AD)...
-        4. Keep extending until unique (up to full name)
-    """
+
+class _PrefixTrie:
+    """Minimal character trie over the prefixes already in use."""
+
+    __slots__ = ("_root",)
+
+    _END = "$"
+
+    def __init__(self, words: list[str]) -> None:
+        self._root: dict = {}
+        for word in words:
+            node = self._root
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[self._END] = True
+
+    def __contains__(self, word: str) -> bool:
+        node = self._root
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                return False
+        return self._END in node
+
+
+def _pick_prefix(name: str, taken: _PrefixTrie) -> str:
+    """Choose the shortest free prefix for *name* (see generate_prefix)."""
     name_upper = name.upper()
-    for length in range(1, len(name_upper) + 1):
+    for length in range(1, min(len(name_upper), PREFIX_MAX_LEN) + 1):
         candidate = name_upper[:length]
-        existing = await pool.fetchval(
-            "SELECT 1 FROM topics WHERE prefix = $1", candidate
-        )
-        if not existing:
+        if candidate not in taken:
             return candidate
     # Fallback: append a number
     for i in range(2, 100):
         candidate = f"{name_upper[:2]}{i}"
-        existing = await pool.fetchval(
-            "SELECT 1 FROM topics WHERE prefix = $1", candidate
-        )
-        if not existing:
+        if candidate not in taken:
             return candidate
     raise ValueError(f"Could not generate unique prefix for '{name}'")
 
 
+async def generate_prefix(pool: asyncpg.Pool, name: str) -> str:
+    """Generate a unique prefix for a category name.
+
+    Logic:
+        1. Try the first letter (uppercase): e.g. Asia → A
+        2. If taken, try first 2 letters: e.g. Action → AC
+        3. If taken, try first 3 letters: e.g. Adventure → ADV
+        4. Keep extending until unique (up to full name)
+        5. Otherwise fall back to the first 2 letters plus a number
+
+    Every candidate starts with the first character of ``name.upper()``
+    (not ``name[0].upper()``, which differs for e.g. "ß" → "SS"), so all
+    prefixes that could clash are fetched in one query and checked in
+    memory.
+    """
+    if not name:
+        raise ValueError("Category name is empty")
+    rows = await pool.fetch(
+        "SELECT prefix FROM topics WHERE left(prefix, 1) = $1",
+        name.upper()[0],
+    )
+    return _pick_prefix(name, _PrefixTrie([r["prefix"] for r in rows]))
+
+
 # ──────────────────────────────────────────────
 # CRUD
 # ──────────────────────────────────────────────
@@ -49,23 +93,38 @@ async def create_topic(
     thread_id: Optional[int] = None,
     is_all: bool = False,
 ) -> asyncpg.Record:
-    """Insert a new category topic with auto-generated prefix. Returns the created row."""
-    prefix = await generate_prefix(pool, name)
-    return await pool.fetchrow(
-        """
-        INSERT INTO topics (name, prefix, thread_id, is_all)
-        VALUES ($1, $2, $3, $4)
-        RETURNING *
-        """,
-        name,
-        prefix,
-        thread_id,
-        is_all,
-    )
+    """Insert a new category topic with auto-generated prefix. Returns the created row.
+
+    The prefix is protected by its UNIQUE constraint; if a concurrent insert
+    takes it first, a new prefix is picked and the insert retried.
+    """
+    for _ in range(5):
+        prefix = await generate_prefix(pool, name)
+        try:
+            row = await pool.fetchrow(
+                """
+                INSERT INTO topics (name, prefix, thread_id, is_all)
+                VALUES ($1, $2, $3, $4)
+                RETURNING *
+                """,
+                name,
+                prefix,
+                thread_id,
+                is_all,
+            )
+            topic_registry.invalidate()
+            return row
+        except asyncpg.UniqueViolationError as e:
+            if "prefix" not in (e.constraint_name or ""):
+                raise  # duplicate category name
+    raise ValueError(f"Could not reserve a unique prefix for '{name}'")
 
 
 async def get_all_topics(pool: asyncpg.Pool) -> list[asyncpg.Record]:
     """Return all topics ordered by name."""
+    snapshot = topic_registry.current()
+    if snapshot is not None:
+        return list(snapshot.ordered)
     return await pool.fetch(
         "SELECT * FROM topics ORDER BY is_all DESC, name ASC"
     )
@@ -73,6 +132,9 @@ async def get_all_topics(pool: asyncpg.Pool) -> list[asyncpg.Record]:
 
 async def get_topic_by_name(pool: asyncpg.Pool, name: str) -> Optional[asyncpg.Record]:
     """Fetch a topic by its category name (case-insensitive)."""
+    snapshot = topic_registry.current()
+    if snapshot is not None:
+        return snapshot.by_name.get(name.lower())
     return await pool.fetchrow(
         "SELECT * FROM topics WHERE LOWER(name) = LOWER($1)", name
     )
@@ -80,6 +142,9 @@ async def get_topic_by_name(pool: asyncpg.Pool, name: str) -> Optional[asyncpg.R
 
 async def get_topic_by_id(pool: asyncpg.Pool, topic_id: int) -> Optional[asyncpg.Record]:
     """Fetch a topic by its internal ID."""
+    snapshot = topic_registry.current()
+    if snapshot is not None:
+        return snapshot.by_id.get(topic_id)
     return await pool.fetchrow(
         "SELECT * FROM topics WHERE topic_id = $1", topic_id
     )
@@ -87,6 +152,9 @@ async def get_topic_by_id(pool: asyncpg.Pool, topic_id: int) -> Optional[asyncpg
 
 async def get_all_topic(pool: asyncpg.Pool) -> Optional[asyncpg.Record]:
     """Fetch the special 'All Videos' topic."""
+    snapshot = topic_registry.current()
+    if snapshot is not None:
+        return snapshot.all_topic
     return await pool.fetchrow(
         "SELECT * FROM topics WHERE is_all = TRUE LIMIT 1"
     )
@@ -99,6 +167,18 @@ async def set_thread_id(pool: asyncpg.Pool, topic_id: int, thread_id: int) -> No
         topic_id,
         thread_id,
     )
+    topic_registry.invalidate()
+
+
+async def set_all_topic(pool: asyncpg.Pool, topic_id: int) -> None:
+    """Make *topic_id* the single 'All Videos' topic."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("UPDATE topics SET is_all = FALSE WHERE is_all = TRUE")
+            await conn.execute(
+                "UPDATE topics SET is_all = TRUE WHERE topic_id = $1", topic_id
+            )
+    topic_registry.invalidate()
 
 
 async def delete_topic(pool: asyncpg.Pool, topic_id: int) -> bool:
@@ -106,9 +186,13 @@ async def delete_topic(pool: asyncpg.Pool, topic_id: int) -> bool:
     result = await pool.execute(
         "DELETE FROM topics WHERE topic_id = $1", topic_id
     )
+    topic_registry.invalidate()
     return result == "DELETE 1"
 
 
 async def get_topic_count(pool: asyncpg.Pool) -> int:
     """Return the total number of topics."""
+    snapshot = topic_registry.current()
+    if snapshot is not None:
+        return len(snapshot.ordered)
     return await pool.fetchval("SELECT COUNT(*) FROM topics") or 0
@@ -89,6 +89,37 @@ async def set_verification_complete(pool: asyncpg.Pool, user_id: int) -> None:
     )
 
 
+async def claim_newly_qualified(
+    pool: asyncpg.Pool, required: int, limit: int = 500
+) -> list[asyncpg.Record]:
+    """Mark up to *limit* qualifying users verified and return them.
+
+    A user qualifies when referral_count >= required and they are not yet
+    verified. Claiming and flagging happen in one statement (backed by the
+    partial index idx_users_unverified_refs), and SKIP LOCKED keeps
+    concurrent scanners from claiming the same rows.
+    """
+    return await pool.fetch(
+        """
+        UPDATE users AS u
+        SET verification_complete = TRUE,
+            approved = TRUE,
+            last_updated = NOW()
+        FROM (
+            SELECT user_id FROM users
+            WHERE verification_complete = FALSE
+              AND referral_count >= $1
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        ) AS q
+        WHERE u.user_id = q.user_id
+        RETURNING u.user_id, u.referral_count, u.language
+        """,
+        required,
+        limit,
+    )
+
+
 async def set_ready_to_join(pool: asyncpg.Pool, user_id: int, ready: bool) -> None:
     """Toggle the temporary ready_to_join flag."""
     await pool.execute(
@@ -110,6 +141,7 @@ async def set_joined_supergroup(pool: asyncpg.Pool, user_id: int) -> None:
         UPDATE users
         SET joined_supergroup = TRUE,
             ready_to_join = FALSE,
+            left_at = NULL,
             last_updated = NOW()
         WHERE user_id = $1
         """,
@@ -117,6 +149,107 @@ async def set_joined_supergroup(pool: asyncpg.Pool, user_id: int) -> None:
     )
 
 
+async def set_left_supergroup(pool: asyncpg.Pool, user_id: int) -> None:
+    """Mark user as no longer in the supergroup (left or removed)."""
+    await pool.execute(
+        """
+        UPDATE users
+        SET joined_supergroup = FALSE,
+            left_at = NOW(),
+            last_updated = NOW()
+        WHERE user_id = $1 AND joined_supergroup
+        """,
+        user_id,
+    )
+
+
+async def get_membership_batch(
+    pool: asyncpg.Pool, after_user_id: int, limit: int = 200
+) -> list[asyncpg.Record]:
+    """Keyset page of users whose membership flag is worth reconciling.
+
+    Covers users marked as joined (to catch missed leaves) and approved
+    users not marked as joined (to catch missed joins).
+    """
+    return await pool.fetch(
+        """
+        SELECT user_id, joined_supergroup
+        FROM users
+        WHERE user_id > $1
+          AND (joined_supergroup OR approved)
+        ORDER BY user_id
+        LIMIT $2
+        """,
+        after_user_id,
+        limit,
+    )
+
+
+async def approve_join_request(pool: asyncpg.Pool, user_id: int) -> dict[str, Any]:
+    """Check all join flags and, if they pass, mark the user as joined.
+
+    Reads language/verified/ready/approved and performs the
+    set_joined_supergroup update in one statement, so a join request
+    costs a single round trip. Returns a dict with keys:
+    language, verified, ready, approved, joined (True if updated) and
+    left_at (the value before the update, for revert_join_approval).
+    """
+    row = await pool.fetchrow(
+        """
+        WITH cur AS (
+            SELECT language, verification_complete, ready_to_join, approved, left_at
+            FROM users WHERE user_id = $1
+        ),
+        upd AS (
+            UPDATE users
+            SET joined_supergroup = TRUE,
+                ready_to_join = FALSE,
+                left_at = NULL,
+                last_updated = NOW()
+            WHERE user_id = $1
+              AND verification_complete
+              AND ready_to_join
+              AND approved
+            RETURNING user_id
+        )
+        SELECT cur.language,
+               COALESCE(cur.verification_complete, FALSE) AS verified,
+               COALESCE(cur.ready_to_join, FALSE)         AS ready,
+               COALESCE(cur.approved, FALSE)              AS approved,
+               EXISTS (SELECT 1 FROM upd)                 AS joined,
+               cur.left_at
+        FROM cur
+        """,
+        user_id,
+    )
+    if row is None:
+        return {"language": None, "verified": False, "ready": False,
+                "approved": False, "joined": False, "left_at": None}
+    return dict(row)
+
+
+async def revert_join_approval(
+    pool: asyncpg.Pool, user_id: int, left_at: Any = None
+) -> None:
+    """Undo approve_join_request when Telegram rejects the approval.
+
+    Restores ready_to_join (so the user can request again) and the
+    previous left_at, and clears joined_supergroup.
+    """
+    await pool.execute(
+        """
+        UPDATE users
+        SET joined_supergroup = FALSE,
+            ready_to_join = TRUE,
+            left_at = $2,
+            last_updated = NOW()
+        WHERE user_id = $1 AND joined_supergroup
+        """,
+        user_id,
+        left_at,
+    )
+
+
 async def is_verified(pool: asyncpg.Pool, user_id: int) -> bool:
     """Check if user has completed verification."""
     val = await pool.fetchval(
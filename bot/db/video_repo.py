@@ -2,47 +2,95 @@
 
 from __future__ import annotations
 
-import random
+import hashlib
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import asyncpg
 
+from bot.db import topic_repo
+from bot.utils import video_cache
+from bot.utils.video_cache import VideoInfo
+
 
 # ──────────────────────────────────────────────
 # Video code generation
 # ──────────────────────────────────────────────
 
+CODE_WIDTH = 4  # digits in a code before the prefix's space is exhausted
+_FEISTEL_ROUNDS = 4
+
+
+def _scramble(n: int, size: int, key: str) -> int:
+    """Bijectively map *n* in ``[0, size)`` to a random-looking ``[0, size)``.
+
+    A small keyed Feistel network over the next even power of two, with
+    cycle-walking to stay inside *size*. The same key always yields the
+    same permutation, so distinct counters give distinct codes.
+    """
+    bits = max(2, (size - 1).bit_length())
+    bits += bits % 2
+    half = bits // 2
+    mask = (1 << half) - 1
+    x = n
+    while True:
+        left, right = x >> half, x & mask
+        for rnd in range(_FEISTEL_ROUNDS):
+            digest = hashlib.blake2b(
+                f"{key}:{rnd}:{right}".encode(), digest_size=8
+            ).digest()
+            left, right = right, left ^ (int.from_bytes(digest, "big") & mask)
+        x = (left << half) | right
+        if x < size:
+            return x
+
+
+async def _allocate_code(pool: asyncpg.Pool, prefix: str) -> str:
+    """Take the next code for *prefix* from its counter (one statement).
+
+    Each prefix counts 0, 1, 2 … through its ``9 * 10**(width-1)`` codes;
+    when they run out the counter moves on to one more digit.
+    """
+    row = await pool.fetchrow(
+        """
+        INSERT INTO video_code_counters AS c (prefix, width, next_n)
+        VALUES ($1, $2, 1)
+        ON CONFLICT (prefix) DO UPDATE SET
+            width  = CASE WHEN c.next_n >= (9 * 10 ^ (c.width - 1))::bigint
+                          THEN c.width + 1 ELSE c.width END,
+            next_n = CASE WHEN c.next_n >= (9 * 10 ^ (c.width - 1))::bigint
+                          THEN 1 ELSE c.next_n + 1 END
+        RETURNING width, next_n - 1 AS n
+        """,
+        prefix,
+        CODE_WIDTH,
+    )
+    width, n = row["width"], row["n"]
+    low = 10 ** (width - 1)
+    return f"{prefix}-{low + _scramble(n, 9 * low, f'{prefix}:{width}')}"
+
+
 async def generate_video_code(pool: asyncpg.Pool, category_name: str) -> str:
     """Generate a unique video code like A-2943 or AC-2949.
 
-    Format: {prefix}-{4 random digits}
-    The prefix is read from the topics table (stored on category creation).
+    Format: {prefix}-{4 scrambled digits}, growing to 5+ digits once a
+    prefix has used all 9,000 four-digit codes.
+    The prefix is the one stored on category creation, looked up through
+    topic_repo (served from the topic registry when it is loaded).
     When category contains multiple categories (comma-separated), uses the first one.
     """
     # Extract the first category name if comma-separated
     first_category = category_name.split(",")[0].strip()
 
     # Look up the stored prefix for this category
-    prefix = await pool.fetchval(
-        "SELECT prefix FROM topics WHERE LOWER(name) = LOWER($1)", first_category
-    )
+    topic = await topic_repo.get_topic_by_name(pool, first_category)
+    prefix = topic["prefix"] if topic else None
     if not prefix:
         # Fallback: first letter uppercase
         prefix = first_category[0].upper() if first_category else "X"
 
-    for _ in range(100):  # max attempts
-        digits = random.randint(1000, 9999)
-        code = f"{prefix}-{digits}"
-        # Check uniqueness
-        existing = await pool.fetchval(
-            "SELECT 1 FROM videos WHERE code = $1", code
-        )
-        if not existing:
-            return code
-
-    raise ValueError("Could not generate unique video code after 100 attempts")
+    return await _allocate_code(pool, prefix)
 
 
 # ──────────────────────────────────────────────
@@ -61,29 +109,45 @@ async def create_video(
 ) -> asyncpg.Record:
     """Insert a new video record with auto-generated code. Returns the created row."""
     code = await generate_video_code(pool, category)
-    return await pool.fetchrow(
-        """
-        INSERT INTO videos
-            (code, title, category, description, file_url, topic_id, message_id, affiliate_link)
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-        RETURNING *
-        """,
-        code,
-        title,
-        category,
-        description,
-        file_url,
-        topic_id,
-        message_id,
-        affiliate_link,
-    )
-
-
-async def get_video(pool: asyncpg.Pool, video_id: int) -> Optional[asyncpg.Record]:
-    """Fetch a single video by ID."""
-    return await pool.fetchrow(
-        "SELECT * FROM videos WHERE video_id = $1", video_id
+    for _ in range(100):  # max attempts
+        try:
+            return await pool.fetchrow(
+                """
+                INSERT INTO videos
+                    (code, title, category, description, file_url, topic_id, message_id, affiliate_link)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                RETURNING *
+                """,
+                code,
+                title,
+                category,
+                description,
+                file_url,
+                topic_id,
+                message_id,
+                affiliate_link,
+            )
+        except asyncpg.UniqueViolationError:
+            # Taken by a code issued before the counters existed; the
+            # counter has already moved past it, so just draw again.
+            prefix = code.rsplit("-", 1)[0]
+            code = await _allocate_code(pool, prefix)
+    raise ValueError("Could not allocate a free video code after 100 attempts")
+
+
+# Cached lookups skip the views/downloads counters (see bot/utils/video_cache.py)
+_CACHED_COLUMNS = ", ".join(video_cache.COLUMNS)
+
+
+async def get_video(pool: asyncpg.Pool, video_id: int) -> Optional[VideoInfo]:
+    """Fetch a single video by ID (served from the in-process cache)."""
+    cached = video_cache.get(video_id)
+    if cached is not None:
+        return cached
+    row = await pool.fetchrow(
+        f"SELECT {_CACHED_COLUMNS} FROM videos WHERE video_id = $1", video_id
     )
+    return video_cache.put(row) if row else None
 
 
 async def get_video_by_url(pool: asyncpg.Pool, file_url: str) -> Optional[asyncpg.Record]:
@@ -109,11 +173,15 @@ async def get_all_file_urls(pool: asyncpg.Pool) -> set[str]:
     return {r["file_url"] for r in rows}
 
 
-async def get_video_by_code(pool: asyncpg.Pool, code: str) -> Optional[asyncpg.Record]:
-    """Fetch a single video by its unique code (case-insensitive)."""
-    return await pool.fetchrow(
-        "SELECT * FROM videos WHERE UPPER(code) = UPPER($1)", code
+async def get_video_by_code(pool: asyncpg.Pool, code: str) -> Optional[VideoInfo]:
+    """Fetch a single video by its unique code (case-insensitive, cached)."""
+    cached = video_cache.get_by_code(code)
+    if cached is not None:
+        return cached
+    row = await pool.fetchrow(
+        f"SELECT {_CACHED_COLUMNS} FROM videos WHERE UPPER(code) = UPPER($1)", code
     )
+    return video_cache.put(row) if row else None
 
 
 async def set_message_id(
@@ -130,6 +198,7 @@ async def set_message_id(
         message_id,
         topic_id,
     )
+    video_cache.invalidate(video_id)
 
 
 async def set_thumbnail_file_id(
@@ -141,6 +210,7 @@ async def set_thumbnail_file_id(
         video_id,
         thumbnail_file_id,
     )
+    video_cache.invalidate(video_id)
 
 
 async def set_shortened_url(
@@ -152,6 +222,7 @@ async def set_shortened_url(
         video_id,
         shortened_url,
     )
+    video_cache.invalidate(video_id)
 
 
 async def increment_views(pool: asyncpg.Pool, video_id: int) -> None:
@@ -206,6 +277,65 @@ async def create_download_session(
     return session_id
 
 
+async def get_or_create_download_session(
+    pool: asyncpg.Pool,
+    user_id: int,
+    video_id: int,
+    expires_minutes: int = 10,
+) -> str:
+    """Return the user's unused session for this video, or create one.
+
+    Repeated Download taps reuse the same session (and redirect link) as
+    long as it has not been opened and has a minute or more left.
+    """
+    return await pool.fetchval(
+        """
+        WITH active AS (
+            SELECT session_id FROM download_sessions
+            WHERE user_id = $2
+              AND video_id = $3
+              AND video_sent = FALSE
+              AND visited_at IS NULL
+              AND expires_at > NOW() + INTERVAL '1 minute'
+            ORDER BY created_at DESC
+            LIMIT 1
+        ),
+        created AS (
+            INSERT INTO download_sessions (session_id, user_id, video_id, expires_at)
+            SELECT $1, $2, $3, NOW() + make_interval(mins => $4)
+            WHERE NOT EXISTS (SELECT 1 FROM active)
+            RETURNING session_id
+        )
+        SELECT session_id FROM active
+        UNION ALL
+        SELECT session_id FROM created
+        LIMIT 1
+        """,
+        uuid.uuid4().hex[:16],
+        user_id,
+        video_id,
+        expires_minutes,
+    )
+
+
+async def create_completed_download_session(
+    pool: asyncpg.Pool, user_id: int, video_id: int
+) -> str:
+    """Record a session for a video delivered directly (no affiliate gate)."""
+    session_id = uuid.uuid4().hex[:16]
+    await pool.execute(
+        """
+        INSERT INTO download_sessions
+            (session_id, user_id, video_id, affiliate_visited, video_sent, expires_at)
+        VALUES ($1, $2, $3, TRUE, TRUE, NOW())
+        """,
+        session_id,
+        user_id,
+        video_id,
+    )
+    return session_id
+
+
 async def get_download_session(
     pool: asyncpg.Pool, session_id: str
 ) -> Optional[asyncpg.Record]:
@@ -250,6 +380,7 @@ async def get_active_session(
           AND video_id = $2
           AND expires_at > NOW()
           AND video_sent = FALSE
+          AND visited_at IS NULL
         ORDER BY created_at DESC
         LIMIT 1
         """,
@@ -258,6 +389,32 @@ async def get_active_session(
     )
 
 
+async def delete_expired_sessions(
+    pool: asyncpg.Pool, grace_seconds: int, limit: int = 5000
+) -> int:
+    """Delete up to *limit* sessions that expired unused.
+
+    Only sessions that were never opened and never delivered are removed,
+    and only *grace_seconds* after expiry so a late click still gets the
+    "link expired" page. Returns the number of rows deleted.
+    """
+    result = await pool.execute(
+        """
+        DELETE FROM download_sessions
+        WHERE session_id IN (
+            SELECT session_id FROM download_sessions
+            WHERE expires_at < NOW() - make_interval(secs => $1)
+              AND visited_at IS NULL
+              AND video_sent = FALSE
+            LIMIT $2
+        )
+        """,
+        grace_seconds,
+        limit,
+    )
+    return int(result.split()[-1])
+
+
 # ──────────────────────────────────────────────
 # Downloads log
 # ──────────────────────────────────────────────
@@ -284,24 +441,141 @@ async def log_download(
     )
 
 
+async def get_rollup_start(pool: asyncpg.Pool) -> Optional[datetime]:
+    """Where download rollups should resume: the newest hourly bucket,
+    or the oldest logged download when nothing has been rolled up yet."""
+    mark = await pool.fetchval(
+        "SELECT MAX(bucket) FROM download_rollups WHERE granularity = 'hour'"
+    )
+    if mark is None:
+        mark = await pool.fetchval("SELECT MIN(download_date) FROM downloads")
+    return mark
+
+
+async def roll_up_downloads(
+    pool: asyncpg.Pool, start: datetime, end: datetime
+) -> None:
+    """(Re)compute hourly and daily download rollups for ``[start, end)``.
+
+    *start* must be aligned to a UTC hour. Buckets are recomputed from
+    scratch, so overlapping or repeated windows are safe.
+    """
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            # Record first-ever downloads per user/video (feeds new_users/new_videos)
+            await conn.execute(
+                """
+                INSERT INTO download_firsts (kind, id, first_at)
+                SELECT 'u', user_id, MIN(download_date) FROM downloads
+                WHERE download_completed
+                  AND download_date >= $1 AND download_date < $2
+                GROUP BY user_id
+                UNION ALL
+                SELECT 'v', video_id, MIN(download_date) FROM downloads
+                WHERE download_completed
+                  AND download_date >= $1 AND download_date < $2
+                GROUP BY video_id
+                ON CONFLICT (kind, id) DO NOTHING
+                """,
+                start,
+                end,
+            )
+            await conn.execute(
+                """
+                WITH d AS (
+                    SELECT date_trunc('hour', download_date AT TIME ZONE 'UTC')
+                               AT TIME ZONE 'UTC' AS bucket,
+                           COUNT(*) AS downloads,
+                           COUNT(*) FILTER (WHERE affiliate_link_clicked) AS clicks
+                    FROM downloads
+                    WHERE download_completed
+                      AND download_date >= $1 AND download_date < $2
+                    GROUP BY 1
+                ),
+                f AS (
+                    SELECT date_trunc('hour', first_at AT TIME ZONE 'UTC')
+                               AT TIME ZONE 'UTC' AS bucket,
+                           COUNT(*) FILTER (WHERE kind = 'u') AS users,
+                           COUNT(*) FILTER (WHERE kind = 'v') AS videos
+                    FROM download_firsts
+                    WHERE first_at >= $1 AND first_at < $2
+                    GROUP BY 1
+                )
+                INSERT INTO download_rollups
+                    (granularity, bucket, downloads, affiliate_clicks,
+                     new_users, new_videos)
+                SELECT 'hour', bucket,
+                       COALESCE(d.downloads, 0), COALESCE(d.clicks, 0),
+                       COALESCE(f.users, 0), COALESCE(f.videos, 0)
+                FROM d FULL JOIN f USING (bucket)
+                ON CONFLICT (granularity, bucket) DO UPDATE
+                    SET downloads        = EXCLUDED.downloads,
+                        affiliate_clicks = EXCLUDED.affiliate_clicks,
+                        new_users        = EXCLUDED.new_users,
+                        new_videos       = EXCLUDED.new_videos
+                """,
+                start,
+                end,
+            )
+            # Days touched by the window, summed from their hourly rows
+            await conn.execute(
+                """
+                INSERT INTO download_rollups
+                    (granularity, bucket, downloads, affiliate_clicks,
+                     new_users, new_videos)
+                SELECT 'day',
+                       date_trunc('day', bucket AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                       SUM(downloads), SUM(affiliate_clicks),
+                       SUM(new_users), SUM(new_videos)
+                FROM download_rollups
+                WHERE granularity = 'hour'
+                  AND bucket >= date_trunc('day', $1 AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                  AND bucket < $2
+                GROUP BY 2
+                ON CONFLICT (granularity, bucket) DO UPDATE
+                    SET downloads        = EXCLUDED.downloads,
+                        affiliate_clicks = EXCLUDED.affiliate_clicks,
+                        new_users        = EXCLUDED.new_users,
+                        new_videos       = EXCLUDED.new_videos
+                """,
+                start,
+                end,
+            )
+
+
+async def delete_downloads_before(
+    pool: asyncpg.Pool, cutoff: datetime, limit: int = 5000
+) -> int:
+    """Delete up to *limit* download log rows older than *cutoff*.
+
+    Returns the number of rows deleted.
+    """
+    result = await pool.execute(
+        """
+        DELETE FROM downloads
+        WHERE download_id IN (
+            SELECT download_id FROM downloads
+            WHERE download_date < $1
+            LIMIT $2
+        )
+        """,
+        cutoff,
+        limit,
+    )
+    return int(result.split()[-1])
+
+
 async def get_download_stats(pool: asyncpg.Pool) -> dict:
-    """Get aggregate download statistics."""
+    """Get aggregate download statistics (from the daily rollups)."""
     row = await pool.fetchrow(
         """
         SELECT
-            COUNT(*)                                          AS total_downloads,
-            COUNT(*) FILTER (WHERE affiliate_link_clicked)    AS affiliate_clicks,
-            COUNT(DISTINCT user_id)                           AS unique_users,
-            COUNT(DISTINCT video_id)                          AS unique_videos
-        FROM downloads
-        WHERE download_completed = TRUE
+            COALESCE(SUM(downloads), 0)::bigint        AS total_downloads,
+            COALESCE(SUM(affiliate_clicks), 0)::bigint AS affiliate_clicks,
+            COALESCE(SUM(new_users), 0)::bigint        AS unique_users,
+            COALESCE(SUM(new_videos), 0)::bigint       AS unique_videos
+        FROM download_rollups
+        WHERE granularity = 'day'
         """
     )
-    if row:
-        return dict(row)
-    return {
-        "total_downloads": 0,
-        "affiliate_clicks": 0,
-        "unique_users": 0,
-        "unique_videos": 0,
-    }
+    return dict(row)
@@ -0,0 +1,64 @@
+"""Bot and Dispatcher construction, shared by ``python -m bot`` and the
+offline replay harness (``bench/replay.py``)."""
+
+from __future__ import annotations
+
+import asyncpg
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+
+from bot.config import settings
+from bot.fsm_storage import PostgresStorage
+from bot.handlers import register_routers
+from bot.middleware import (
+    LogContextMiddleware,
+    MaintenanceMiddleware,
+    UpdateTimingMiddleware,
+    HandlerMetricsMiddleware,
+    TelegramMetricsMiddleware,
+)
+
+
+def create_bot(api_url: str = "") -> Bot:
+    """Bot with HTML parse mode; *api_url* (default TELEGRAM_API_URL)
+    selects another Bot API server."""
+    api_url = api_url or settings.telegram_api_url
+    session = None
+    if api_url:
+        # e.g. a local Bot API server or bench/fake_telegram.py
+        session = AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+    bot = Bot(
+        token=settings.bot_token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    bot.session.middleware(TelegramMetricsMiddleware())
+    return bot
+
+
+def create_dispatcher(pool: asyncpg.Pool) -> Dispatcher:
+    """Dispatcher with every router and middleware registered."""
+    # FSM state lives in Postgres so wizards survive restarts
+    dp = Dispatcher(storage=PostgresStorage(pool))
+
+    # Register all routers
+    register_routers(dp)
+
+    # Tag log records with the update / user id (outermost)
+    dp.update.outer_middleware(LogContextMiddleware())
+
+    # Time every update end to end (logs slow updates)
+    dp.update.outer_middleware(UpdateTimingMiddleware())
+
+    # Register maintenance middleware (outer, runs before handlers)
+    dp.message.outer_middleware(MaintenanceMiddleware())
+    dp.callback_query.outer_middleware(MaintenanceMiddleware())
+
+    # Handler latency metrics (inner, propagates to every child router)
+    for observer in (dp.message, dp.callback_query, dp.chat_join_request, dp.chat_member):
+        observer.middleware(HandlerMetricsMiddleware())
+
+    return dp
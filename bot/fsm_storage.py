@@ -0,0 +1,168 @@
+"""PostgreSQL-backed aiogram FSM storage.
+
+Replaces the default in-memory storage so in-flight admin wizards and
+Auto Get & Run selections survive restarts and can be shared between
+several bot instances using the same database.
+
+Writes are coalesced: a handler typically calls ``set_state`` and
+``update_data`` back to back, so writes are buffered per key for a short
+window (``flush_interval``) and then applied in one transaction. Reads
+consult the pending buffer first, so a handler always sees its own
+writes. Rows that have not been touched for ``FSM_STATE_TTL_HOURS`` are
+removed by the scheduler (see ``fsm_repo.delete_stale_fsm_states``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+from collections.abc import Mapping
+from typing import Any
+
+import asyncpg
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+
+from bot.db import fsm_repo
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class PostgresStorage(BaseStorage):
+    """FSM storage on the shared asyncpg pool with write coalescing."""
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        *,
+        flush_interval: float = 0.05,
+        key_builder: KeyBuilder | None = None,
+    ) -> None:
+        self._pool = pool
+        self._flush_interval = flush_interval
+        self._key_builder = key_builder or DefaultKeyBuilder(
+            with_bot_id=True, with_destiny=True
+        )
+        # storage_key -> {"state": str | None, "data": dict, "data_json": str}
+        # (state and data parts are each optional)
+        self._pending: dict[str, dict[str, Any]] = {}
+        # Batch currently being written; still served to readers until committed
+        self._inflight: dict[str, dict[str, Any]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    # ── Buffer management ──────────────────────
+
+    def _key(self, key: StorageKey) -> str:
+        return self._key_builder.build(key)
+
+    def _buffered(self, skey: str, part: str) -> Any:
+        """Return a not-yet-committed value for *skey*, or _MISSING."""
+        for buf in (self._pending, self._inflight):
+            entry = buf.get(skey)
+            if entry is not None and part in entry:
+                return entry[part]
+        return _MISSING
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        delay = self._flush_interval
+        while True:
+            await asyncio.sleep(delay)
+            ok = await self.flush()
+            if not self._pending:
+                return
+            # Back off while the database is unreachable
+            delay = self._flush_interval if ok else 1.0
+
+    async def flush(self) -> bool:
+        """Write all buffered changes to the database now.
+
+        Returns False if the write failed; changes then stay buffered.
+        """
+        if not self._pending:
+            return True
+        batch, self._pending = self._pending, {}
+        self._inflight = batch
+
+        upserts: list[tuple[str, bool, str | None, str | None]] = []
+        deletes: list[str] = []
+        for skey, entry in batch.items():
+            state = entry.get("state", _MISSING)
+            data = entry.get("data", _MISSING)
+            if state is None and data == {}:
+                # state.clear() — drop the row entirely
+                deletes.append(skey)
+                continue
+            upserts.append((
+                skey,
+                state is not _MISSING,
+                None if state is _MISSING else state,
+                entry.get("data_json"),
+            ))
+
+        try:
+            await fsm_repo.write_fsm_batch(self._pool, upserts, deletes)
+        except BaseException as exc:
+            # Re-queue (also on cancellation), without clobbering newer writes
+            for skey, entry in batch.items():
+                merged = dict(entry)
+                merged.update(self._pending.get(skey, {}))
+                self._pending[skey] = merged
+            if not isinstance(exc, Exception):
+                raise
+            logger.exception("FSM storage: failed to flush %d key(s)", len(batch))
+            return False
+        finally:
+            self._inflight = {}
+        return True
+
+    # ── BaseStorage interface ──────────────────
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        self._pending.setdefault(self._key(key), {})["state"] = value
+        self._schedule_flush()
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        skey = self._key(key)
+        state = self._buffered(skey, "state")
+        if state is not _MISSING:
+            return state
+        return await fsm_repo.get_fsm_state(self._pool, skey)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise TypeError(f"Data must be a dict, got {type(data).__name__}")
+        entry = self._pending.setdefault(self._key(key), {})
+        # Serialise now so a bad value fails in the handler, not the flush
+        entry["data_json"] = json.dumps(data)
+        entry["data"] = data.copy()
+        self._schedule_flush()
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        skey = self._key(key)
+        data = self._buffered(skey, "data")
+        if data is not _MISSING:
+            return data.copy()
+        return await fsm_repo.get_fsm_data(self._pool, skey)
+
+    async def close(self) -> None:
+        task = self._flush_task
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await self.flush()
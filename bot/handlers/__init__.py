@@ -5,6 +5,7 @@ from aiogram import Router
 from bot.handlers.start import router as start_router
 from bot.handlers.join import router as join_router
 from bot.handlers.join_request import router as join_request_router
+from bot.handlers.membership import router as membership_router
 from bot.handlers.admin import router as admin_router
 from bot.handlers.video import router as video_router
 from bot.handlers.common import router as common_router
@@ -15,6 +16,7 @@ def register_routers(parent: Router) -> None:
     parent.include_router(start_router)
     parent.include_router(join_router)
     parent.include_router(join_request_router)
+    parent.include_router(membership_router)
     parent.include_router(admin_router)
     parent.include_router(video_router)
     parent.include_router(common_router)
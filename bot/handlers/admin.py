@@ -7,15 +7,21 @@ Text input for settings changes uses FSM states.
 
 from __future__ import annotations
 
+import asyncio
+import html
 import logging
+import time
+from typing import Any
 
 from aiogram import Bot, Router, types, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
 from bot.db.pool import get_pool
-from bot.db import config_repo, user_repo, topic_repo, video_repo
-import time
+from bot.db import config_repo, user_repo, topic_repo, video_repo, stats_repo, query_stats
+from bot import invite_pool
+from bot.middleware import recent_slow_updates
 
 from bot.config import settings
 from bot.keyboards.inline import (
@@ -28,6 +34,8 @@ from bot.keyboards.inline import (
     category_remove_keyboard,
     category_set_all_keyboard,
     join_supergroup_keyboard,
+    top_queries_keyboard,
+    query_plan_keyboard,
 )
 from bot.states import AdminInput, AdminCategory
 from bot.i18n import t
@@ -125,32 +133,158 @@ async def cb_stats(callback: types.CallbackQuery) -> None:
         return
 
     pool = await get_pool()
-    stats = await user_repo.get_user_stats(pool)
-    req = await config_repo.get_required_referrals(pool)
-    aff = await config_repo.get_affiliate_link(pool) or "<i>not set</i>"
-    expiry = await config_repo.get_invite_expiry(pool)
+    # Precomputed by the scheduler; only computed here on a fresh install
+    snapshot = await stats_repo.get_snapshot(pool)
+    if snapshot is None:
+        snapshot = await stats_repo.refresh_snapshot(pool)
+    data, updated_at = snapshot
+    cfg = await config_repo.get_configs(
+        pool, "REQUIRED_REFERRALS", "AFFILIATE_LINK", "INVITE_EXPIRY_SECONDS"
+    )
+    req_raw = (cfg.get("REQUIRED_REFERRALS") or "0").strip()
+    req = int(req_raw) if req_raw.isdigit() else 0
+    aff = cfg.get("AFFILIATE_LINK") or "<i>not set</i>"
+    expiry = cfg.get("INVITE_EXPIRY_SECONDS") or "300"
 
-    total = stats["total_users"]
-    verified = stats["verified_users"]
-    joined = stats["joined_users"]
-    rate = f"{verified / total * 100:.1f}" if total > 0 else "0"
+    users = data["users"]
+    dl = data["downloads"]
+    funnel = data["funnel"]
+
+    top_lines = "".join(
+        f"  <code>{v['code']}</code> {html.escape(v['title'])} — <b>{v['downloads']}</b>\n"
+        for v in data["top_videos"]
+    ) or "  <i>none yet</i>\n"
 
     text = (
         "<b>Statistics</b>\n\n"
-        f"Total users: <b>{total}</b>\n"
-        f"Verified: <b>{verified}</b> ({rate}%)\n"
-        f"Joined ZONA RATED: <b>{joined}</b>\n\n"
+        f"Total users: <b>{users['total']}</b>\n"
+        f"Verified: <b>{users['verified']}</b> ({funnel['verified_rate']}%)\n"
+        f"Joined ZONA RATED: <b>{users['joined']}</b>\n\n"
+        "---- Referral Funnel ----\n"
+        f"Started → referred: <b>{funnel['referred']}</b> ({funnel['referred_rate']}%)\n"
+        f"→ verified: <b>{funnel['verified']}</b> ({funnel['verified_rate']}%)\n"
+        f"→ joined: <b>{funnel['joined']}</b> ({funnel['joined_rate']}%)\n\n"
+        "---- Downloads ----\n"
+        f"Total: <b>{dl['total_downloads']}</b> (24h: <b>{dl['last_24h']}</b>)\n"
+        f"Via affiliate: <b>{dl['affiliate_clicks']}</b>\n"
+        f"Unique users: <b>{dl['unique_users']}</b> / "
+        f"videos: <b>{dl['unique_videos']}</b>\n\n"
+        "---- Top Videos ----\n"
+        f"{top_lines}\n"
         "---- Current Config ----\n"
         f"Required referrals: <b>{req}</b>"
         f"{'  (auto-approve)' if req == 0 else ''}\n"
         f"Affiliate link: {aff}\n"
-        f"Invite expiry: <b>{expiry}s</b>"
+        f"Invite expiry: <b>{expiry}s</b>\n\n"
+        f"<i>Last updated: {updated_at:%Y-%m-%d %H:%M} UTC</i>"
     )
 
     await callback.message.edit_text(text, reply_markup=admin_back_main())
     await callback.answer()
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# SLOW UPDATES
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+SLOW_UPDATES_SHOWN = 15
+
+
+@router.callback_query(F.data == "adm_slow")
+async def cb_slow_updates(callback: types.CallbackQuery) -> None:
+    if not await _is_admin(callback.from_user.id):
+        await callback.answer("Access denied", show_alert=True)
+        return
+
+    pool = await get_pool()
+    threshold = await config_repo.get_slow_update_ms(pool)
+    entries = recent_slow_updates()[:SLOW_UPDATES_SHOWN]
+
+    text = f"<b>Slow Updates</b> (&gt; {threshold} ms)\n\n"
+    if threshold <= 0:
+        text += "<i>Slow-update logging is off (SLOW_UPDATE_MS = 0).</i>\n"
+    elif not entries:
+        text += "<i>None since the bot started.</i>\n"
+    for e in entries:
+        text += (
+            f"<code>{e['at']:%m-%d %H:%M:%S}</code> "
+            f"{html.escape(e['update'][:60])} — <b>{e['total_ms']:.0f} ms</b>\n"
+            f"  db {e['db_ms']:.0f} · tg {e['telegram_ms']:.0f} · "
+            f"http {e['http_ms']:.0f} · other {e['other_ms']:.0f}\n"
+        )
+
+    await callback.message.edit_text(text, reply_markup=admin_back_main())
+    await callback.answer()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# TOP QUERIES
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+TOP_QUERIES_SHOWN = 10
+PLAN_MAX_CHARS = 3500  # keeps the message under Telegram's 4096 limit
+
+
+async def _show_top_queries(callback: types.CallbackQuery) -> None:
+    queries = query_stats.top_queries(TOP_QUERIES_SHOWN)
+    text = "<b>Top Queries</b> (by total time since start/reset)\n\n"
+    if not queries:
+        text += "<i>No queries recorded yet.</i>\n"
+    for q in queries:
+        avg_rows = q.rows / (q.calls - q.errors) if q.calls > q.errors else 0
+        text += (
+            f"<b>{html.escape(q.name)}</b>\n"
+            f"  {q.calls} calls · {q.total:.2f}s total · {avg_rows:.1f} rows avg"
+            f"{f' · {q.errors} errors' if q.errors else ''}\n"
+            f"  p50 {q.percentile(50) * 1000:.1f} · p95 {q.percentile(95) * 1000:.1f}"
+            f" · p99 {q.percentile(99) * 1000:.1f} · max {q.max * 1000:.1f} ms\n"
+        )
+    planned = [(q.id, q.name) for q in queries if q.plan]
+    try:
+        await callback.message.edit_text(text, reply_markup=top_queries_keyboard(planned))
+    except TelegramBadRequest:
+        pass  # unchanged report
+
+
+@router.callback_query(F.data == "adm_queries")
+async def cb_top_queries(callback: types.CallbackQuery) -> None:
+    if not await _is_admin(callback.from_user.id):
+        await callback.answer("Access denied", show_alert=True)
+        return
+    await _show_top_queries(callback)
+    await callback.answer()
+
+
+@router.callback_query(F.data == "adm_queries_reset")
+async def cb_top_queries_reset(callback: types.CallbackQuery) -> None:
+    if not await _is_admin(callback.from_user.id):
+        await callback.answer("Access denied", show_alert=True)
+        return
+    query_stats.reset()
+    await _show_top_queries(callback)
+    await callback.answer("Query statistics reset")
+
+
+@router.callback_query(F.data.startswith("adm_qplan_"))
+async def cb_query_plan(callback: types.CallbackQuery) -> None:
+    if not await _is_admin(callback.from_user.id):
+        await callback.answer("Access denied", show_alert=True)
+        return
+
+    q = query_stats.get_query(int(callback.data.removeprefix("adm_qplan_")))
+    if q is None or not q.plan:
+        await callback.answer("Plan no longer available", show_alert=True)
+        return
+
+    text = (
+        f"<b>{html.escape(q.name)}</b> — {q.plan_ms:.0f} ms at {q.plan_at:%H:%M:%S} UTC"
+        f"{'' if q.plan_analyzed else ' (estimated plan, statement writes)'}\n"
+        f"<pre>{html.escape(q.plan[:PLAN_MAX_CHARS])}</pre>"
+    )
+    await callback.message.edit_text(text, reply_markup=query_plan_keyboard())
+    await callback.answer()
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # SETTINGS SUB-MENU
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -642,18 +776,13 @@ async def on_approve_input(message: types.Message, state: FSMContext) -> None:
         target_lang = await user_repo.get_language(pool, target_id) or "id"
         bot: Bot = message.bot
 
-        invite_expiry = await config_repo.get_invite_expiry(pool)
-        invite = await bot.create_chat_invite_link(
-            chat_id=settings.supergroup_id,
-            member_limit=1,
-            expire_date=int(time.time()) + invite_expiry,
-        )
+        invite_link, _ = await invite_pool.get_invite_link(bot, pool, target_id)
 
         await bot.send_message(
             target_id,
             t(target_lang, "admin_approved_you"),
             reply_markup=join_supergroup_keyboard(
-                invite.invite_link,
+                invite_link,
                 t(target_lang, "btn_join_supergroup"),
             ),
         )
@@ -1007,11 +1136,7 @@ async def cb_category_mark_all(callback: types.CallbackQuery) -> None:
     topic_id = int(callback.data.split("_")[-1])
     pool = await get_pool()
 
-    # Clear existing 'All' flag
-    await pool.execute("UPDATE topics SET is_all = FALSE WHERE is_all = TRUE")
-
-    # Set the new one
-    await pool.execute("UPDATE topics SET is_all = TRUE WHERE topic_id = $1", topic_id)
+    await topic_repo.set_all_topic(pool, topic_id)
 
     topic = await topic_repo.get_topic_by_id(pool, topic_id)
     name = topic["name"] if topic else "?"
@@ -1030,34 +1155,85 @@ async def cb_category_mark_all(callback: types.CallbackQuery) -> None:
 from bot.db import schedule_repo
 from bot.keyboards.inline import schedule_queue_keyboard
 
-@router.callback_query(F.data == "adm_sched_queue")
-async def cb_sched_queue(callback: types.CallbackQuery) -> None:
-    if not await _is_admin(callback.from_user.id):
-        await callback.answer("Access denied", show_alert=True)
-        return
+QUEUE_PAGE_SIZE = 20
 
+
+async def _show_sched_queue(
+    callback: types.CallbackQuery,
+    *,
+    after_id: int | None = None,
+    before_id: int | None = None,
+    from_id: int | None = None,
+) -> None:
+    """Render one keyset page of the scheduled queue with exact counts."""
     pool = await get_pool()
-    items = await schedule_repo.get_upcoming_schedules(pool, limit=20)
+    items, has_more = await schedule_repo.get_queue_page(
+        pool, after_id=after_id, before_id=before_id, from_id=from_id,
+        limit=QUEUE_PAGE_SIZE,
+    )
+    if not items and (after_id or before_id or from_id):
+        # Cursor row vanished or page emptied — fall back to the first page
+        items, has_more = await schedule_repo.get_queue_page(pool, limit=QUEUE_PAGE_SIZE)
+        after_id = before_id = from_id = None
 
     if not items:
         await callback.message.edit_text(
             "<b>Scheduled Queue</b>\n\nNo scheduled videos.",
             reply_markup=admin_back_main(),
         )
-        await callback.answer()
         return
 
-    pending = sum(1 for i in items if i["status"] == "pending")
-    posted = sum(1 for i in items if i["status"] == "posted")
-    failed = sum(1 for i in items if i["status"] == "failed")
+    if before_id:
+        has_prev, has_next = has_more, True
+    elif after_id:
+        has_prev, has_next = True, has_more
+    else:
+        # First page, or a redraw from an anchor row (which may itself
+        # be the first row of the queue)
+        has_prev = (
+            from_id is not None
+            and await schedule_repo.queue_has_before(pool, items[0]["schedule_id"])
+        )
+        has_next = has_more
 
+    counts = await schedule_repo.get_status_counts(pool)
     text = (
         f"<b>Scheduled Queue</b>\n\n"
-        f"Pending: {pending} | Posted: {posted} | Failed: {failed}\n\n"
+        f"Pending: {counts.get('pending', 0)} | "
+        f"Posting: {counts.get('posting', 0)} | "
+        f"Posted: {counts.get('posted', 0)} | "
+        f"Failed: {counts.get('failed', 0)}\n\n"
         f"Click X to cancel a pending item."
     )
+    try:
+        await callback.message.edit_text(
+            text, reply_markup=schedule_queue_keyboard(items, has_prev, has_next)
+        )
+    except TelegramBadRequest:
+        pass  # message content unchanged — ignore
+
 
-    await callback.message.edit_text(text, reply_markup=schedule_queue_keyboard(items))
+@router.callback_query(F.data == "adm_sched_queue")
+async def cb_sched_queue(callback: types.CallbackQuery) -> None:
+    if not await _is_admin(callback.from_user.id):
+        await callback.answer("Access denied", show_alert=True)
+        return
+
+    await _show_sched_queue(callback)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("sched_page_"))
+async def cb_sched_page(callback: types.CallbackQuery) -> None:
+    if not await _is_admin(callback.from_user.id):
+        await callback.answer("Access denied", show_alert=True)
+        return
+
+    _, _, direction, sid = callback.data.split("_")
+    if direction == "b":
+        await _show_sched_queue(callback, before_id=int(sid))
+    else:
+        await _show_sched_queue(callback, after_id=int(sid))
     await callback.answer()
 
 
@@ -1067,7 +1243,9 @@ async def cb_sched_cancel(callback: types.CallbackQuery) -> None:
         await callback.answer("Access denied", show_alert=True)
         return
 
-    sid = int(callback.data.split("_")[-1])
+    parts = callback.data.split("_")
+    sid = int(parts[2])
+    anchor = int(parts[3]) if len(parts) > 3 else 0
     pool = await get_pool()
     ok = await schedule_repo.cancel_schedule(pool, sid)
 
@@ -1076,23 +1254,8 @@ async def cb_sched_cancel(callback: types.CallbackQuery) -> None:
     else:
         await callback.answer("Could not cancel (not pending?)", show_alert=True)
 
-    # Refresh queue
-    items = await schedule_repo.get_upcoming_schedules(pool, limit=20)
-    if items:
-        pending = sum(1 for i in items if i["status"] == "pending")
-        posted = sum(1 for i in items if i["status"] == "posted")
-        failed = sum(1 for i in items if i["status"] == "failed")
-        text = (
-            f"<b>Scheduled Queue</b>\n\n"
-            f"Pending: {pending} | Posted: {posted} | Failed: {failed}\n\n"
-            f"Click X to cancel a pending item."
-        )
-        await callback.message.edit_text(text, reply_markup=schedule_queue_keyboard(items))
-    else:
-        await callback.message.edit_text(
-            "<b>Scheduled Queue</b>\n\nNo scheduled videos.",
-            reply_markup=admin_back_main(),
-        )
+    # Refresh the page the admin was looking at
+    await _show_sched_queue(callback, from_id=anchor or None)
 
 
 @router.callback_query(F.data.startswith("sched_info_"))
@@ -1137,6 +1300,8 @@ from bot.keyboards.inline import (
     autorun_confirm_keyboard,
 )
 
+PROGRESS_EDIT_INTERVAL = 2.0  # seconds between bulk-scheduling progress edits
+
 @router.callback_query(F.data == "adm_autorun")
 async def cb_autorun_start(callback: types.CallbackQuery, state: FSMContext) -> None:
     """Start Auto Get & Run — pick categories."""
@@ -1288,11 +1453,9 @@ async def on_autorun_delay_input(message: types.Message, state: FSMContext) -> N
     await _autorun_scan_and_confirm_msg(message, state, minutes)
 
 
-async def _autorun_scan_and_confirm(
-    callback: types.CallbackQuery, state: FSMContext, delay_minutes: int
-) -> None:
-    """Scan Bunny Storage and show summary for confirmation."""
-    from bot.utils.bunny_storage import list_category_videos, resolve_storage_folder
+async def _autorun_scan(state: FSMContext) -> tuple[list[dict], list[str]]:
+    """Scan the selected categories' storage folders for new videos."""
+    from bot.utils.bunny_storage import scan_categories
 
     pool = await get_pool()
     data = await state.get_data()
@@ -1310,36 +1473,15 @@ async def _autorun_scan_and_confirm(
     scheduled_urls = await schedule_repo.get_scheduled_urls(pool)
     exclude_urls = posted_urls | scheduled_urls
 
-    # Scan storage
-    total_new = 0
-    category_summary = []
-    all_new_videos = []
-
-    for cat in categories:
-        cat_name = cat["name"]
-        # Resolve topic name to actual storage folder name
-        folder_name = await resolve_storage_folder(cat_name)
-        if not folder_name:
-            category_summary.append(f"  {cat_name}: NO MATCHING FOLDER")
-            continue
-        try:
-            videos = await list_category_videos(folder_name)
-        except Exception as e:
-            logger.warning("Auto Get & Run: failed to scan '%s': %s", cat_name, e)
-            category_summary.append(f"  {cat_name}: ERROR ({e})")
-            continue
-
-        new_videos = [v for v in videos if v["url"] not in exclude_urls]
-        total_new += len(new_videos)
-        category_summary.append(f"  {cat_name}: {len(new_videos)} new / {len(videos)} total")
-
-        for v in new_videos:
-            all_new_videos.append({
-                "url": v["url"],
-                "title": v["title"],
-                "category": cat_name,
-                "topic_id": cat["topic_id"],
-            })
+    return await scan_categories(categories, exclude_urls)
+
+
+async def _autorun_scan_and_confirm(
+    callback: types.CallbackQuery, state: FSMContext, delay_minutes: int
+) -> None:
+    """Scan Bunny Storage and show summary for confirmation."""
+    all_new_videos, category_summary = await _autorun_scan(state)
+    total_new = len(all_new_videos)
 
     await state.update_data(ar_new_videos=all_new_videos)
     await state.set_state(AdminAutoRun.confirming)
@@ -1360,50 +1502,8 @@ async def _autorun_scan_and_confirm_msg(
     message: types.Message, state: FSMContext, delay_minutes: int
 ) -> None:
     """Same as above but triggered from a message context."""
-    from bot.utils.bunny_storage import list_category_videos, resolve_storage_folder
-
-    pool = await get_pool()
-    data = await state.get_data()
-    selected_ids = data.get("ar_selected", [])
-
-    categories = []
-    for tid in selected_ids:
-        topic = await topic_repo.get_topic_by_id(pool, tid)
-        if topic:
-            categories.append(topic)
-
-    posted_urls = await video_repo.get_all_file_urls(pool)
-    scheduled_urls = await schedule_repo.get_scheduled_urls(pool)
-    exclude_urls = posted_urls | scheduled_urls
-
-    total_new = 0
-    category_summary = []
-    all_new_videos = []
-
-    for cat in categories:
-        cat_name = cat["name"]
-        folder_name = await resolve_storage_folder(cat_name)
-        if not folder_name:
-            category_summary.append(f"  {cat_name}: NO MATCHING FOLDER")
-            continue
-        try:
-            videos = await list_category_videos(folder_name)
-        except Exception as e:
-            logger.warning("Auto Get & Run: failed to scan '%s': %s", cat_name, e)
-            category_summary.append(f"  {cat_name}: ERROR ({e})")
-            continue
-
-        new_videos = [v for v in videos if v["url"] not in exclude_urls]
-        total_new += len(new_videos)
-        category_summary.append(f"  {cat_name}: {len(new_videos)} new / {len(videos)} total")
-
-        for v in new_videos:
-            all_new_videos.append({
-                "url": v["url"],
-                "title": v["title"],
-                "category": cat_name,
-                "topic_id": cat["topic_id"],
-            })
+    all_new_videos, category_summary = await _autorun_scan(state)
+    total_new = len(all_new_videos)
 
     await state.update_data(ar_new_videos=all_new_videos)
 
@@ -1441,29 +1541,63 @@ async def cb_autorun_confirm(callback: types.CallbackQuery, state: FSMContext) -
         await callback.answer()
         return
 
+    # Acknowledge now — a large batch can outlast the callback timeout
+    await callback.answer()
+    total = len(new_videos)
+    await callback.message.edit_text(
+        f"<b>Auto Get & Run</b>\n\nScheduling 0/{total} videos..."
+    )
+
+    # Progress edits run as background tasks, at most one at a time and
+    # one per PROGRESS_EDIT_INTERVAL, so the COPY transaction never waits
+    # on the Bot API.
+    progress: dict[str, Any] = {"task": None, "at": 0.0}
+
+    async def edit_progress(done: int, total: int) -> None:
+        try:
+            await callback.message.edit_text(
+                f"<b>Auto Get & Run</b>\n\nScheduling {done}/{total} videos..."
+            )
+        except Exception:
+            pass  # progress is best-effort
+
+    def report(done: int, total: int) -> None:
+        task = progress["task"]
+        if done >= total or (task is not None and not task.done()):
+            return
+        if time.monotonic() - progress["at"] < PROGRESS_EDIT_INTERVAL:
+            return
+        progress["at"] = time.monotonic()
+        progress["task"] = asyncio.create_task(edit_progress(done, total))
+
     pool = await get_pool()
     now = dt.now(tz.utc)
-    created = 0
-
-    for i, vid in enumerate(new_videos):
-        sched_time = now + timedelta(minutes=delay_minutes * (i + 1))
-        topic_ids_str = str(vid["topic_id"])
-
-        await schedule_repo.create_scheduled_video(
-            pool,
-            title=vid["title"],
-            category=vid["category"],
-            description=None,
-            file_url=vid["url"],
-            thumbnail_b64=None,
-            thumbnail_file_id=None,
-            affiliate_link=None,
-            topic_ids=topic_ids_str,
-            scheduled_at=sched_time,
-            created_by=callback.from_user.id,
+    items = [
+        (
+            vid["title"],
+            vid["category"],
+            vid["url"],
+            str(vid["topic_id"]),
+            now + timedelta(minutes=delay_minutes * (i + 1)),
         )
-        created += 1
+        for i, vid in enumerate(new_videos)
+    ]
+    try:
+        created = await schedule_repo.create_scheduled_videos_bulk(
+            pool, items, created_by=callback.from_user.id, on_progress=report
+        )
+    except Exception:
+        logger.exception("Auto Get & Run: bulk scheduling failed")
+        if progress["task"] is not None:
+            await progress["task"]
+        await callback.message.edit_text(
+            "<b>Auto Get & Run</b>\n\nScheduling failed — nothing was queued.",
+            reply_markup=admin_back_main(),
+        )
+        return
 
+    if progress["task"] is not None:
+        await progress["task"]  # don't let a late progress edit overwrite the result
     first_time = (now + timedelta(minutes=delay_minutes)).strftime("%Y-%m-%d %H:%M UTC")
     last_time = (now + timedelta(minutes=delay_minutes * len(new_videos))).strftime("%Y-%m-%d %H:%M UTC")
 
@@ -1476,4 +1610,3 @@ async def cb_autorun_confirm(callback: types.CallbackQuery, state: FSMContext) -
         f"View progress in Scheduled Queue.",
         reply_markup=admin_back_main(),
     )
-    await callback.answer()
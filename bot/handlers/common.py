@@ -46,18 +46,8 @@ async def cmd_status(message: types.Message) -> None:
     ref_required = await config_repo.get_required_referrals(pool)
     verified = user["verification_complete"]
 
-    # Live check: is user actually in the supergroup?
-    from bot.config import settings
-    try:
-        member = await message.bot.get_chat_member(
-            chat_id=settings.supergroup_id, user_id=user_id)
-        in_group = member.status in ("member", "administrator", "creator")
-    except Exception:
-        in_group = user["joined_supergroup"]  # fallback to DB
-
-    # Sync DB if user joined but DB not updated yet
-    if in_group and not user["joined_supergroup"]:
-        await user_repo.set_joined_supergroup(pool, user_id)
+    # Kept current by chat_member updates (handlers/membership.py)
+    in_group = user["joined_supergroup"]
 
     sg_status = t(lang, "yes") if in_group else t(lang, "no")
     ver_status = t(lang, "complete") if verified else t(lang, "incomplete")
@@ -3,14 +3,13 @@
 from __future__ import annotations
 
 import logging
-import time
 
 from aiogram import Router, types, Bot
 from aiogram.exceptions import TelegramBadRequest
 
-from bot.config import settings
 from bot.db.pool import get_pool
 from bot.db import config_repo, user_repo
+from bot import invite_pool
 from bot.keyboards.inline import check_again_keyboard, join_supergroup_keyboard
 from bot.i18n import t
 
@@ -44,37 +43,32 @@ async def handle_check_req(callback: types.CallbackQuery, bot: Bot) -> None:
         await user_repo.set_verification_complete(pool, user_id)
         await user_repo.set_ready_to_join(pool, user_id, True)
 
-        invite_expiry = await config_repo.get_invite_expiry(pool)
-
         try:
-            invite = await bot.create_chat_invite_link(
-                chat_id=settings.supergroup_id,
-                member_limit=1,
-                expire_date=int(time.time()) + invite_expiry,
+            # Served from the pre-generated pool (bot/invite_pool.py)
+            invite_link, seconds_left = await invite_pool.get_invite_link(
+                bot, pool, user_id
             )
+        except Exception as e:
+            logger.error("Failed to get invite link: %s", e)
+            await callback.answer(t(lang, "invite_failed"), show_alert=True)
+            return
 
-            text = t(lang, "verified_ready",
-                     count=ref_count,
-                     required=ref_required,
-                     expiry_min=invite_expiry // 60)
-
-            try:
-                await callback.message.edit_text(
-                    text,
-                    reply_markup=join_supergroup_keyboard(
-                        invite.invite_link,
-                        t(lang, "btn_join_supergroup")),
-                )
-            except TelegramBadRequest:
-                pass  # message content unchanged — ignore
-
-            await callback.answer(t(lang, "invite_created"))
+        text = t(lang, "verified_ready",
+                 count=ref_count,
+                 required=ref_required,
+                 expiry_min=seconds_left // 60)
 
+        try:
+            await callback.message.edit_text(
+                text,
+                reply_markup=join_supergroup_keyboard(
+                    invite_link,
+                    t(lang, "btn_join_supergroup")),
+            )
         except TelegramBadRequest:
-            pass  # already handled above
-        except Exception as e:
-            logger.error("Failed to create invite link: %s", e)
-            await callback.answer(t(lang, "invite_failed"), show_alert=True)
+            pass  # message content unchanged — ignore
+
+        await callback.answer(t(lang, "invite_created"))
 
     else:
         # ═══════════════════════════════════════════════
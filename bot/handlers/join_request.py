@@ -3,8 +3,10 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 from aiogram import Router, types
+from aiogram.exceptions import TelegramBadRequest
 
 from bot.config import settings
 from bot.db.pool import get_pool
@@ -16,6 +18,15 @@ logger = logging.getLogger(__name__)
 router = Router(name="join_request")
 
 
+async def _rollback(pool, user_id: int, result: dict[str, Any], error: Exception) -> None:
+    """Restore the user's flags after Telegram refused the approval."""
+    logger.error("Error approving join for user %s: %s", user_id, error)
+    try:
+        await user_repo.revert_join_approval(pool, user_id, result["left_at"])
+    except Exception:
+        logger.exception("Could not roll back join approval for user %s", user_id)
+
+
 @router.chat_join_request()
 async def handle_join_request(event: types.ChatJoinRequest) -> None:
     """
@@ -33,30 +44,34 @@ async def handle_join_request(event: types.ChatJoinRequest) -> None:
         return
 
     pool = await get_pool()
-    lang = await user_repo.get_language(pool, user_id) or "id"
 
-    # ── Re-verify user ────────────────────────────────
-    verified = await user_repo.is_verified(pool, user_id)
-    ready = await user_repo.is_ready_to_join(pool, user_id)
-    approved = await user_repo.is_approved(pool, user_id)
+    # ── Re-verify user + mark joined (single round trip) ──
+    result = await user_repo.approve_join_request(pool, user_id)
+    lang = result["language"] or "id"
+    verified = result["verified"]
+    ready = result["ready"]
+    approved = result["approved"]
 
-    if verified and ready and approved:
+    if result["joined"]:
         # ═══ ALL CHECKS PASSED ════════════════════
+        # DB flags are already updated. Approve first and greet only once
+        # Telegram has accepted it; a failed approve produces no
+        # chat_member update, so the flags are rolled back here.
         try:
             await event.approve()
+        except TelegramBadRequest as e:
+            if "USER_ALREADY_PARTICIPANT" not in str(e):
+                await _rollback(pool, user_id, result, e)
+                return
+        except Exception as e:
+            await _rollback(pool, user_id, result, e)
+            return
+        logger.info("Approved join request for user %s", user_id)
 
-            # Update DB flags
-            await user_repo.set_joined_supergroup(pool, user_id)
-
-            # Send welcome PM
-            await event.bot.send_message(
-                user_id,
-                t(lang, "join_approved"),
-            )
-            logger.info("Approved join request for user %s", user_id)
-
+        try:
+            await event.bot.send_message(user_id, t(lang, "join_approved"))
         except Exception as e:
-            logger.error("Error approving join for user %s: %s", user_id, e)
+            logger.debug("Could not send welcome PM to user %s: %s", user_id, e)
 
     else:
         # ═══ CHECKS FAILED ════════════════════════
@@ -0,0 +1,59 @@
+"""Supergroup membership tracking from chat_member updates.
+
+Telegram sends a chat_member update whenever someone joins, leaves or
+is removed from the supergroup (the bot must be an admin there). We
+mirror that into users.joined_supergroup / users.left_at so /status and
+the fallback status button can answer from the DB without calling
+get_chat_member.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from aiogram import Router, types
+from aiogram.enums import ChatMemberStatus
+
+from bot.config import settings
+from bot.db.pool import get_pool
+from bot.db import invite_repo, user_repo
+
+logger = logging.getLogger(__name__)
+
+router = Router(name="membership")
+
+
+def is_member(member: types.ChatMember) -> bool:
+    """True if a ChatMember object represents someone inside the chat."""
+    if member.status in (
+        ChatMemberStatus.MEMBER,
+        ChatMemberStatus.ADMINISTRATOR,
+        ChatMemberStatus.CREATOR,
+    ):
+        return True
+    if member.status == ChatMemberStatus.RESTRICTED:
+        return bool(getattr(member, "is_member", False))
+    return False
+
+
+@router.chat_member()
+async def on_chat_member(event: types.ChatMemberUpdated) -> None:
+    """Keep the joined/left flags current from real membership events."""
+    if event.chat.id != settings.supergroup_id:
+        return
+
+    was_member = is_member(event.old_chat_member)
+    now_member = is_member(event.new_chat_member)
+    if was_member == now_member:
+        return
+
+    user_id = event.new_chat_member.user.id
+    pool = await get_pool()
+    if now_member:
+        await user_repo.set_joined_supergroup(pool, user_id)
+        if event.invite_link is not None:
+            await invite_repo.mark_link_used(pool, event.invite_link.invite_link)
+        logger.info("Membership: user %s joined the supergroup", user_id)
+    else:
+        await user_repo.set_left_supergroup(pool, user_id)
+        logger.info("Membership: user %s left the supergroup", user_id)
@@ -11,6 +11,7 @@ from aiogram.fsm.context import FSMContext
 from bot.config import settings
 from bot.db.pool import get_pool
 from bot.db import config_repo, user_repo, referral_repo, video_repo
+from bot import log_config, notifier
 from bot.keyboards.inline import (
     language_keyboard,
     welcome_keyboard,
@@ -71,8 +72,11 @@ async def _handle_download_deep_link(
         affiliate = await config_repo.get_affiliate_link(pool)
 
     if affiliate:
-        # Create a download session
-        session_id = await video_repo.create_download_session(pool, user_id, video_id)
+        # Reuse the user's unused session for this video, if any
+        session_id = await video_repo.get_or_create_download_session(
+            pool, user_id, video_id
+        )
+        log_config.bind(session_id=session_id)
 
         # Build redirect URL using REDIRECT_BASE_URL
         base_url = await config_repo.get_redirect_base_url(pool)
@@ -92,9 +96,10 @@ async def _handle_download_deep_link(
         from bot.handlers.video import _deliver_video
         try:
             await _deliver_video(bot, user_id, video, lang)
-            session_id = await video_repo.create_download_session(pool, user_id, video_id)
-            await video_repo.mark_affiliate_visited(pool, session_id)
-            await video_repo.mark_video_sent(pool, session_id)
+            session_id = await video_repo.create_completed_download_session(
+                pool, user_id, video_id
+            )
+            log_config.bind(session_id=session_id)
             await video_repo.increment_downloads(pool, video_id)
             await video_repo.log_download(pool, user_id, video_id, session_id, False)
         except Exception as e:
@@ -153,51 +158,41 @@ async def cmd_start(message: types.Message, state: FSMContext) -> None:
         if referrer_id == user_id:
             referrer_id = None
 
-    # ── Create / update user in DB ────────────────────
+    # ── Create / update user + credit referral (one round trip) ──
     ref_link = f"https://t.me/{bot_config.bot_username}?start=ref_{user_id}"
-    await user_repo.create_user(
+    result = await referral_repo.register_with_referral(
         pool,
         user_id=user_id,
         username=username,
         first_name=first_name,
         referral_link=ref_link,
-        referred_by=referrer_id,
+        referrer_id=referrer_id,
     )
 
-    # ── Process referral credit ───────────────────────
-    if referrer_id is not None:
-        referrer = await user_repo.get_user(pool, referrer_id)
-        if referrer is not None:
-            result = await referral_repo.add_referral(pool, referrer_id, user_id)
-            if result is not None:
-                new_count = await user_repo.get_referral_count(pool, referrer_id)
-                required = await config_repo.get_required_referrals(pool)
-                referrer_lang = await user_repo.get_language(pool, referrer_id) or "id"
-
-                try:
-                    await message.bot.send_message(
-                        referrer_id,
-                        t(referrer_lang, "referral_credited",
-                          count=new_count, required=required),
-                    )
-                except Exception:
-                    logger.debug("Could not notify referrer %s", referrer_id)
-
-                # If referrer just completed the requirement
-                if required > 0 and new_count >= required:
-                    try:
-                        await message.bot.send_message(
-                            referrer_id,
-                            t(referrer_lang, "referral_complete",
-                              count=new_count, required=required),
-                            reply_markup=gabung_grup_keyboard(
-                                t(referrer_lang, "btn_join")),
-                        )
-                    except Exception:
-                        logger.debug("Could not send completion msg to referrer %s", referrer_id)
+    # ── Notify referrer in the background ─────────────
+    if result["credited"]:
+        new_count = result["referral_count"]
+        required = result["required"]
+        referrer_lang = result["referrer_language"] or "id"
+
+        notifier.enqueue(
+            referrer_id,
+            t(referrer_lang, "referral_credited",
+              count=new_count, required=required),
+        )
+
+        # If referrer just completed the requirement
+        if required > 0 and new_count >= required:
+            notifier.enqueue(
+                referrer_id,
+                t(referrer_lang, "referral_complete",
+                  count=new_count, required=required),
+                reply_markup=gabung_grup_keyboard(
+                    t(referrer_lang, "btn_join")),
+            )
 
     # ── Check if user already has language set ────────
-    lang = await user_repo.get_language(pool, user_id)
+    lang = result["language"]
     if lang:
         # Returning user — skip language selection, show welcome directly
         await _send_welcome(message, user_id, lang, pool)
@@ -40,6 +40,8 @@ from bot.i18n import t
 from bot.utils.thumbnail import extract_thumbnail
 from bot.utils.shortener import shorten_url
 from bot.utils.cdn import sign_bunny_url
+from bot.utils import blob_store
+from bot import log_config
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +52,14 @@ def _maybe_sign(url: str) -> str:
         return sign_bunny_url(url, settings.bunny_cdn_hostname, settings.bunny_token_key)
     return url
 
+async def _set_thumbnail(state: FSMContext, thumb_data: bytes | None) -> None:
+    """Park thumbnail bytes in the blob store; FSM state only keeps the key."""
+    data = await state.get_data()
+    blob_store.discard(data.get("thumbnail_key"))
+    key = blob_store.put(thumb_data) if thumb_data else None
+    await state.update_data(thumbnail_key=key)
+
+
 router = Router(name="video")
 
 
@@ -123,6 +133,8 @@ async def _start_video_wizard(message: types.Message, state: FSMContext) -> None
 
 @router.callback_query(F.data == "vid_cancel")
 async def cb_vid_cancel(callback: types.CallbackQuery, state: FSMContext) -> None:
+    data = await state.get_data()
+    blob_store.discard(data.get("thumbnail_key"))
     await state.clear()
     try:
         await callback.message.edit_text("Video wizard dibatalkan.")
@@ -387,8 +399,7 @@ async def _proceed_after_file(
             ),
             reply_markup=thumbnail_preview_keyboard(),
         )
-        thumb_b64 = base64.b64encode(thumb_data).decode()
-        await state.update_data(thumbnail_b64=thumb_b64)
+        await _set_thumbnail(state, thumb_data)
         await state.set_state(AdminVideo.waiting_thumbnail)
     else:
         # Failed to extract — skip thumbnail
@@ -456,7 +467,7 @@ async def cb_vid_thumb_change(callback: types.CallbackQuery, state: FSMContext)
 @router.callback_query(AdminVideo.waiting_thumbnail, F.data == "vid_thumb_skip")
 async def cb_vid_thumb_skip(callback: types.CallbackQuery, state: FSMContext) -> None:
     """Admin skips the thumbnail — post will be text-only."""
-    await state.update_data(thumbnail_b64=None)
+    await _set_thumbnail(state, None)
     await state.set_state(AdminVideo.waiting_affiliate)
     await callback.message.answer(
         "<b>Step 6/6: Affiliate Link (opsional)</b>\n\n"
@@ -478,8 +489,7 @@ async def on_thumb_custom_photo(message: types.Message, state: FSMContext) -> No
     bio = await message.bot.download_file(file.file_path)
     thumb_data = bio.read()
 
-    thumb_b64 = base64.b64encode(thumb_data).decode()
-    await state.update_data(thumbnail_b64=thumb_b64)
+    await _set_thumbnail(state, thumb_data)
 
     await state.set_state(AdminVideo.waiting_affiliate)
     await message.answer(
@@ -525,8 +535,7 @@ async def on_thumb_timestamp(message: types.Message, state: FSMContext) -> None:
             ),
             reply_markup=thumbnail_preview_keyboard(),
         )
-        thumb_b64 = base64.b64encode(thumb_data).decode()
-        await state.update_data(thumbnail_b64=thumb_b64)
+        await _set_thumbnail(state, thumb_data)
         await state.set_state(AdminVideo.waiting_thumbnail)
     else:
         await message.answer(
@@ -577,7 +586,7 @@ async def _show_video_preview(message: types.Message, state: FSMContext, *, edit
     if len(file_display) > 60:
         file_display = file_display[:57] + "..."
 
-    has_thumb = "Ya" if data.get("thumbnail_b64") else "Tidak"
+    has_thumb = "Ya" if blob_store.get(data.get("thumbnail_key")) else "Tidak"
 
     text = (
         "<b>Preview Video</b>\n\n"
@@ -618,9 +627,9 @@ async def on_video_confirm(callback: types.CallbackQuery, state: FSMContext) ->
     is_telegram_file = data.get("is_telegram_file", False)
     affiliate_link = data.get("affiliate_link")
 
-    # Decode thumbnail if present
-    thumbnail_b64 = data.get("thumbnail_b64")
-    thumbnail_data = base64.b64decode(thumbnail_b64) if thumbnail_b64 else None
+    # Thumbnail bytes live in the blob store, not in FSM state
+    thumbnail_data = blob_store.get(data.get("thumbnail_key"))
+    blob_store.discard(data.get("thumbnail_key"))
 
     pool = await get_pool()
     bot: Bot = callback.bot
@@ -760,7 +769,9 @@ async def on_video_schedule_time(message: types.Message, state: FSMContext) -> N
     description = data.get("description")
     file_url = data["file_url"]
     affiliate_link = data.get("affiliate_link")
-    thumbnail_b64 = data.get("thumbnail_b64")
+    thumbnail_data = blob_store.get(data.get("thumbnail_key"))
+    blob_store.discard(data.get("thumbnail_key"))
+    thumbnail_b64 = base64.b64encode(thumbnail_data).decode() if thumbnail_data else None
 
     # Build topic_ids comma-separated
     topic_ids_str = ",".join(str(g["topic_id"]) for g in genres_data)
@@ -868,6 +879,7 @@ async def _post_to_topic(
 async def cb_affiliate_done(callback: types.CallbackQuery) -> None:
     """Legacy fallback: user clicked 'Done' on old-style sessions."""
     session_id = callback.data[9:]  # strip "aff_done_"
+    log_config.bind(session_id=session_id)
 
     pool = await get_pool()
     session = await video_repo.get_download_session(pool, session_id)
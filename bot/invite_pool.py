@@ -0,0 +1,113 @@
+"""Pre-generated supergroup invite links.
+
+Creating an invite link is a Telegram round trip, so instead of calling
+``create_chat_invite_link`` while the user waits, a background task keeps
+``INVITE_POOL_SIZE`` spare single-use links in the ``invite_links`` table
+and handlers just claim one from the database.
+
+Spare links are created with ``INVITE_EXPIRY_SECONDS + SHELF_LIFE`` of
+validity and are only handed out while at least ``INVITE_EXPIRY_SECONDS``
+remain, so users always get the advertised window. Spares that drop below
+that are revoked and replaced; expired handed-out rows are deleted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+import asyncpg
+from aiogram import Bot
+
+from bot.config import settings
+from bot.db.pool import get_pool
+from bot.db import config_repo, invite_repo
+from bot.utils.rate_limiter import telegram_limiter
+
+logger = logging.getLogger(__name__)
+
+SHELF_LIFE = 1800  # seconds a spare link can wait in the pool
+REFILL_INTERVAL = 15  # seconds between pool maintenance passes
+CREATE_BATCH = 20  # max links created per pass
+
+_refill = asyncio.Event()
+
+
+async def _create_link(bot: Bot, lifetime: int) -> tuple[str, int]:
+    expire = int(time.time()) + lifetime
+    await telegram_limiter.acquire()
+    invite = await bot.create_chat_invite_link(
+        chat_id=settings.supergroup_id,
+        member_limit=1,
+        expire_date=expire,
+    )
+    return invite.invite_link, expire
+
+
+async def get_invite_link(
+    bot: Bot, pool: asyncpg.Pool, user_id: int
+) -> tuple[str, int]:
+    """Return ``(invite_link, seconds_left)`` for a verified user.
+
+    Served from the pool; only falls back to creating a link on the spot
+    when the pool is empty (or disabled).
+    """
+    expiry = await config_repo.get_invite_expiry(pool)
+    row = await invite_repo.claim_invite_link(pool, user_id, expiry)
+    _refill.set()
+    if row is not None:
+        return row["invite_link"], row["seconds_left"]
+
+    logger.info("Invite pool empty, creating link for user %s on demand", user_id)
+    link, expire = await _create_link(bot, expiry)
+    await invite_repo.add_invite_links(pool, [(link, expire)], user_id=user_id)
+    return link, expiry
+
+
+async def _maintain(bot: Bot) -> None:
+    pool = await get_pool()
+    expiry = await config_repo.get_invite_expiry(pool)
+    size = await config_repo.get_invite_pool_size(pool)
+
+    stale = await invite_repo.take_stale_pooled_links(pool, expiry)
+    for link in stale:
+        await telegram_limiter.acquire()
+        try:
+            await bot.revoke_chat_invite_link(settings.supergroup_id, link)
+        except Exception:
+            logger.debug("Invite pool: could not revoke %s", link)
+
+    deleted = await invite_repo.delete_expired_links(pool)
+    if stale or deleted:
+        logger.info(
+            "Invite pool: revoked %d stale spare(s), removed %d expired link(s)",
+            len(stale), deleted,
+        )
+
+    missing = size - await invite_repo.count_pooled_links(pool, expiry)
+    created: list[tuple[str, int]] = []
+    for _ in range(min(missing, CREATE_BATCH)):
+        try:
+            created.append(await _create_link(bot, expiry + SHELF_LIFE))
+        except Exception:
+            logger.exception("Invite pool: failed to create invite link")
+            break
+    if created:
+        await invite_repo.add_invite_links(pool, created)
+        logger.info("Invite pool: added %d link(s)", len(created))
+
+
+async def start_invite_pool(bot: Bot) -> None:
+    """Keep the invite pool topped up forever. Start as a background task."""
+    logger.info("Invite pool started (refill every %ds)", REFILL_INTERVAL)
+    while True:
+        try:
+            await _maintain(bot)
+        except Exception:
+            logger.exception("Invite pool maintenance failed")
+        _refill.clear()
+        try:
+            await asyncio.wait_for(_refill.wait(), timeout=REFILL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
@@ -285,6 +285,10 @@ def admin_main_menu() -> InlineKeyboardMarkup:
             ],
             [
                 InlineKeyboardButton(text="Broadcast", callback_data="adm_broadcast"),
+                InlineKeyboardButton(text="Slow Updates", callback_data="adm_slow"),
+            ],
+            [
+                InlineKeyboardButton(text="Top Queries", callback_data="adm_queries"),
             ],
             [InlineKeyboardButton(text="Close Panel", callback_data="adm_close")],
         ]
@@ -315,6 +319,7 @@ def admin_quick_panel_keyboard() -> InlineKeyboardMarkup:
 _CONFIG_LABELS: dict[str, str] = {
     "REQUIRED_REFERRALS": "Required Referrals",
     "INVITE_EXPIRY_SECONDS": "Invite Expiry (sec)",
+    "INVITE_POOL_SIZE": "Invite Pool Size",
     "ADMIN_IDS": "Admin IDs",
     "AFFILIATE_LINK": "Affiliate Link",
     "WELCOME_MESSAGE": "Welcome Message",
@@ -325,6 +330,12 @@ _CONFIG_LABELS: dict[str, str] = {
     "BUNNY_STORAGE_API_KEY": "Bunny Storage Key",
     "BUNNY_STORAGE_ZONE": "Bunny Storage Zone",
     "BUNNY_STORAGE_REGION": "Bunny Storage Region",
+    "FSM_STATE_TTL_HOURS": "Wizard State TTL (hours)",
+    "MEMBERSHIP_RECONCILE_HOURS": "Membership Recheck (hours)",
+    "DOWNLOAD_RETENTION_MONTHS": "Download Log Retention (months)",
+    "STATS_API_TOKEN": "Stats API Token",
+    "SLOW_UPDATE_MS": "Slow Update Log (ms)",
+    "SLOW_QUERY_MS": "Slow Query EXPLAIN (ms)",
 }
 
 # Keys that should render as ON/OFF toggle buttons instead of text editor
@@ -398,6 +409,35 @@ def admin_users_menu() -> InlineKeyboardMarkup:
     )
 
 
+# ──────────────────────────────────────────────
+# Admin Panel — Top queries report
+# ──────────────────────────────────────────────
+
+def top_queries_keyboard(planned: list[tuple[int, str]]) -> InlineKeyboardMarkup:
+    """Buttons opening the captured EXPLAIN plans, plus Reset / Back.
+
+    ``planned`` is a list of (query_id, name) for queries with a plan.
+    """
+    buttons = [
+        [InlineKeyboardButton(text=f"Plan: {name[:40]}", callback_data=f"adm_qplan_{qid}")]
+        for qid, name in planned
+    ]
+    buttons.append([
+        InlineKeyboardButton(text="Reset", callback_data="adm_queries_reset"),
+        InlineKeyboardButton(text="< Back to Menu", callback_data="adm_main"),
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def query_plan_keyboard() -> InlineKeyboardMarkup:
+    """Back button from a single EXPLAIN plan to the report."""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="< Back", callback_data="adm_queries")]
+        ]
+    )
+
+
 # ──────────────────────────────────────────────
 # Admin Panel — generic helpers
 # ──────────────────────────────────────────────
@@ -467,9 +507,12 @@ def video_confirm_or_schedule_keyboard() -> InlineKeyboardMarkup:
     )
 
 
-def schedule_queue_keyboard(items: list) -> InlineKeyboardMarkup:
-    """Display scheduled items with cancel option."""
+def schedule_queue_keyboard(
+    items: list, has_prev: bool = False, has_next: bool = False
+) -> InlineKeyboardMarkup:
+    """Display one page of scheduled items with cancel and paging buttons."""
     rows = []
+    ids = [item["schedule_id"] for item in items]
     for item in items:
         sid = item["schedule_id"]
         title = item["title"][:30]
@@ -477,12 +520,22 @@ def schedule_queue_keyboard(items: list) -> InlineKeyboardMarkup:
         sched_at = item["scheduled_at"].strftime("%m-%d %H:%M")
         label = f"[{status}] {title} @ {sched_at}"
         if status == "pending":
+            # Page anchor to redraw after cancelling (the item itself moves)
+            others = [i for i in ids if i != sid]
+            anchor = others[0] if others else 0
             rows.append([
                 InlineKeyboardButton(text=label, callback_data=f"sched_info_{sid}"),
-                InlineKeyboardButton(text="X", callback_data=f"sched_cancel_{sid}"),
+                InlineKeyboardButton(text="X", callback_data=f"sched_cancel_{sid}_{anchor}"),
             ])
         else:
             rows.append([InlineKeyboardButton(text=label, callback_data=f"sched_info_{sid}")])
+    nav = []
+    if has_prev and ids:
+        nav.append(InlineKeyboardButton(text="< Prev", callback_data=f"sched_page_b_{ids[0]}"))
+    if has_next and ids:
+        nav.append(InlineKeyboardButton(text="Next >", callback_data=f"sched_page_a_{ids[-1]}"))
+    if nav:
+        rows.append(nav)
     rows.append([InlineKeyboardButton(text="< Back", callback_data="adm_main")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
@@ -0,0 +1,201 @@
+"""Non-blocking logging: a queue in front of the real handlers.
+
+``setup_logging()`` replaces ``logging.basicConfig``. The root logger
+gets a single ``QueueHandler``; a ``QueueListener`` thread does the
+formatting and the writes to stdout, so a slow terminal, pipe or log
+shipper never stalls the event loop. The queue is bounded
+(``QUEUE_SIZE``); when it is full, records are dropped and counted in
+``bot_log_records_dropped_total{reason="queue_full"}`` rather than
+waiting.
+
+Output (``LOG_FORMAT`` in .env):
+  text   the classic ``time | LEVEL | logger — message`` line, followed by
+         ``[update_id=… user_id=…]`` when correlation fields are set
+  json   one object per line: ts, level, logger, msg, the correlation
+         fields and ``exc`` (traceback) when present
+
+Correlation: ``bind(**fields)`` adds fields (``update_id``, ``user_id``,
+``session_id``, ``job`` …) to every record logged for the rest of the
+current task; ``bound(**fields)`` does the same for a ``with`` block.
+``LogContextMiddleware`` binds the update and user id for each update.
+
+Sampling (``LOG_SAMPLE``): ``logger=rate`` pairs, e.g.
+``aiohttp.access=0.1,bot.web=0.25``, keep that share of a logger's (and
+its children's) records at INFO and below; warnings and errors are
+always kept.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+from bot import metrics
+
+QUEUE_SIZE = 10_000  # records waiting for the writer thread
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s — %(message)s"
+TEXT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Correlation fields attached to every record logged in this context
+log_context: ContextVar[dict[str, Any]] = ContextVar("log_context", default={})
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def bind(**fields: Any) -> None:
+    """Attach *fields* to all further records in the current context."""
+    log_context.set({**log_context.get(), **fields})
+
+
+@contextmanager
+def bound(**fields: Any) -> Iterator[None]:
+    """Attach *fields* to records logged inside the ``with`` block."""
+    token = log_context.set({**log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        log_context.reset(token)
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """``"aiohttp.access=0.1, bot.web=0.5"`` -> {logger: rate}."""
+    rates: dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, rate = part.strip().partition("=")
+        if not name or not rate:
+            continue
+        try:
+            rates[name] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class _ContextFilter(logging.Filter):
+    """Sample noisy loggers and stamp records with the correlation fields.
+
+    Runs in the thread that logs (before the record is queued), where
+    the caller's context is still current.
+    """
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self._rates = rates
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self._rates:
+                    rate = self._rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self._rates and record.levelno <= logging.INFO:
+            rate = self._rate(record.name)
+            if rate < 1.0 and random.random() >= rate:
+                metrics.LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+                return False
+        record.ctx = log_context.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and keeps the traceback separate."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback here: args and exc_info may
+        # not be safe to touch from the writer thread.
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__(TEXT_FORMAT, TEXT_DATEFMT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        ctx = getattr(record, "ctx", None)
+        if ctx:
+            fields = " ".join(f"{k}={v}" for k, v in ctx.items())
+            head, sep, tail = line.partition("\n")  # keep tracebacks below
+            line = f"{head} [{fields}]{sep}{tail}"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "ctx", None) or {})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", sample: str = "") -> None:
+    """Route all logging through a bounded queue to a writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt.lower() == "json" else TextFormatter())
+
+    handler = _QueueHandler(queue.Queue(maxsize=QUEUE_SIZE))
+    handler.addFilter(_ContextFilter(parse_sample_rates(sample)))
+
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(
+        handler.queue, output, respect_handler_level=True,
+    )
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
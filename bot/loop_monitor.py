@@ -0,0 +1,103 @@
+"""Event-loop lag and task monitor.
+
+Polling, the redirect server, the scheduler and ffmpeg subprocess
+handling all share one asyncio loop, so a single blocking call stalls
+everything. Two pieces watch for that:
+
+  - ``start_loop_monitor()`` (background task) sleeps ``INTERVAL`` seconds
+    at a time and records how late it wakes up as loop lag.
+  - A watchdog thread checks the monitor's heartbeat. When the loop has
+    not ticked for ``STALL_THRESHOLD`` seconds it logs the loop thread's
+    current stack — i.e. whatever is blocking — once per stall.
+
+Lag, stalls and live tasks grouped by name are exported via ``bot.metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time as _time
+import traceback
+
+from bot import metrics
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = 0.5  # seconds between lag samples
+STALL_THRESHOLD = 1.0  # seconds of lag that count as a stall
+WATCHDOG_INTERVAL = 0.25  # how often the watchdog thread checks the heartbeat
+
+# Monotonic time of the monitor's last wake-up (written by the loop thread)
+_state: dict[str, float] = {"beat": 0.0}
+
+
+def _task_name(task: asyncio.Task) -> str:
+    """Explicit task name, or the coroutine's qualified name for ``Task-N``."""
+    name = task.get_name()
+    if name.startswith("Task-"):
+        coro = task.get_coro()
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+    return name
+
+
+def _collect_tasks() -> None:
+    try:
+        tasks = asyncio.all_tasks()
+    except RuntimeError:
+        return  # no running loop (e.g. rendered from a thread)
+    metrics.ASYNCIO_TASKS.clear()
+    for name, n in collections.Counter(_task_name(t) for t in tasks).items():
+        metrics.ASYNCIO_TASKS.labels(name=name).set(n)
+
+
+metrics.add_collector(_collect_tasks)
+
+
+def _watchdog(loop_thread_id: int, stop: threading.Event) -> None:
+    reported = False
+    while not stop.wait(WATCHDOG_INTERVAL):
+        stalled = _time.monotonic() - _state["beat"] - INTERVAL
+        if stalled < STALL_THRESHOLD:
+            reported = False
+            continue
+        if reported:
+            continue
+        reported = True
+        frame = sys._current_frames().get(loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else "  (no frame)\n"
+        logger.warning(
+            "Event loop blocked for %.1fs; loop thread is at:\n%s", stalled, stack.rstrip()
+        )
+
+
+async def start_loop_monitor() -> None:
+    """Sample loop lag forever and run the stall watchdog. Start as a task."""
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    _state["beat"] = _time.monotonic()
+    watchdog = threading.Thread(
+        target=_watchdog,
+        args=(threading.get_ident(), stop),
+        name="loop-watchdog",
+        daemon=True,
+    )
+    watchdog.start()
+    logger.info("Loop monitor started (stall threshold %.1fs)", STALL_THRESHOLD)
+
+    try:
+        while True:
+            start = loop.time()
+            await asyncio.sleep(INTERVAL)
+            lag = max(0.0, loop.time() - start - INTERVAL)
+            _state["beat"] = _time.monotonic()
+            metrics.LOOP_LAG.observe(lag)
+            metrics.LOOP_LAG_LAST.set(lag)
+            if lag >= STALL_THRESHOLD:
+                metrics.LOOP_STALLS.inc()
+                logger.warning("Event loop lag %.2fs", lag)
+    finally:
+        stop.set()
@@ -0,0 +1,401 @@
+"""Prometheus metrics for the bot process.
+
+Served by the web server at ``GET /metrics`` in the Prometheus text
+exposition format. The three metric types needed here are implemented
+locally, so no client library is required:
+
+    REDIRECTS.labels(status=302).inc()
+    with SCHEDULER_JOB_SECONDS.labels(job="sweep_fsm_states").time():
+        ...
+
+What is measured:
+  - aiogram handler latency (``middleware.HandlerMetricsMiddleware``)
+  - Telegram Bot API calls by method (``middleware.TelegramMetricsMiddleware``)
+  - every public coroutine in ``bot/db/*_repo.py`` (``instrument_repos()``,
+    which also names the SQL recorded by ``bot.db.query_stats``)
+  - asyncpg pool connections, sampled at scrape time
+  - scheduler job durations and the backlog of due scheduled videos
+  - outbound ShrinkMe / Bunny HTTP latency (``http_trace_config()``)
+  - redirect-server responses by status code
+  - end-to-end update latency (``middleware.UpdateTimingMiddleware``)
+  - event-loop lag, stalls and live asyncio tasks (``bot.loop_monitor``)
+  - log records dropped by sampling or a full log queue (``bot.log_config``)
+
+Per-update accounting: while an update is being handled,
+``update_phases`` holds a dict that the DB, Bot API and outbound HTTP
+hooks above add their elapsed time to (``add_phase()``), so slow updates
+can be broken down by where the time went.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import importlib
+import inspect
+import pkgutil
+import time as _time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+import aiohttp
+
+from bot.db import pool as db_pool
+from bot.db.query_stats import repo_function
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Seconds per phase ("db", "telegram", "http") for the update being handled
+update_phases: ContextVar[dict[str, float] | None] = ContextVar("update_phases", default=None)
+# Nesting depth of instrumented repo calls, so DB time is counted once
+_repo_depth: ContextVar[int] = ContextVar("repo_depth", default=0)
+
+_registry: list["_Metric"] = []
+_collectors: list[Callable[[], None]] = []  # run before every scrape
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        i = bisect.bisect_left(self.bounds, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = _time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(_time.perf_counter() - start)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], Any] = {}
+        _registry.append(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Forget all label combinations (for gauges re-sampled per scrape)."""
+        self._children.clear()
+
+    def labels(self, **labels: Any) -> Any:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, child in sorted(self._children.items()):
+            yield from self._render_child(key, child)
+
+    def _render_child(self, key: tuple[str, ...], child: Any) -> Iterator[str]:
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, key: tuple[str, ...], child: _HistogramValue) -> Iterator[str]:
+        names = self.labelnames + ("le",)
+        cumulative = 0
+        for bound, n in zip(child.bounds, child.counts):
+            cumulative += n
+            labels = _format_labels(names, key + (_format_value(bound),))
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        yield f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {child.count}"
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+        yield f"{self.name}_count{labels} {child.count}"
+
+
+# ── Metric definitions ───────────────────────────────────────────────
+
+UPDATE_SECONDS = Histogram(
+    "bot_update_seconds",
+    "End-to-end time to process one Telegram update, by update type.",
+    ("type",),
+)
+HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds",
+    "Time spent in aiogram handlers.",
+    ("handler", "outcome"),
+)
+TELEGRAM_REQUEST_SECONDS = Histogram(
+    "bot_telegram_request_seconds",
+    "Telegram Bot API call latency by method.",
+    ("method",),
+)
+TELEGRAM_ERRORS = Counter(
+    "bot_telegram_errors_total",
+    "Telegram Bot API calls that raised, by method and error type.",
+    ("method", "error"),
+)
+REPO_CALL_SECONDS = Histogram(
+    "bot_repo_call_seconds",
+    "Time spent in bot/db repository functions.",
+    ("function",),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "bot_db_pool_connections",
+    "asyncpg pool connections by state.",
+    ("state",),
+)
+DB_POOL_MAX = Gauge(
+    "bot_db_pool_max_connections",
+    "Configured asyncpg pool size limit.",
+)
+SCHEDULER_JOB_SECONDS = Histogram(
+    "bot_scheduler_job_seconds",
+    "Duration of each scheduler job run.",
+    ("job",),
+)
+SCHEDULER_JOB_ERRORS = Counter(
+    "bot_scheduler_job_errors_total",
+    "Scheduler job runs that raised.",
+    ("job",),
+)
+SCHEDULED_DUE = Gauge(
+    "bot_scheduled_videos_due",
+    "Pending scheduled videos whose time has come (sampled each scheduler tick).",
+)
+SCHEDULED_DUE_LAG = Gauge(
+    "bot_scheduled_videos_due_lag_seconds",
+    "How long the oldest due scheduled video has been waiting.",
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "bot_http_request_seconds",
+    "Outbound HTTP request latency by service and status.",
+    ("service", "status"),
+)
+REDIRECTS = Counter(
+    "bot_redirects_total",
+    "Redirect-server responses by HTTP status.",
+    ("status",),
+)
+
+LOOP_LAG = Histogram(
+    "bot_event_loop_lag_seconds",
+    "How late the loop monitor woke up, sampled every 0.5 s.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_LAG_LAST = Gauge(
+    "bot_event_loop_lag_last_seconds",
+    "Most recent event-loop lag sample.",
+)
+LOOP_STALLS = Counter(
+    "bot_event_loop_stalls_total",
+    "Lag samples over the stall threshold (each also logs the blocking stack).",
+)
+ASYNCIO_TASKS = Gauge(
+    "bot_asyncio_tasks",
+    "Live asyncio tasks by task name (coroutine name for unnamed tasks).",
+    ("name",),
+)
+LOG_RECORDS_DROPPED = Counter(
+    "bot_log_records_dropped_total",
+    "Log records not written: sampled out or the log queue was full.",
+    ("reason",),
+)
+
+
+# ── Scrape-time collectors ───────────────────────────────────────────
+
+def add_collector(fn: Callable[[], None]) -> None:
+    """Register a callback that refreshes gauges right before each scrape."""
+    _collectors.append(fn)
+
+
+def _collect_pool() -> None:
+    pool = db_pool.current_pool()
+    if pool is None:
+        return
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    DB_POOL_CONNECTIONS.labels(state="in_use").set(size - idle)
+    DB_POOL_CONNECTIONS.labels(state="idle").set(idle)
+    DB_POOL_MAX.set(pool.get_max_size())
+
+
+add_collector(_collect_pool)
+
+
+def render() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    for collect in _collectors:
+        collect()
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric._render())
+    return "\n".join(lines) + "\n"
+
+
+# ── Instrumentation helpers ──────────────────────────────────────────
+
+def add_phase(phase: str, seconds: float) -> None:
+    """Attribute ``seconds`` to ``phase`` of the update being handled, if any."""
+    phases = update_phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+def _timed_repo(name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    histogram = REPO_CALL_SECONDS.labels(function=name)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        depth = _repo_depth.get()
+        token = _repo_depth.set(depth + 1)
+        name_token = repo_function.set(name)
+        start = _time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            elapsed = _time.perf_counter() - start
+            repo_function.reset(name_token)
+            _repo_depth.reset(token)
+            histogram.observe(elapsed)
+            if depth == 0:
+                add_phase("db", elapsed)
+
+    wrapper._instrumented = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def instrument_repos() -> None:
+    """Time every public coroutine function in ``bot/db/*_repo.py``.
+
+    Callers use ``video_repo.get_video(...)`` style attribute access, so
+    replacing the module attributes once at startup covers every call.
+    """
+    import bot.db
+
+    for info in pkgutil.iter_modules(bot.db.__path__):
+        if not info.name.endswith("_repo"):
+            continue
+        module = importlib.import_module(f"bot.db.{info.name}")
+        for attr, fn in list(vars(module).items()):
+            if (
+                attr.startswith("_")
+                or not inspect.iscoroutinefunction(fn)
+                or fn.__module__ != module.__name__
+                or getattr(fn, "_instrumented", False)
+            ):
+                continue
+            setattr(module, attr, _timed_repo(f"{info.name}.{attr}", fn))
+
+
+def http_trace_config(service: str) -> aiohttp.TraceConfig:
+    """aiohttp trace config recording request latency for ``service``."""
+
+    async def on_start(session, ctx, params) -> None:
+        ctx.start = _time.perf_counter()
+
+    def record(ctx, status: Any) -> None:
+        elapsed = _time.perf_counter() - ctx.start
+        HTTP_REQUEST_SECONDS.labels(service=service, status=status).observe(elapsed)
+        add_phase("http", elapsed)
+
+    async def on_end(session, ctx, params) -> None:
+        record(ctx, params.response.status)
+
+    async def on_exception(session, ctx, params) -> None:
+        record(ctx, "error")
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    trace.on_request_exception.append(on_exception)
+    return trace
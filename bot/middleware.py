@@ -1,4 +1,6 @@
-"""Maintenance-mode middleware — blocks non-admin users when enabled.
+"""Dispatcher and Bot API middlewares.
+
+MaintenanceMiddleware — blocks non-admin users when enabled.
 
 Registered as an *outer* middleware on the Dispatcher so it intercepts
 every update type (messages, callbacks, inline queries, etc.).
@@ -10,19 +12,38 @@ The mode is controlled by three config keys:
 
 When the mode is active and the user is not an admin, the bot replies
 with a maintenance notice and drops the update.
+
+UpdateTimingMiddleware — times every update end to end (outer middleware
+on ``dp.update``) and splits the time into DB, Telegram API and external
+HTTP phases via ``bot.metrics.update_phases``. Updates slower than
+SLOW_UPDATE_MS are logged with that breakdown and kept in a small ring
+buffer shown in the admin panel (``recent_slow_updates()``).
+
+HandlerMetricsMiddleware / TelegramMetricsMiddleware — feed handler and
+Bot API latencies into ``bot.metrics``.
+
+LogContextMiddleware — binds ``update_id`` and ``user_id`` to every log
+record written while an update is handled (``bot.log_config``).
 """
 
 from __future__ import annotations
 
 import logging
 import time as _time
+from collections import deque
 from datetime import datetime, timezone
 from typing import Any, Awaitable, Callable
 
-from aiogram import BaseMiddleware, types
+from aiogram import BaseMiddleware, Bot, types
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
 
 from bot.db.pool import get_pool
 from bot.db import config_repo, user_repo
+from bot import log_config, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +51,10 @@ logger = logging.getLogger(__name__)
 _cache: dict[str, Any] = {"ts": 0, "enabled": False, "start": None, "end": None}
 _CACHE_TTL = 30  # seconds
 
+SLOW_UPDATE_LOG_SIZE = 50  # slow updates kept for the admin panel
+_slow_updates: deque[dict[str, Any]] = deque(maxlen=SLOW_UPDATE_LOG_SIZE)
+_slow_cache: dict[str, Any] = {"ts": 0, "threshold_ms": 1000}
+
 
 def invalidate_maintenance_cache() -> None:
     """Force the next middleware call to re-read the DB.
@@ -153,3 +178,154 @@ class MaintenanceMiddleware(BaseMiddleware):
 
         # Drop the update — do NOT call handler
         return None
+
+
+def recent_slow_updates() -> list[dict[str, Any]]:
+    """Slow updates recorded by UpdateTimingMiddleware, newest first."""
+    return list(reversed(_slow_updates))
+
+
+async def _slow_threshold_ms() -> int:
+    now = _time.monotonic()
+    if now - _slow_cache["ts"] >= _CACHE_TTL:
+        pool = await get_pool()
+        threshold = await config_repo.get_slow_update_ms(pool)
+        _slow_cache.update(ts=now, threshold_ms=threshold)
+    return _slow_cache["threshold_ms"]
+
+
+def _describe_update(update: types.Update) -> str:
+    """Short, non-sensitive label: update type plus command or callback data."""
+    kind = update.event_type
+    if update.callback_query is not None:
+        return f"{kind} {update.callback_query.data or ''}".rstrip()
+    if update.message is not None:
+        text = update.message.text or ""
+        if text.startswith("/"):
+            return f"{kind} {text.split()[0]}"
+        return f"{kind} ({update.message.content_type})"
+    return kind
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """Outer ``dp.update`` middleware: log correlation fields per update."""
+
+    async def __call__(
+        self,
+        handler: Callable[[types.TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: types.TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        fields: dict[str, Any] = {}
+        if isinstance(event, types.Update):
+            fields["update_id"] = event.update_id
+        user = data.get("event_from_user")
+        if user is not None:
+            fields["user_id"] = user.id
+        with log_config.bound(**fields):
+            return await handler(event, data)
+
+
+class UpdateTimingMiddleware(BaseMiddleware):
+    """Outer ``dp.update`` middleware: end-to-end timing + slow-update log."""
+
+    async def __call__(
+        self,
+        handler: Callable[[types.TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: types.TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        phases: dict[str, float] = {}
+        token = metrics.update_phases.set(phases)
+        start = _time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            total = _time.perf_counter() - start
+            metrics.update_phases.reset(token)
+            if isinstance(event, types.Update):
+                metrics.UPDATE_SECONDS.labels(type=event.event_type).observe(total)
+                await self._check_slow(event, total, phases)
+
+    @staticmethod
+    async def _check_slow(update: types.Update, total: float, phases: dict[str, float]) -> None:
+        try:
+            threshold_ms = await _slow_threshold_ms()
+        except Exception:
+            return
+        if threshold_ms <= 0 or total * 1000 < threshold_ms:
+            return
+
+        entry = {
+            "at": datetime.now(timezone.utc),
+            "update": _describe_update(update),
+            "total_ms": total * 1000,
+            "db_ms": phases.get("db", 0.0) * 1000,
+            "telegram_ms": phases.get("telegram", 0.0) * 1000,
+            "http_ms": phases.get("http", 0.0) * 1000,
+        }
+        # Phases can overlap (e.g. gathered calls), so "other" is clamped at 0
+        entry["other_ms"] = max(
+            0.0, entry["total_ms"] - entry["db_ms"] - entry["telegram_ms"] - entry["http_ms"]
+        )
+        _slow_updates.append(entry)
+        logger.warning(
+            "Slow update %s: %.0f ms (db %.0f, telegram %.0f, http %.0f, other %.0f)",
+            entry["update"], entry["total_ms"], entry["db_ms"],
+            entry["telegram_ms"], entry["http_ms"], entry["other_ms"],
+        )
+
+
+def handler_name(data: dict[str, Any]) -> str:
+    """``module.function`` of the handler an inner middleware is wrapping."""
+    handler_obj = data.get("handler")
+    if handler_obj is None:
+        return "unknown"
+    callback = handler_obj.callback
+    module = getattr(callback, "__module__", "").rsplit(".", 1)[-1]
+    return f"{module}.{getattr(callback, '__name__', 'handler')}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware timing each handler call, labelled ``module.function``."""
+
+    async def __call__(
+        self,
+        handler: Callable[[types.TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: types.TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        name = handler_name(data)
+        outcome = "ok"
+        start = _time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            metrics.HANDLER_SECONDS.labels(handler=name, outcome=outcome).observe(
+                _time.perf_counter() - start
+            )
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Bot session middleware timing every Bot API call and counting errors."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[Any],
+        bot: Bot,
+        method: TelegramMethod[Any],
+    ) -> Response[Any]:
+        api_method = getattr(method, "__api_method__", type(method).__name__)
+        start = _time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            metrics.TELEGRAM_ERRORS.labels(method=api_method, error=type(e).__name__).inc()
+            raise
+        finally:
+            elapsed = _time.perf_counter() - start
+            metrics.TELEGRAM_REQUEST_SECONDS.labels(method=api_method).observe(elapsed)
+            metrics.add_phase("telegram", elapsed)
@@ -0,0 +1,72 @@
+"""Background notification queue — fire-and-forget Telegram messages.
+
+Handlers that need to message a *third party* (e.g. crediting a referrer
+from /start) enqueue the message here instead of awaiting the send, so
+the user's own reply is not held up by extra Telegram round trips.
+
+Messages are sharded across workers by chat_id, which keeps messages to
+the same chat in order while different chats are sent concurrently.
+Every send goes through the shared Telegram rate limiter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot.utils.rate_limiter import telegram_limiter
+
+logger = logging.getLogger(__name__)
+
+WORKER_COUNT = 4
+QUEUE_SIZE = 10_000  # per worker; further messages are dropped with a warning
+
+_queues: list[asyncio.Queue] = []
+
+
+def enqueue(chat_id: int, text: str, reply_markup: Any = None) -> None:
+    """Queue a message for background delivery (never blocks)."""
+    if not _queues:
+        logger.warning("Notifier not running, dropping message to %s", chat_id)
+        return
+    queue = _queues[chat_id % len(_queues)]
+    try:
+        queue.put_nowait((chat_id, text, reply_markup))
+    except asyncio.QueueFull:
+        logger.warning("Notifier queue full, dropping message to %s", chat_id)
+
+
+async def _send(bot: Bot, chat_id: int, text: str, reply_markup: Any) -> None:
+    for _ in range(2):  # one retry after flood-control backoff
+        await telegram_limiter.acquire()
+        try:
+            await bot.send_message(chat_id, text, reply_markup=reply_markup)
+            return
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except Exception:
+            break
+    logger.debug("Notifier: could not deliver message to %s", chat_id)
+
+
+async def _worker(bot: Bot, queue: asyncio.Queue) -> None:
+    while True:
+        chat_id, text, reply_markup = await queue.get()
+        try:
+            await _send(bot, chat_id, text, reply_markup)
+        finally:
+            queue.task_done()
+
+
+async def start_notifier(bot: Bot) -> None:
+    """Run the notification workers forever. Start as a background task."""
+    _queues[:] = [asyncio.Queue(maxsize=QUEUE_SIZE) for _ in range(WORKER_COUNT)]
+    logger.info("Notifier started (workers=%d)", WORKER_COUNT)
+    try:
+        await asyncio.gather(*(_worker(bot, q) for q in _queues))
+    finally:
+        _queues.clear()
@@ -5,6 +5,15 @@ Tasks:
     referral requirement but haven't been notified yet.
   - check_maintenance_auto_disable: auto-disables maintenance when window ends.
   - process_scheduled_videos: posts scheduled videos when their time arrives.
+  - sweep_fsm_states: deletes FSM states untouched for FSM_STATE_TTL_HOURS.
+  - sweep_download_sessions: deletes sessions that expired unused (or, with
+    the partitioned layout, rolls the daily partitions forward).
+  - roll_up_downloads: keeps hourly/daily download rollups current and
+    applies DOWNLOAD_RETENTION_MONTHS to the raw downloads log.
+  - refresh_stats_snapshot: recomputes the admin statistics snapshot every
+    STATS_REFRESH_INTERVAL seconds.
+  - reconcile_membership: optional pass (every MEMBERSHIP_RECONCILE_HOURS)
+    re-checking supergroup membership in case chat_member updates were missed.
 """
 
 from __future__ import annotations
@@ -12,19 +21,64 @@ from __future__ import annotations
 import asyncio
 import base64
 import logging
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 
 from bot.db.pool import get_pool
-from bot.db import config_repo, user_repo, topic_repo, video_repo, schedule_repo
+from bot.db import (
+    config_repo, user_repo, topic_repo, video_repo, schedule_repo, fsm_repo,
+    partition_repo, stats_repo,
+)
 from bot.keyboards.inline import gabung_grup_keyboard, download_button
 from bot.i18n import t
 from bot.config import settings
+from bot import log_config, metrics
+from bot.utils.rate_limiter import telegram_limiter
 
 logger = logging.getLogger(__name__)
 
 CHECK_INTERVAL = 60  # seconds
+QUALIFY_BATCH_SIZE = 500  # users claimed per UPDATE … RETURNING
+RECONCILE_BATCH_SIZE = 200  # users re-checked per scheduler tick
+SESSION_SWEEP_BATCH = 5000  # expired download sessions deleted per tick
+SESSION_SWEEP_GRACE = 3600  # seconds after expiry before a session is deleted
+SESSION_PARTITION_DAYS = 7  # days of partitions kept (partitioned layout only)
+ROLLUP_MAX_WINDOW = timedelta(days=7)  # backfill at most this much per tick
+DOWNLOAD_PURGE_BATCH = 5000  # old download rows deleted per tick (unpartitioned)
+STATS_REFRESH_INTERVAL = 300  # seconds between stats snapshot refreshes
+
+# Download rollups are complete up to this instant (None = not loaded yet)
+_rollup: dict[str, datetime | None] = {"mark": None}
+
+# When the stats snapshot was last refreshed (monotonic clock)
+_stats_refreshed: dict[str, float] = {"at": 0.0}
+
+# Membership reconciliation progress: keyset cursor + when the last pass ended
+_reconcile: dict[str, float] = {"cursor": 0, "finished": 0.0}
+
+
+async def _notify_qualified(bot: Bot, row, required: int) -> None:
+    """Send the 'referral complete' message to one newly qualified user."""
+    uid = row["user_id"]
+    count = row["referral_count"]
+    lang = row["language"] or "id"
+    text = t(lang, "referral_complete", count=count, required=required)
+    markup = gabung_grup_keyboard(t(lang, "btn_join"))
+
+    for _ in range(2):  # one retry after flood-control backoff
+        await telegram_limiter.acquire()
+        try:
+            await bot.send_message(uid, text, reply_markup=markup)
+            logger.info("Scheduler: notified user %s (refs=%d)", uid, count)
+            return
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except Exception:
+            break
+    logger.warning("Scheduler: could not notify user %s", uid)
 
 
 async def _check_newly_qualified(bot: Bot) -> None:
@@ -36,39 +90,20 @@ async def _check_newly_qualified(bot: Bot) -> None:
         # Auto-approve mode — nothing to scan
         return
 
-    # Users who have enough referrals but haven't been marked verified
-    rows = await pool.fetch(
-        """
-        SELECT user_id, referral_count, language
-        FROM users
-        WHERE referral_count >= $1
-          AND verification_complete = FALSE
-        """,
-        required,
-    )
-
-    if not rows:
-        return
-
-    logger.info("Scheduler: found %d newly qualified user(s)", len(rows))
-
-    for row in rows:
-        uid = row["user_id"]
-        count = row["referral_count"]
-        lang = row["language"] or "id"
+    # Claim (mark verified) in bounded batches so we never notify twice,
+    # then fan the notifications out through the shared rate limiter.
+    while True:
+        rows = await user_repo.claim_newly_qualified(
+            pool, required, limit=QUALIFY_BATCH_SIZE
+        )
+        if not rows:
+            return
 
-        # Mark verified so we don't notify again
-        await user_repo.set_verification_complete(pool, uid)
+        logger.info("Scheduler: found %d newly qualified user(s)", len(rows))
+        await asyncio.gather(*(_notify_qualified(bot, row, required) for row in rows))
 
-        try:
-            await bot.send_message(
-                uid,
-                t(lang, "referral_complete", count=count, required=required),
-                reply_markup=gabung_grup_keyboard(t(lang, "btn_join")),
-            )
-            logger.info("Scheduler: notified user %s (refs=%d)", uid, count)
-        except Exception:
-            logger.warning("Scheduler: could not notify user %s", uid)
+        if len(rows) < QUALIFY_BATCH_SIZE:
+            return
 
 
 async def _check_maintenance_auto_disable() -> None:
@@ -94,6 +129,135 @@ async def _check_maintenance_auto_disable() -> None:
         logger.info("Scheduler: maintenance mode auto-disabled (end time passed)")
 
 
+async def _sweep_fsm_states() -> None:
+    """Delete abandoned wizard states (in bounded batches)."""
+    pool = await get_pool()
+    ttl_hours = await config_repo.get_fsm_state_ttl_hours(pool)
+    if ttl_hours <= 0:
+        return
+    deleted = await fsm_repo.delete_stale_fsm_states(pool, ttl_hours * 3600)
+    if deleted:
+        logger.info("Scheduler: removed %d stale FSM state(s)", deleted)
+
+
+async def _sweep_download_sessions() -> None:
+    """Bound the download_sessions table (batched delete or partition roll)."""
+    pool = await get_pool()
+    if await partition_repo.is_partitioned(pool, "download_sessions"):
+        today = datetime.now(timezone.utc).date()
+        await partition_repo.ensure_partitions(
+            pool, "download_sessions", "day", today, ahead=2
+        )
+        dropped = await partition_repo.drop_partitions_before(
+            pool, "download_sessions", "day",
+            today - timedelta(days=SESSION_PARTITION_DAYS),
+        )
+        if dropped:
+            logger.info("Scheduler: dropped session partition(s) %s", ", ".join(dropped))
+        return
+
+    deleted = await video_repo.delete_expired_sessions(
+        pool, SESSION_SWEEP_GRACE, limit=SESSION_SWEEP_BATCH
+    )
+    if deleted:
+        logger.info("Scheduler: removed %d expired download session(s)", deleted)
+
+
+async def _roll_up_downloads() -> None:
+    """Advance the download rollups, then trim the raw log to its retention."""
+    pool = await get_pool()
+    now = datetime.now(timezone.utc)
+
+    mark = _rollup["mark"]
+    if mark is None:
+        mark = await video_repo.get_rollup_start(pool)
+    if mark is not None:
+        # Re-read the last few minutes so rows committed late are counted
+        start = (mark - timedelta(minutes=5)).astimezone(timezone.utc)
+        start = start.replace(minute=0, second=0, microsecond=0)
+        end = min(start + ROLLUP_MAX_WINDOW, now)
+        await video_repo.roll_up_downloads(pool, start, end)
+        _rollup["mark"] = mark = end
+
+    partitioned = await partition_repo.is_partitioned(pool, "downloads")
+    if partitioned:
+        await partition_repo.ensure_partitions(
+            pool, "downloads", "month", now.date(), ahead=1
+        )
+
+    months = await config_repo.get_download_retention_months(pool)
+    if months <= 0 or mark is None:
+        return
+    first = now.date().replace(day=1)
+    total = first.year * 12 + first.month - 1 - months
+    cutoff = first.replace(year=total // 12, month=total % 12 + 1)
+    # Never drop rows that have not been rolled up yet
+    cutoff = min(cutoff, mark.date())
+
+    if partitioned:
+        detached = await partition_repo.detach_partitions_before(
+            pool, "downloads", "month", cutoff
+        )
+        if detached:
+            logger.info("Scheduler: detached download partition(s) %s", ", ".join(detached))
+    else:
+        deleted = await video_repo.delete_downloads_before(
+            pool,
+            datetime(cutoff.year, cutoff.month, cutoff.day, tzinfo=timezone.utc),
+            limit=DOWNLOAD_PURGE_BATCH,
+        )
+        if deleted:
+            logger.info("Scheduler: purged %d download(s) past retention", deleted)
+
+
+async def _refresh_stats_snapshot() -> None:
+    """Recompute the admin statistics snapshot when it is due."""
+    if time.monotonic() - _stats_refreshed["at"] < STATS_REFRESH_INTERVAL:
+        return
+    pool = await get_pool()
+    await stats_repo.refresh_snapshot(pool)
+    _stats_refreshed["at"] = time.monotonic()
+
+
+async def _reconcile_membership(bot: Bot) -> None:
+    """Re-check one batch of users against real supergroup membership."""
+    from bot.handlers.membership import is_member
+
+    pool = await get_pool()
+    hours = await config_repo.get_membership_reconcile_hours(pool)
+    if hours <= 0:
+        return
+    if _reconcile["cursor"] == 0 and time.monotonic() - _reconcile["finished"] < hours * 3600:
+        return  # previous full pass is recent enough
+
+    rows = await user_repo.get_membership_batch(
+        pool, int(_reconcile["cursor"]), limit=RECONCILE_BATCH_SIZE
+    )
+    fixed = 0
+    for row in rows:
+        uid = row["user_id"]
+        await telegram_limiter.acquire()
+        try:
+            member = await bot.get_chat_member(settings.supergroup_id, uid)
+        except Exception:
+            continue
+        in_group = is_member(member)
+        if in_group and not row["joined_supergroup"]:
+            await user_repo.set_joined_supergroup(pool, uid)
+            fixed += 1
+        elif not in_group and row["joined_supergroup"]:
+            await user_repo.set_left_supergroup(pool, uid)
+            fixed += 1
+
+    if fixed:
+        logger.info("Scheduler: membership reconcile fixed %d user(s)", fixed)
+
+    if len(rows) < RECONCILE_BATCH_SIZE:
+        _reconcile.update(cursor=0, finished=time.monotonic())
+    else:
+        _reconcile["cursor"] = rows[-1]["user_id"]
+
+
 async def _process_scheduled_videos(bot: Bot) -> None:
     """Post scheduled videos that are due."""
     from bot.utils.shortener import shorten_url
@@ -102,6 +266,10 @@ async def _process_scheduled_videos(bot: Bot) -> None:
     from aiogram.types import BufferedInputFile
 
     pool = await get_pool()
+    due, oldest_wait = await schedule_repo.get_due_backlog(pool)
+    metrics.SCHEDULED_DUE.set(due)
+    metrics.SCHEDULED_DUE_LAG.set(oldest_wait)
+
     pending = await schedule_repo.get_pending_videos(pool, limit=3)
 
     if not pending:
@@ -273,20 +441,26 @@ async def _post_to_topic_scheduled(
         return None, None
 
 
+async def _run_job(name: str, job, *args) -> None:
+    """Run one scheduler job, timing it and logging (not raising) errors."""
+    try:
+        with log_config.bound(job=name), metrics.SCHEDULER_JOB_SECONDS.labels(job=name).time():
+            await job(*args)
+    except Exception:
+        metrics.SCHEDULER_JOB_ERRORS.labels(job=name).inc()
+        logger.exception("Scheduler error in %s", name)
+
+
 async def start_scheduler(bot: Bot) -> None:
     """Run periodic tasks forever. Call this as a background asyncio task."""
     logger.info("Scheduler started (interval=%ds)", CHECK_INTERVAL)
     while True:
-        try:
-            await _check_newly_qualified(bot)
-        except Exception:
-            logger.exception("Scheduler error in check_newly_qualified")
-        try:
-            await _check_maintenance_auto_disable()
-        except Exception:
-            logger.exception("Scheduler error in check_maintenance_auto_disable")
-        try:
-            await _process_scheduled_videos(bot)
-        except Exception:
-            logger.exception("Scheduler error in process_scheduled_videos")
+        await _run_job("check_newly_qualified", _check_newly_qualified, bot)
+        await _run_job("check_maintenance_auto_disable", _check_maintenance_auto_disable)
+        await _run_job("process_scheduled_videos", _process_scheduled_videos, bot)
+        await _run_job("sweep_fsm_states", _sweep_fsm_states)
+        await _run_job("sweep_download_sessions", _sweep_download_sessions)
+        await _run_job("roll_up_downloads", _roll_up_downloads)
+        await _run_job("refresh_stats_snapshot", _refresh_stats_snapshot)
+        await _run_job("reconcile_membership", _reconcile_membership, bot)
         await asyncio.sleep(CHECK_INTERVAL)
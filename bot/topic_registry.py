@@ -0,0 +1,101 @@
+"""In-memory registry of category topics.
+
+Topics change a few times a month but are read on every category picker
+and every post fan-out, so the whole table is kept in memory, indexed by
+id and lowercase name. ``topic_repo`` read functions serve from here
+whenever a snapshot is loaded and fall back to the database otherwise.
+
+Invalidation:
+  - ``topic_repo`` write functions call ``invalidate()`` directly.
+  - A statement trigger on ``topics`` sends ``NOTIFY topics_changed``,
+    which reaches every bot instance through a dedicated LISTEN
+    connection.
+  - The snapshot is also reloaded every ``REFRESH_INTERVAL`` seconds in
+    case notifications are lost (e.g. behind a transaction pooler).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import asyncpg
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "topics_changed"
+REFRESH_INTERVAL = 60  # seconds between unconditional reloads
+RECONNECT_DELAY = 5  # seconds before re-opening a lost LISTEN connection
+
+
+@dataclass(frozen=True, slots=True)
+class _Snapshot:
+    ordered: tuple[asyncpg.Record, ...]  # is_all first, then by name
+    by_id: dict[int, asyncpg.Record]
+    by_name: dict[str, asyncpg.Record]  # lowercase name → topic
+    all_topic: Optional[asyncpg.Record]
+
+
+_snapshot: _Snapshot | None = None
+_version = 0  # bumped on every invalidation
+_changed = asyncio.Event()
+
+
+def current() -> _Snapshot | None:
+    """The loaded snapshot, or None while stale / not yet loaded."""
+    return _snapshot
+
+
+def invalidate() -> None:
+    """Drop the snapshot and ask the background task to reload it."""
+    global _snapshot, _version
+    _snapshot = None
+    _version += 1
+    _changed.set()
+
+
+async def _reload(pool: asyncpg.Pool) -> None:
+    global _snapshot
+    version = _version
+    rows = await pool.fetch("SELECT * FROM topics ORDER BY is_all DESC, name ASC")
+    if version != _version:
+        return  # changed while loading; the pending event reloads again
+    _snapshot = _Snapshot(
+        ordered=tuple(rows),
+        by_id={r["topic_id"]: r for r in rows},
+        by_name={r["name"].lower(): r for r in rows},
+        all_topic=next((r for r in rows if r["is_all"]), None),
+    )
+
+
+async def start_topic_registry(pool: asyncpg.Pool) -> None:
+    """Load topics and keep them fresh forever. Start as a background task."""
+    logger.info("Topic registry started")
+    while True:
+        conn: asyncpg.Connection | None = None
+        try:
+            conn = await asyncpg.connect(dsn=settings.database_url)
+            await conn.add_listener(CHANNEL, lambda *_: invalidate())
+            _changed.clear()
+            await _reload(pool)
+            while not conn.is_closed():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(_changed.wait(), timeout=REFRESH_INTERVAL)
+                _changed.clear()
+                await conn.execute("SELECT 1")  # surfaces a dead LISTEN connection
+                await _reload(pool)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Topic registry: listener failed, retrying")
+        finally:
+            invalidate()  # serve from the DB until reconnected
+            if conn is not None and not conn.is_closed():
+                with contextlib.suppress(Exception):
+                    await conn.close()
+        await asyncio.sleep(RECONNECT_DELAY)
@@ -0,0 +1,179 @@
+"""Record incoming updates, anonymized, for offline replay.
+
+When ``RECORD_UPDATES_PATH`` is set in .env, ``UpdateRecorderMiddleware``
+(outer middleware on ``dp.update``) appends every update to that file as
+one JSON line::
+
+    {"at": 12.345, "admin": true, "update": {...}}
+
+``at`` is seconds since recording started; ``admin`` is present when the
+sender was in ADMIN_IDS. ``bench/replay.py`` feeds the file back into the
+dispatcher.
+
+Lines are handed to a bounded queue and written by a background thread,
+so file I/O never runs on the event loop; when the queue is full the
+update is skipped (and counted in ``dropped``) rather than waiting.
+
+Anonymization (``anonymize_update``):
+  - positive user / chat ids are replaced by a keyed hash (HMAC-SHA256)
+    with the same number of digits, so one user keeps one pseudonym
+    across the recording and ``/start ref_<id>`` links still point at
+    the referrer; group and channel ids (negative) are kept
+  - 7+ digit numbers in message text, captions and callback data are
+    hashed the same way (they are user ids: ``ref_…``, approve buttons)
+  - names become ``User``; usernames, and ``@username`` mentions in text
+    and captions, become ``u<digits>`` of the same length; last names,
+    contacts, locations and bios are dropped
+
+Replacements never change the length of the text, so the recorded
+``entities`` / ``caption_entities`` offsets still line up.
+
+The key is ``RECORD_UPDATES_SALT``; without it a random key is used, so
+pseudonyms only match within one run of the bot.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time as _time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, types
+
+from bot.db.pool import get_pool
+from bot.db import config_repo
+
+logger = logging.getLogger(__name__)
+
+_ID_KEYS = frozenset({"id", "user_id", "chat_id", "user_chat_id"})
+_TEXT_KEYS = frozenset({"text", "caption", "data"})
+_DROP_KEYS = frozenset({"last_name", "contact", "location", "venue", "bio", "phone_number"})
+_LONG_NUMBER = re.compile(r"\d{7,}")
+_MENTION = re.compile(r"@(\w{5,32})\b", re.ASCII)
+
+_ADMIN_CACHE_TTL = 30  # seconds
+QUEUE_SIZE = 10_000  # lines waiting for the writer thread
+
+
+def pseudonym(value: int | str, key: bytes, digits: int | None = None) -> int:
+    """Stable stand-in for *value* with *digits* digits.
+
+    *digits* defaults to the length of ``str(value)``, so an id keeps its
+    digit count (and a text containing it keeps its length).
+    """
+    digits = max(1, digits or len(str(value)))
+    low = 10 ** (digits - 1)
+    digest = hmac.new(key, str(value).encode(), hashlib.sha256).digest()
+    return low + int.from_bytes(digest[:8], "big") % (9 * low)
+
+
+def _username(name: str, key: bytes) -> str:
+    """``u`` plus digits, as long as *name* (usernames are 5–32 chars)."""
+    return f"u{pseudonym(name.lower(), key, len(name) - 1)}"
+
+
+def _anonymize_text(text: str, key: bytes) -> str:
+    text = _LONG_NUMBER.sub(lambda m: str(pseudonym(int(m.group()), key)), text)
+    return _MENTION.sub(lambda m: "@" + _username(m.group(1), key), text)
+
+
+def anonymize_update(data: Any, key: bytes) -> Any:
+    """Return a copy of a JSON-mode update dict with personal data replaced."""
+    if isinstance(data, list):
+        return [anonymize_update(v, key) for v in data]
+    if not isinstance(data, dict):
+        return data
+
+    out: dict[str, Any] = {}
+    for k, v in data.items():
+        if k in _DROP_KEYS:
+            continue
+        if k in _ID_KEYS and isinstance(v, int) and not isinstance(v, bool) and v > 0:
+            out[k] = pseudonym(v, key)
+        elif k == "first_name":
+            out[k] = "User"
+        elif k == "username" and isinstance(v, str):
+            out[k] = _username(v, key)
+        elif k in _TEXT_KEYS and isinstance(v, str):
+            out[k] = _anonymize_text(v, key)
+        else:
+            out[k] = anonymize_update(v, key)
+    return out
+
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    """Outer ``dp.update`` middleware appending each update to *path*."""
+
+    def __init__(self, path: str, salt: str = "") -> None:
+        self._key = salt.encode() if salt else os.urandom(32)
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue: queue.Queue[str | None] = queue.Queue(maxsize=QUEUE_SIZE)
+        self._writer = threading.Thread(
+            target=self._write_lines, name="update-recorder", daemon=True,
+        )
+        self._writer.start()
+        self._start = _time.monotonic()
+        self._admins: dict[str, Any] = {"ts": 0.0, "ids": frozenset()}
+        self.recorded = 0
+        self.dropped = 0
+        logger.info("Recording anonymized updates to %s", path)
+
+    def _write_lines(self) -> None:
+        """Writer thread: drain the queue into the file until close()."""
+        while True:
+            line = self._queue.get()
+            if line is None:
+                break
+            try:
+                self._file.write(line)
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception:
+                logger.exception("Could not write recorded update")
+
+    async def _admin_ids(self) -> frozenset[int]:
+        now = _time.monotonic()
+        if now - self._admins["ts"] >= _ADMIN_CACHE_TTL:
+            try:
+                pool = await get_pool()
+                self._admins["ids"] = frozenset(await config_repo.get_admin_ids(pool))
+            except Exception:
+                logger.debug("Could not read ADMIN_IDS", exc_info=True)
+            self._admins["ts"] = now
+        return self._admins["ids"]
+
+    async def __call__(
+        self,
+        handler: Callable[[types.TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: types.TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        try:
+            record: dict[str, Any] = {"at": round(_time.monotonic() - self._start, 3)}
+            user = data.get("event_from_user")
+            if user is not None and user.id in await self._admin_ids():
+                record["admin"] = True
+            record["update"] = anonymize_update(
+                event.model_dump(mode="json", exclude_none=True, by_alias=True), self._key,
+            )
+            self._queue.put_nowait(json.dumps(record, ensure_ascii=False) + "\n")
+            self.recorded += 1
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            logger.exception("Could not record update")
+        return await handler(event, data)
+
+    def close(self) -> None:
+        """Flush queued lines, stop the writer thread and close the file."""
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+        logger.info("Recorded %d updates (%d dropped)", self.recorded, self.dropped)
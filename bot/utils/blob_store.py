@@ -0,0 +1,76 @@
+"""In-process side-store for large wizard payloads (e.g. thumbnail bytes).
+
+FSM state should only carry small, JSON-friendly values. Binary payloads
+are parked here instead and referenced from state by an opaque key:
+
+    key = blob_store.put(jpeg_bytes)
+    await state.update_data(thumbnail_key=key)
+    ...
+    data = blob_store.get(key)   # None if evicted / expired
+
+The store is bounded by entry count and total size (oldest entries are
+evicted first) and every entry expires after a fixed TTL, so abandoned
+wizards cannot grow memory without limit. Callers must treat a missing
+blob as "no payload" rather than an error.
+"""
+
+from __future__ import annotations
+
+import time as _time
+import uuid
+from collections import OrderedDict
+
+_MAX_ENTRIES = 256
+_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+_TTL = 2 * 60 * 60  # seconds — long enough for a slow wizard
+
+# key -> (expires_at_monotonic, payload); ordered oldest -> newest access
+_store: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+_total_bytes = 0
+
+
+def _drop(key: str) -> None:
+    global _total_bytes
+    entry = _store.pop(key, None)
+    if entry is not None:
+        _total_bytes -= len(entry[1])
+
+
+def _evict(now: float) -> None:
+    """Remove expired entries, then oldest ones until within bounds."""
+    for key in [k for k, (exp, _) in _store.items() if exp <= now]:
+        _drop(key)
+    while _store and (len(_store) > _MAX_ENTRIES or _total_bytes > _MAX_BYTES):
+        _drop(next(iter(_store)))
+
+
+def put(data: bytes) -> str:
+    """Store a payload and return the key to keep in FSM state."""
+    global _total_bytes
+    key = uuid.uuid4().hex
+    now = _time.monotonic()
+    _store[key] = (now + _TTL, data)
+    _total_bytes += len(data)
+    _evict(now)
+    return key
+
+
+def get(key: str | None) -> bytes | None:
+    """Return the payload for *key*, or None if unknown or expired."""
+    if not key:
+        return None
+    entry = _store.get(key)
+    if entry is None:
+        return None
+    expires_at, data = entry
+    if expires_at <= _time.monotonic():
+        _drop(key)
+        return None
+    _store.move_to_end(key)
+    return data
+
+
+def discard(key: str | None) -> None:
+    """Release a payload early (e.g. wizard finished or cancelled)."""
+    if key:
+        _drop(key)
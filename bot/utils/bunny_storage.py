@@ -22,6 +22,10 @@ Storage structure:
 Category = top-level folder (matches DB topic name).
 Sub-folders are recursively scanned but do NOT represent categories.
 Only video files (by extension) are collected.
+
+Credentials come from the config table unless passed explicitly as
+``(api_key, zone, region)``; ``BUNNY_STORAGE_API_URL`` in .env replaces
+the regional endpoint (e.g. bench/fake_services.py).
 """
 
 from __future__ import annotations
@@ -33,8 +37,10 @@ import aiohttp
 
 from bot.db.pool import get_pool
 from bot.db import config_repo
+from bot import metrics
 
 logger = logging.getLogger(__name__)
+_TRACE = metrics.http_trace_config("bunny")
 
 # Video file extensions (lowercase, with dot)
 _VIDEO_EXTENSIONS = frozenset({
@@ -54,6 +60,9 @@ async def _get_credentials() -> tuple[str, str, str]:
 
 def _build_base_url(region: str) -> str:
     """Build the storage API base URL from region code."""
+    from bot.config import settings
+    if settings.bunny_storage_api_url:
+        return settings.bunny_storage_api_url.rstrip("/")
     if region:
         return f"https://{region}.storage.bunnycdn.com"
     return "https://storage.bunnycdn.com"
@@ -92,7 +101,7 @@ async def _list_path(api_key: str, base_url: str, zone: str, path: str) -> list[
 
     headers = {"AccessKey": api_key, "Accept": "application/json"}
 
-    async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession(trace_configs=[_TRACE]) as session:
         async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as resp:
             if resp.status != 200:
                 text = await resp.text()
@@ -153,17 +162,22 @@ async def _collect_videos_recursive(
     return results
 
 
-async def list_category_videos(category_name: str) -> list[dict]:
+async def list_category_videos(
+    category_name: str,
+    credentials: tuple[str, str, str] | None = None,
+) -> list[dict]:
     """List all video files in a category folder (recursively).
 
     Args:
         category_name: The category/topic name, which must match the
                        top-level folder name in Bunny Storage.
+        credentials: Optional (api_key, zone, region); read from the
+                     config table when omitted.
 
     Returns:
         List of dicts with keys: url, title, path, filename
     """
-    api_key, zone, region = await _get_credentials()
+    api_key, zone, region = credentials or await _get_credentials()
 
     if not api_key or not zone:
         raise RuntimeError(
@@ -186,9 +200,11 @@ async def list_category_videos(category_name: str) -> list[dict]:
     return await _collect_videos_recursive(api_key, base_url, zone, path, cdn_hostname)
 
 
-async def list_all_categories() -> list[str]:
+async def list_all_categories(
+    credentials: tuple[str, str, str] | None = None,
+) -> list[str]:
     """List top-level folders (categories) in the storage zone."""
-    api_key, zone, region = await _get_credentials()
+    api_key, zone, region = credentials or await _get_credentials()
     if not api_key or not zone:
         return []
 
@@ -203,7 +219,26 @@ async def list_all_categories() -> list[str]:
     return [obj["ObjectName"] for obj in objects if obj.get("IsDirectory")]
 
 
-async def resolve_storage_folder(topic_name: str) -> str | None:
+def _match_folder(topic_name: str, folders: list[str]) -> str | None:
+    """Return the storage folder matching any segment of ``topic_name``."""
+    # Split topic name on ' / ' and also try the full name
+    candidates = [s.strip() for s in topic_name.split("/")]
+    candidates.append(topic_name.strip())
+
+    folder_lower = {f.lower(): f for f in folders}
+
+    for candidate in candidates:
+        match = folder_lower.get(candidate.lower())
+        if match:
+            return match
+
+    return None
+
+
+async def resolve_storage_folder(
+    topic_name: str,
+    credentials: tuple[str, str, str] | None = None,
+) -> str | None:
     """Match a DB topic name to an actual Bunny Storage folder.
 
     Topic names may use the format 'Local / English' (e.g. 'Solo / Solo',
@@ -213,19 +248,54 @@ async def resolve_storage_folder(topic_name: str) -> str | None:
 
     Returns the exact folder name from storage, or None if no match.
     """
-    folders = await list_all_categories()
+    folders = await list_all_categories(credentials)
     if not folders:
         return None
+    return _match_folder(topic_name, folders)
 
-    # Split topic name on ' / ' and also try the full name
-    candidates = [s.strip() for s in topic_name.split("/")]
-    candidates.append(topic_name.strip())
 
-    folder_lower = {f.lower(): f for f in folders}
+async def scan_categories(
+    categories: list,
+    exclude_urls: set[str],
+    credentials: tuple[str, str, str] | None = None,
+) -> tuple[list[dict], list[str]]:
+    """Auto Get & Run scan: find videos not yet posted or scheduled.
 
-    for candidate in candidates:
-        match = folder_lower.get(candidate.lower())
-        if match:
-            return match
+    ``categories`` are topic rows (``topic_id``, ``name``). The root is
+    listed once and each topic is matched to its folder, then crawled.
 
-    return None
+    Returns (new_videos, summary_lines); each new video is a dict with
+    url, title, category and topic_id.
+    """
+    credentials = credentials or await _get_credentials()
+    folders = await list_all_categories(credentials)
+
+    new_videos: list[dict] = []
+    summary: list[str] = []
+    for cat in categories:
+        cat_name = cat["name"]
+        # Resolve topic name to actual storage folder name
+        folder_name = _match_folder(cat_name, folders) if folders else None
+        if not folder_name:
+            summary.append(f"  {cat_name}: NO MATCHING FOLDER")
+            continue
+        try:
+            videos = await list_category_videos(folder_name, credentials)
+        except Exception as e:
+            logger.warning("Auto Get & Run: failed to scan '%s': %s", cat_name, e)
+            summary.append(f"  {cat_name}: ERROR ({e})")
+            continue
+
+        fresh = [v for v in videos if v["url"] not in exclude_urls]
+        summary.append(f"  {cat_name}: {len(fresh)} new / {len(videos)} total")
+        new_videos.extend(
+            {
+                "url": v["url"],
+                "title": v["title"],
+                "category": cat_name,
+                "topic_id": cat["topic_id"],
+            }
+            for v in fresh
+        )
+
+    return new_videos, summary
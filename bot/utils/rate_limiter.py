@@ -0,0 +1,44 @@
+"""Async token-bucket rate limiter for outbound Telegram API calls.
+
+Telegram allows roughly 30 messages per second across all chats for a
+bot. Bulk senders (scheduler notifications, broadcasts) acquire a token
+from the shared ``telegram_limiter`` before each send so concurrent
+fan-out never trips flood control:
+
+    await telegram_limiter.acquire()
+    await bot.send_message(...)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time as _time
+
+
+class RateLimiter:
+    """Allow at most ``rate`` acquisitions per second (bursts up to ``burst``)."""
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        self._rate = rate
+        self._burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self._burst)
+        self._updated = _time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available, then consume it."""
+        async with self._lock:
+            while True:
+                now = _time.monotonic()
+                self._tokens = min(
+                    self._burst, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+# Shared limiter for bulk sends (kept below Telegram's ~30 msg/s ceiling)
+telegram_limiter = RateLimiter(rate=25)
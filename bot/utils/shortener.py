@@ -7,39 +7,45 @@ import urllib.parse
 
 import aiohttp
 
+from bot.config import settings
 from bot.db.pool import get_pool
 from bot.db import config_repo
+from bot import metrics
 
 logger = logging.getLogger(__name__)
 
 _API_BASE = "https://shrinkme.io/api"
+_TRACE = metrics.http_trace_config("shrinkme")
 
 
-async def shorten_url(long_url: str) -> str | None:
+async def shorten_url(long_url: str, api_key: str | None = None) -> str | None:
     """Shorten a URL using ShrinkMe.io.
 
-    Reads the API key from the config table (SHRINKME_API_KEY).
+    Reads the API key from the config table (SHRINKME_API_KEY) unless
+    ``api_key`` is given, in which case the config table is not read.
     Respects the SHRINKME_ENABLED toggle — returns None when disabled.
     Returns the shortened URL, or None if the API call fails
     or no API key is configured.
     """
-    pool = await get_pool()
+    if api_key is None:
+        pool = await get_pool()
 
-    # Check the enable/disable toggle first
-    if not await config_repo.get_shrinkme_enabled(pool):
-        logger.info("ShrinkMe shortening is disabled, skipping")
-        return None
+        # Check the enable/disable toggle first
+        if not await config_repo.get_shrinkme_enabled(pool):
+            logger.info("ShrinkMe shortening is disabled, skipping")
+            return None
 
-    api_key = await config_repo.get_shrinkme_api_key(pool)
-    if not api_key:
-        logger.warning("ShrinkMe API key not configured, skipping URL shortening")
-        return None
+        api_key = await config_repo.get_shrinkme_api_key(pool)
+        if not api_key:
+            logger.warning("ShrinkMe API key not configured, skipping URL shortening")
+            return None
 
     encoded_url = urllib.parse.quote(long_url, safe="")
-    request_url = f"{_API_BASE}?api={api_key}&url={encoded_url}&format=text"
+    api_base = settings.shrinkme_api_url or _API_BASE
+    request_url = f"{api_base}?api={api_key}&url={encoded_url}&format=text"
 
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=[_TRACE]) as session:
             async with session.get(request_url, timeout=aiohttp.ClientTimeout(total=15)) as resp:
                 if resp.status != 200:
                     logger.error("ShrinkMe API returned status %s", resp.status)
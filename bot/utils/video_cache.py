@@ -0,0 +1,104 @@
+"""In-process LRU/TTL cache of video metadata.
+
+Every download deep link, redirect and legacy ``aff_done_`` callback looks
+up a video, and a handful of new videos take most of that traffic. This
+cache sits in front of ``video_repo.get_video`` / ``get_video_by_code``:
+
+    video = video_cache.get(video_id)        # None on miss
+    video = video_cache.put(record)          # -> VideoInfo
+
+Entries are compact immutable ``VideoInfo`` objects without the
+``views`` / ``downloads`` counters (those change on every hit and are
+read from the database when needed). ``video_repo`` write helpers call
+``invalidate()``; the TTL bounds staleness for writes made by other
+processes.
+"""
+
+from __future__ import annotations
+
+import time as _time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Mapping, Optional
+
+_MAX_ENTRIES = 1024
+_TTL = 5 * 60  # seconds
+
+
+@dataclass(frozen=True, slots=True)
+class VideoInfo:
+    """Cached video row; supports ``video["key"]`` / ``video.get("key")``
+    like the asyncpg Record it replaces."""
+
+    video_id: int
+    code: Optional[str]
+    title: str
+    category: Optional[str]
+    description: Optional[str]
+    file_url: str
+    shortened_url: Optional[str]
+    thumbnail_file_id: Optional[str]
+    affiliate_link: Optional[str]
+    topic_id: Optional[int]
+    message_id: Optional[int]
+    post_date: Optional[datetime]
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+COLUMNS: tuple[str, ...] = tuple(f.name for f in fields(VideoInfo))
+
+# video_id -> (expires_at_monotonic, info); ordered oldest -> newest access
+_store: OrderedDict[int, tuple[float, VideoInfo]] = OrderedDict()
+# UPPER(code) -> video_id
+_by_code: dict[str, int] = {}
+
+
+def _drop(video_id: int) -> None:
+    entry = _store.pop(video_id, None)
+    if entry is not None and entry[1].code:
+        _by_code.pop(entry[1].code.upper(), None)
+
+
+def get(video_id: int) -> VideoInfo | None:
+    """Return the cached video, or None if missing or expired."""
+    entry = _store.get(video_id)
+    if entry is None:
+        return None
+    expires_at, info = entry
+    if expires_at <= _time.monotonic():
+        _drop(video_id)
+        return None
+    _store.move_to_end(video_id)
+    return info
+
+
+def get_by_code(code: str) -> VideoInfo | None:
+    """Return the cached video with this code (case-insensitive), or None."""
+    video_id = _by_code.get(code.upper())
+    return get(video_id) if video_id is not None else None
+
+
+def put(row: Mapping[str, Any]) -> VideoInfo:
+    """Cache a video row (asyncpg Record or mapping) and return it."""
+    info = VideoInfo(**{name: row[name] for name in COLUMNS})
+    _drop(info.video_id)
+    _store[info.video_id] = (_time.monotonic() + _TTL, info)
+    if info.code:
+        _by_code[info.code.upper()] = info.video_id
+    while len(_store) > _MAX_ENTRIES:
+        _drop(next(iter(_store)))
+    return info
+
+
+def invalidate(video_id: int) -> None:
+    """Forget a video after it has been modified."""
+    _drop(video_id)
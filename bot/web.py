@@ -1,20 +1,26 @@
 """Lightweight aiohttp web server for verified redirect tracking.
 
 Runs alongside the Telegram bot in the same process.
-Single route: GET /{token} — validates download session,
-marks it as visited, triggers auto-delivery, and redirects
-the user's browser to the affiliate/ShrinkMe URL.
+Routes:
+  GET /{token}     — validates download session, marks it as visited,
+                     triggers auto-delivery, and redirects the user's
+                     browser to the affiliate/ShrinkMe URL.
+  GET /api/stats   — the precomputed admin statistics snapshot as JSON
+                     (requires STATS_API_TOKEN as a Bearer token).
+  GET /metrics     — Prometheus metrics (same Bearer token).
 """
 
 from __future__ import annotations
 
+import hmac
 import logging
 from datetime import datetime, timezone
 
 from aiohttp import web
 
 from bot.db.pool import get_pool
-from bot.db import config_repo, video_repo, user_repo
+from bot.db import config_repo, video_repo, user_repo, stats_repo
+from bot import log_config, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +35,22 @@ def set_bot(bot) -> None:
 
 
 async def handle_redirect(request: web.Request) -> web.Response:
-    """Handle GET /{token} — verify visit, deliver video, redirect."""
+    """Handle GET /{token}, counting the outcome by status code."""
+    try:
+        with log_config.bound(session_id=request.match_info.get("token", "")):
+            response = await _redirect(request)
+    except web.HTTPException as e:
+        metrics.REDIRECTS.labels(status=e.status).inc()
+        raise
+    except Exception:
+        metrics.REDIRECTS.labels(status=500).inc()
+        raise
+    metrics.REDIRECTS.labels(status=response.status).inc()
+    return response
+
+
+async def _redirect(request: web.Request) -> web.Response:
+    """Verify the visit, deliver the video and redirect."""
     token = request.match_info.get("token", "")
     if not token:
         return web.Response(text="Invalid link.", status=400)
@@ -116,8 +137,43 @@ async def handle_redirect(request: web.Request) -> web.Response:
     raise web.HTTPFound(redirect_url)
 
 
+async def _require_api_token(request: web.Request) -> None:
+    """Reject requests without the STATS_API_TOKEN Bearer token (404 if unset)."""
+    pool = await get_pool()
+    expected = await config_repo.get_stats_api_token(pool)
+    if not expected:
+        raise web.HTTPNotFound()
+    auth = request.headers.get("Authorization", "")
+    supplied = auth.removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), expected.encode()):
+        raise web.HTTPUnauthorized()
+
+
+async def handle_stats(request: web.Request) -> web.Response:
+    """Handle GET /api/stats — return the stats snapshot as JSON."""
+    await _require_api_token(request)
+
+    pool = await get_pool()
+    snapshot = await stats_repo.get_snapshot(pool)
+    if snapshot is None:
+        snapshot = await stats_repo.refresh_snapshot(pool)
+    data, updated_at = snapshot
+    return web.json_response({**data, "updated_at": updated_at.isoformat()})
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Handle GET /metrics — Prometheus text exposition."""
+    await _require_api_token(request)
+    return web.Response(
+        body=metrics.render().encode(),
+        headers={"Content-Type": metrics.CONTENT_TYPE},
+    )
+
+
 def create_web_app() -> web.Application:
     """Create the aiohttp web application."""
     app = web.Application()
+    app.router.add_get("/api/stats", handle_stats)
+    app.router.add_get("/metrics", handle_metrics)
     app.router.add_get("/{token}", handle_redirect)
     return app
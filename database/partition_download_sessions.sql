@@ -0,0 +1,71 @@
+-- ============================================
+-- OPTIONAL: daily-partitioned download_sessions
+-- ============================================
+-- Converts download_sessions into a table partitioned by created_at (one
+-- partition per day). Once partitioned, the bot's scheduler creates the
+-- upcoming days' partitions itself and drops whole days older than the
+-- retention window instead of deleting rows one batch at a time.
+--
+-- Trade-offs:
+--   * The primary key becomes (session_id, created_at), so the
+--     downloads.session_id foreign key is dropped (the column is kept).
+--   * Only sessions created today are copied over; the old table is kept
+--     as download_sessions_old for reference and can be dropped later.
+--
+-- Run once, with the bot stopped:
+--   psql -d rated_bot -f database/partition_download_sessions.sql
+-- ============================================
+
+BEGIN;
+
+ALTER TABLE downloads DROP CONSTRAINT IF EXISTS fk_dl_session;
+
+ALTER TABLE download_sessions RENAME TO download_sessions_old;
+ALTER INDEX IF EXISTS download_sessions_pkey RENAME TO download_sessions_old_pkey;
+ALTER INDEX IF EXISTS idx_ds_user    RENAME TO idx_ds_old_user;
+ALTER INDEX IF EXISTS idx_ds_video   RENAME TO idx_ds_old_video;
+ALTER INDEX IF EXISTS idx_ds_expires RENAME TO idx_ds_old_expires;
+ALTER INDEX IF EXISTS idx_ds_active  RENAME TO idx_ds_old_active;
+
+CREATE TABLE download_sessions (
+    session_id        VARCHAR(255) NOT NULL,
+    user_id           BIGINT       NOT NULL,
+    video_id          BIGINT       NOT NULL,
+    affiliate_visited BOOLEAN      DEFAULT FALSE,
+    video_sent        BOOLEAN      DEFAULT FALSE,
+    created_at        TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+    expires_at        TIMESTAMPTZ,
+    visited_at        TIMESTAMPTZ,
+
+    PRIMARY KEY (session_id, created_at),
+    CONSTRAINT fk_ds_user  FOREIGN KEY (user_id)  REFERENCES users(user_id)  ON DELETE CASCADE,
+    CONSTRAINT fk_ds_video FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX idx_ds_user    ON download_sessions(user_id);
+CREATE INDEX idx_ds_video   ON download_sessions(video_id);
+CREATE INDEX idx_ds_expires ON download_sessions(expires_at);
+CREATE INDEX idx_ds_active  ON download_sessions(user_id, video_id)
+    WHERE video_sent = FALSE AND visited_at IS NULL;
+
+-- Today and the next two days (the scheduler keeps this window rolling)
+DO $$
+DECLARE
+    d DATE := CURRENT_DATE;
+BEGIN
+    FOR i IN 0..2 LOOP
+        EXECUTE format(
+            'CREATE TABLE download_sessions_p%s PARTITION OF download_sessions '
+            'FOR VALUES FROM (%L) TO (%L)',
+            to_char(d + i, 'YYYYMMDD'), d + i, d + i + 1
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO download_sessions
+SELECT session_id, user_id, video_id, affiliate_visited, video_sent,
+       created_at, expires_at, visited_at
+FROM download_sessions_old
+WHERE created_at >= CURRENT_DATE;
+
+COMMIT;
@@ -0,0 +1,76 @@
+-- ============================================
+-- OPTIONAL: monthly-partitioned downloads log
+-- ============================================
+-- Converts downloads into a table partitioned by download_date (one
+-- partition per calendar month). Once partitioned, the bot's scheduler
+-- creates next month's partition itself, and DOWNLOAD_RETENTION_MONTHS
+-- detaches whole months (left behind as standalone downloads_pYYYYMM
+-- tables for archiving) instead of deleting rows in batches.
+--
+-- Trade-offs:
+--   * The primary key becomes (download_id, download_date), and
+--     download_date is NOT NULL (rows without one use created_at).
+--   * The session_id foreign key to download_sessions is not recreated
+--     (the column is kept).
+--   * The old table is kept as downloads_old until you drop it.
+--
+-- Run once, with the bot stopped:
+--   psql -d rated_bot -f database/partition_downloads.sql
+-- ============================================
+
+BEGIN;
+
+ALTER TABLE downloads RENAME TO downloads_old;
+ALTER INDEX IF EXISTS downloads_pkey RENAME TO downloads_old_pkey;
+ALTER INDEX IF EXISTS idx_dl_user    RENAME TO idx_dl_old_user;
+ALTER INDEX IF EXISTS idx_dl_video   RENAME TO idx_dl_old_video;
+ALTER INDEX IF EXISTS idx_dl_session RENAME TO idx_dl_old_session;
+ALTER INDEX IF EXISTS idx_dl_date    RENAME TO idx_dl_old_date;
+
+CREATE TABLE downloads (
+    download_id            BIGINT       NOT NULL DEFAULT nextval('downloads_download_id_seq'),
+    user_id                BIGINT       NOT NULL,
+    video_id               BIGINT       NOT NULL,
+    session_id             VARCHAR(255),
+    affiliate_link_clicked BOOLEAN      DEFAULT FALSE,
+    download_completed     BOOLEAN      DEFAULT FALSE,
+    download_date          TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+    created_at             TIMESTAMPTZ  DEFAULT NOW(),
+
+    PRIMARY KEY (download_id, download_date),
+    CONSTRAINT fk_dl_user  FOREIGN KEY (user_id)  REFERENCES users(user_id)   ON DELETE CASCADE,
+    CONSTRAINT fk_dl_video FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE
+) PARTITION BY RANGE (download_date);
+
+-- Keep the sequence alive independently of downloads_old
+ALTER SEQUENCE downloads_download_id_seq OWNED BY downloads.download_id;
+
+CREATE INDEX idx_dl_user    ON downloads(user_id);
+CREATE INDEX idx_dl_video   ON downloads(video_id);
+CREATE INDEX idx_dl_session ON downloads(session_id);
+CREATE INDEX idx_dl_date    ON downloads(download_date);
+
+-- One partition per month from the oldest row through next month
+DO $$
+DECLARE
+    m DATE := date_trunc('month', COALESCE(
+        (SELECT MIN(COALESCE(download_date, created_at)) FROM downloads_old),
+        NOW()))::date;
+    last DATE := (date_trunc('month', NOW()) + INTERVAL '1 month')::date;
+BEGIN
+    WHILE m <= last LOOP
+        EXECUTE format(
+            'CREATE TABLE downloads_p%s PARTITION OF downloads '
+            'FOR VALUES FROM (%L) TO (%L)',
+            to_char(m, 'YYYYMM'), m, (m + INTERVAL '1 month')::date
+        );
+        m := (m + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
+
+INSERT INTO downloads
+SELECT download_id, user_id, video_id, session_id, affiliate_link_clicked,
+       download_completed, COALESCE(download_date, created_at, NOW()), created_at
+FROM downloads_old;
+
+COMMIT;
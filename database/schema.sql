@@ -24,6 +24,7 @@ CREATE TABLE IF NOT EXISTS config (
 INSERT INTO config (key, value, description) VALUES
     ('REQUIRED_REFERRALS',    '1',                               'Number of referrals needed to join supergroup (0 = auto-approve)'),
     ('INVITE_EXPIRY_SECONDS', '300',                             'How long a one-time invite link stays valid (seconds)'),
+    ('INVITE_POOL_SIZE',      '20',                              'Spare invite links kept pre-generated (0 = create on demand)'),
     ('ADMIN_IDS',             '',                                'Comma-separated Telegram user IDs of bot admins'),
     ('AFFILIATE_LINK',        '',                                'Default affiliate link shown before downloads'),
     ('WELCOME_MESSAGE',       'Selamat datang di ZONA RATED!', 'Welcome message sent when user starts the bot'),
@@ -35,7 +36,13 @@ INSERT INTO config (key, value, description) VALUES
     ('MAINTENANCE_END',       '',                                'Maintenance window end (ISO 8601 datetime, optional)'),
     ('BUNNY_STORAGE_API_KEY', '',                                'Bunny Edge Storage API key for Auto Get & Run'),
     ('BUNNY_STORAGE_ZONE',    '',                                'Bunny Edge Storage zone name (e.g. zbot)'),
-    ('BUNNY_STORAGE_REGION',  '',                                'Bunny Edge Storage region (e.g. sg for Singapore, empty for default)')
+    ('BUNNY_STORAGE_REGION',  '',                                'Bunny Edge Storage region (e.g. sg for Singapore, empty for default)'),
+    ('FSM_STATE_TTL_HOURS',   '24',                              'Hours before an abandoned wizard/FSM state is deleted'),
+    ('MEMBERSHIP_RECONCILE_HOURS', '0',                          'Hours between full supergroup membership re-checks (0 = disabled)'),
+    ('DOWNLOAD_RETENTION_MONTHS', '0',                           'Months of raw download log kept; older rows/partitions are removed (0 = keep all)'),
+    ('STATS_API_TOKEN',       '',                                'Token for the GET /api/stats and GET /metrics endpoints (empty = endpoints disabled)'),
+    ('SLOW_UPDATE_MS',        '1000',                            'Updates taking longer than this many ms are logged with a DB/API/HTTP breakdown (0 = off)'),
+    ('SLOW_QUERY_MS',         '500',                             'Repo queries slower than this many ms get an EXPLAIN (ANALYZE, BUFFERS) sample (0 = off)')
 ON CONFLICT (key) DO NOTHING;
 
 
@@ -62,6 +69,7 @@ CREATE TABLE IF NOT EXISTS users (
     approved             BOOLEAN      DEFAULT FALSE,              -- Marked when all requirements are satisfied
     ready_to_join        BOOLEAN      DEFAULT FALSE,              -- Temporary flag while invite link is active
     joined_supergroup    BOOLEAN      DEFAULT FALSE,              -- Successfully joined the supergroup
+    left_at              TIMESTAMPTZ,                             -- Last time user left / was removed (NULL while a member)
 
     -- Timestamps
     join_date            TIMESTAMPTZ  DEFAULT NOW(),              -- When user first started the bot
@@ -70,10 +78,16 @@ CREATE TABLE IF NOT EXISTS users (
     CONSTRAINT fk_referred_by FOREIGN KEY (referred_by) REFERENCES users(user_id) ON DELETE SET NULL
 );
 
+-- Columns added after the initial release (no-op on fresh installs)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS left_at TIMESTAMPTZ;
+
 -- Indexes for frequent lookups
 CREATE INDEX IF NOT EXISTS idx_users_referral_link ON users(referral_link);
 CREATE INDEX IF NOT EXISTS idx_users_referred_by   ON users(referred_by);
 CREATE INDEX IF NOT EXISTS idx_users_joined_sg     ON users(joined_supergroup);
+-- Scheduler scan for users who just met the referral requirement
+CREATE INDEX IF NOT EXISTS idx_users_unverified_refs ON users(referral_count)
+    WHERE verification_complete = FALSE;
 
 
 -- ===========================================
@@ -112,6 +126,19 @@ CREATE TABLE IF NOT EXISTS topics (
 
 CREATE INDEX IF NOT EXISTS idx_topics_thread ON topics(thread_id);
 
+-- Tell every bot instance to reload its in-memory topic registry
+CREATE OR REPLACE FUNCTION notify_topics_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('topics_changed', TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_topics_changed ON topics;
+CREATE TRIGGER trg_topics_changed
+    AFTER INSERT OR UPDATE OR DELETE ON topics
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_topics_changed();
+
 
 -- ===========================================
 -- 5. VIDEOS TABLE
@@ -136,6 +163,7 @@ CREATE TABLE IF NOT EXISTS videos (
 
 CREATE INDEX IF NOT EXISTS idx_videos_category ON videos(category);
 CREATE INDEX IF NOT EXISTS idx_videos_topic    ON videos(topic_id);
+CREATE INDEX IF NOT EXISTS idx_videos_downloads ON videos(downloads DESC);
 
 
 -- ===========================================
@@ -161,6 +189,10 @@ CREATE TABLE IF NOT EXISTS download_sessions (
 CREATE INDEX IF NOT EXISTS idx_ds_user      ON download_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_ds_video     ON download_sessions(video_id);
 CREATE INDEX IF NOT EXISTS idx_ds_expires   ON download_sessions(expires_at);
+-- Unused sessions a repeated Download tap can reuse
+CREATE INDEX IF NOT EXISTS idx_ds_active    ON download_sessions(user_id, video_id)
+    WHERE video_sent = FALSE AND visited_at IS NULL;
+-- Optional daily-partitioned layout: database/partition_download_sessions.sql
 
 
 -- ===========================================
@@ -185,6 +217,8 @@ CREATE TABLE IF NOT EXISTS downloads (
 CREATE INDEX IF NOT EXISTS idx_dl_user    ON downloads(user_id);
 CREATE INDEX IF NOT EXISTS idx_dl_video   ON downloads(video_id);
 CREATE INDEX IF NOT EXISTS idx_dl_session ON downloads(session_id);
+CREATE INDEX IF NOT EXISTS idx_dl_date    ON downloads(download_date);
+-- Optional monthly-partitioned layout: database/partition_downloads.sql
 
 
 -- ===========================================
@@ -194,7 +228,7 @@ CREATE INDEX IF NOT EXISTS idx_dl_session ON downloads(session_id);
 -- ===========================================
 CREATE TABLE IF NOT EXISTS invite_links (
     id          BIGSERIAL    PRIMARY KEY,
-    user_id     BIGINT       NOT NULL,
+    user_id     BIGINT,                                -- NULL = spare link in the pool
     invite_link TEXT         NOT NULL,
     used        BOOLEAN      DEFAULT FALSE,
     created_at  TIMESTAMPTZ  DEFAULT NOW(),
@@ -203,8 +237,14 @@ CREATE TABLE IF NOT EXISTS invite_links (
     CONSTRAINT fk_il_user FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
+-- Spare pooled links have no owner yet (no-op on fresh installs)
+ALTER TABLE invite_links ALTER COLUMN user_id DROP NOT NULL;
+
 CREATE INDEX IF NOT EXISTS idx_il_user    ON invite_links(user_id);
 CREATE INDEX IF NOT EXISTS idx_il_expires ON invite_links(expires_at);
+CREATE INDEX IF NOT EXISTS idx_il_link    ON invite_links(invite_link);
+-- Spare links waiting to be handed out
+CREATE INDEX IF NOT EXISTS idx_il_pool    ON invite_links(expires_at) WHERE user_id IS NULL;
 
 
 -- ===========================================
@@ -233,3 +273,76 @@ CREATE TABLE IF NOT EXISTS scheduled_videos (
 CREATE INDEX IF NOT EXISTS idx_sv_status    ON scheduled_videos(status);
 CREATE INDEX IF NOT EXISTS idx_sv_scheduled ON scheduled_videos(scheduled_at);
 CREATE INDEX IF NOT EXISTS idx_sv_file_url  ON scheduled_videos(file_url);
+-- Admin queue order (keyset pagination in schedule_repo.get_queue_page)
+CREATE INDEX IF NOT EXISTS idx_sv_queue     ON scheduled_videos(
+    (CASE status WHEN 'pending' THEN 0 WHEN 'posting' THEN 1
+                 WHEN 'posted' THEN 2 WHEN 'failed' THEN 3 ELSE 4 END),
+    scheduled_at, schedule_id);
+
+
+-- ===========================================
+-- 10. FSM STATES TABLE
+-- Persistent aiogram FSM storage (wizard state
+-- survives restarts, shared across instances)
+-- ===========================================
+CREATE TABLE IF NOT EXISTS fsm_states (
+    storage_key VARCHAR(255) PRIMARY KEY,                         -- aiogram key: fsm:{bot}:{chat}:{user}:{destiny}
+    state       VARCHAR(255),                                     -- Current state name (nullable)
+    data        JSONB        NOT NULL DEFAULT '{}'::jsonb,        -- Wizard data dict
+    updated_at  TIMESTAMPTZ  DEFAULT NOW()                        -- Last write, used for TTL sweeping
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm_states(updated_at);
+
+
+-- ===========================================
+-- 11. DOWNLOAD ROLLUPS
+-- Hourly/daily download counters maintained by
+-- the scheduler; stats read these instead of
+-- scanning the downloads log
+-- ===========================================
+CREATE TABLE IF NOT EXISTS download_rollups (
+    granularity      VARCHAR(4)   NOT NULL,                       -- 'hour' | 'day'
+    bucket           TIMESTAMPTZ  NOT NULL,                       -- Start of the hour/day (UTC)
+    downloads        BIGINT       NOT NULL DEFAULT 0,             -- Completed downloads in the bucket
+    affiliate_clicks BIGINT       NOT NULL DEFAULT 0,             -- ... of which went through the affiliate link
+    new_users        BIGINT       NOT NULL DEFAULT 0,             -- Users whose first download is in the bucket
+    new_videos       BIGINT       NOT NULL DEFAULT 0,             -- Videos first downloaded in the bucket
+
+    PRIMARY KEY (granularity, bucket)
+);
+
+-- First download per user ('u') / video ('v'); feeds new_users / new_videos
+CREATE TABLE IF NOT EXISTS download_firsts (
+    kind     CHAR(1)     NOT NULL,
+    id       BIGINT      NOT NULL,
+    first_at TIMESTAMPTZ NOT NULL,
+
+    PRIMARY KEY (kind, id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dlf_first ON download_firsts(first_at);
+
+
+-- ===========================================
+-- 12. STATS SNAPSHOT
+-- Precomputed admin dashboard numbers (single
+-- row, refreshed by the scheduler)
+-- ===========================================
+CREATE TABLE IF NOT EXISTS stats_snapshot (
+    id         SMALLINT     PRIMARY KEY CHECK (id = 1),
+    data       JSONB        NOT NULL,                             -- users / downloads / top_videos / funnel
+    updated_at TIMESTAMPTZ  NOT NULL DEFAULT NOW()
+);
+
+
+-- ===========================================
+-- 13. VIDEO CODE COUNTERS
+-- Per-prefix allocation state for video codes
+-- (counter n is scrambled into the code digits)
+-- ===========================================
+CREATE TABLE IF NOT EXISTS video_code_counters (
+    prefix VARCHAR(20) PRIMARY KEY,                               -- Topic prefix, e.g. A, AC
+    width  SMALLINT    NOT NULL DEFAULT 4,                        -- Current digit count (grows when exhausted)
+    next_n BIGINT      NOT NULL DEFAULT 0                         -- Next counter value within this width
+);